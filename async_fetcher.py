@@ -0,0 +1,195 @@
+import asyncio
+import logging
+import time
+from collections import defaultdict, deque
+from urllib.parse import urlparse
+
+import aiohttp
+
+from host_health import DeadURL, HostUnavailable
+from metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+
+def get_domain(url):
+    """Extract the host (without www.) used as the politeness key"""
+    return urlparse(url).netloc.lower().replace('www.', '')
+
+
+class DomainThrottle:
+    """Spaces out request starts to a single host.
+
+    Consecutive starts are at least ``1 / rate`` seconds apart, so a host
+    never sees more than ``rate`` requests in any one-second window no matter
+    how many workers share the throttle.
+    """
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next_start = 0.0
+
+    def delay(self):
+        """Seconds until the next request to this host may start"""
+        return max(0.0, self._next_start - time.monotonic())
+
+    async def ready(self):
+        """Sleep until the host's next slot, without reserving it"""
+        wait = self.delay()
+        while wait > 0:
+            await asyncio.sleep(wait)
+            wait = self.delay()
+
+    def try_acquire(self):
+        """Reserve the slot if it is due now; returns False otherwise"""
+        now = time.monotonic()
+        if now < self._next_start:
+            return False
+        self._next_start = now + self.interval
+        return True
+
+
+class AsyncFetcher:
+    """Asyncio fetch engine with global and per-domain limits.
+
+    ``max_connections`` caps the number of requests in flight overall,
+    ``per_domain_concurrency`` caps them per host and ``per_domain_rate`` is
+    the maximum requests per second sent to any single host. Connections are
+    kept alive and reused through one shared aiohttp session. With a
+    ``health`` tracker (see host_health) dead URLs and hosts whose circuit is
+    open are skipped, and 429/5xx responses are retried with backoff.
+    """
+
+    def __init__(self, max_connections=100, per_domain_concurrency=2,
+                 per_domain_rate=1.0, timeout=10, headers=None, header_factory=None,
+                 health=None):
+        self.max_connections = max_connections
+        self.per_domain_concurrency = per_domain_concurrency
+        self.per_domain_rate = per_domain_rate
+        self.timeout = timeout
+        self.headers = headers or {}
+        self.header_factory = header_factory
+        self.health = health
+
+    def _session(self):
+        connector = aiohttp.TCPConnector(
+            limit=self.max_connections,
+            limit_per_host=self.per_domain_concurrency,
+            ttl_dns_cache=300,
+            keepalive_timeout=30,
+        )
+        return aiohttp.ClientSession(
+            connector=connector,
+            headers=self.headers,
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+            trust_env=True,
+        )
+
+    async def fetch(self, session, url):
+        """Fetch a single URL and return a result dict (never raises)"""
+        headers = self.header_factory() if self.header_factory else None
+        metrics = get_metrics()
+        started = time.monotonic()
+        try:
+            async with session.get(url, headers=headers) as response:
+                body = await response.read()
+                text = await response.text(errors='replace')
+                metrics.observe('fetch', time.monotonic() - started)
+                metrics.add_bytes('fetch', len(body))
+                metrics.record_domain(url, response.status)
+                error = None
+                if response.status >= 400:
+                    kind = 'Client' if response.status < 500 else 'Server'
+                    error = f"{response.status} {kind} Error: {response.reason} for url: {url}"
+                return {
+                    'url': url,
+                    'status': response.status,
+                    'text': text,
+                    'error': error,
+                    'retry_after': response.headers.get('Retry-After'),
+                    'elapsed': time.monotonic() - started,
+                }
+        except Exception as e:
+            metrics.record_domain(url, e.__class__.__name__)
+            return self._failure(url, str(e) or e.__class__.__name__, started)
+
+    def _failure(self, url, error, started):
+        return {'url': url, 'status': None, 'text': None, 'error': error,
+                'retry_after': None, 'elapsed': time.monotonic() - started}
+
+    def _refusal(self, url):
+        """Error result if the health tracker refuses ``url``, else None"""
+        if self.health:
+            try:
+                self.health.check(url)
+            except (HostUnavailable, DeadURL) as e:
+                return self._failure(url, str(e), time.monotonic())
+        return None
+
+    async def _fetch_politely(self, session, url, throttle, slots):
+        refused = self._refusal(url)
+        while not refused:
+            await throttle.ready()
+            async with slots:
+                # Another worker may have taken the slot while we waited
+                # for a global connection, so re-check before sending.
+                if throttle.try_acquire():
+                    # The host's circuit may have opened while we waited
+                    refused = self._refusal(url)
+                    if refused:
+                        return refused
+                    with get_metrics().busy('fetch.async'):
+                        return await self.fetch(session, url)
+        return refused
+
+    async def _domain_worker(self, session, queue, throttle, slots, results):
+        while queue:
+            url = queue.popleft()
+            attempt = 0
+            while True:
+                result = await self._fetch_politely(session, url, throttle, slots)
+                if not self.health:
+                    break
+                if result['status'] is None:
+                    self.health.release(url)  # no response: not a verdict on the host
+                    break
+                delay = self.health.retry_delay(
+                    result['status'], {'Retry-After': result['retry_after']}, attempt)
+                if delay is None:
+                    self.health.record(url, result['status'])
+                    break
+                await asyncio.sleep(delay)
+                attempt += 1
+            await results.put(result)
+
+    async def fetch_all(self, urls):
+        """Fetch every URL, yielding result dicts in completion order"""
+        queues = defaultdict(deque)
+        for url in urls:
+            queues[get_domain(url)].append(url)
+        total = sum(len(queue) for queue in queues.values())
+        if not total:
+            return
+
+        results = asyncio.Queue()
+        slots = asyncio.Semaphore(self.max_connections)
+        async with self._session() as session:
+            workers = []
+            for domain, queue in queues.items():
+                throttle = DomainThrottle(self.per_domain_rate)
+                for _ in range(min(self.per_domain_concurrency, len(queue))):
+                    workers.append(asyncio.create_task(
+                        self._domain_worker(session, queue, throttle, slots, results)))
+            logger.info(f"Fetching {total} URLs across {len(queues)} domains "
+                        f"with {len(workers)} workers")
+            metrics = get_metrics()
+            metrics.pool_started('fetch.async', len(workers))
+            try:
+                for _ in range(total):
+                    yield await results.get()
+                    metrics.queue_depth('fetch.pending', sum(len(queue) for queue in queues.values()))
+            finally:
+                metrics.pool_finished('fetch.async')
+                for worker in workers:
+                    worker.cancel()
+                await asyncio.gather(*workers, return_exceptions=True)
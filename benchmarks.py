@@ -0,0 +1,761 @@
+import argparse
+import contextlib
+import csv
+import io
+import json
+import logging
+import os
+import re
+import subprocess
+import tempfile
+import threading
+import time
+import zipfile
+import zlib
+from bisect import bisect_right
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+STAND_IN_PAGE = """<html><head><title>Stand-in job</title></head><body>
+<h1 class="jobsearch-JobInfoHeader-title">Software Engineer</h1>
+<div id="jobDescriptionText">We are looking for a Python developer.
+Experience: 3+ years. Salary: not disclosed.</div>
+</body></html>"""
+
+CORPUS_ZIP = 'archive (1).zip'
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+PIPELINE_RESULTS = os.path.join(REPO_DIR, 'bench_results.jsonl')
+CORPUS_MEMBER = 'job_title_des.csv'
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Serves a fixed job page after a simulated network latency"""
+    protocol_version = 'HTTP/1.1'  # keep-alive, like a real job board
+    disable_nagle_algorithm = True  # headers and body go out as separate writes
+
+    def do_GET(self):
+        self.server.record_request()
+        time.sleep(self.server.latency)
+        body = self.server.page
+        etag = f'"{zlib.crc32(body):08x}"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StandInServer(ThreadingHTTPServer):
+    """Local HTTP server standing in for one job site"""
+    daemon_threads = True
+
+    def __init__(self, latency=0.05, page=STAND_IN_PAGE):
+        super().__init__(('127.0.0.1', 0), StandInHandler)
+        self.latency = latency
+        self.page = page.encode('utf-8')
+        self.request_times = []
+        self.connections = 0
+        self._lock = threading.Lock()
+
+    def get_request(self):
+        with self._lock:
+            self.connections += 1
+        return super().get_request()
+
+    def handle_error(self, request, client_address):
+        pass  # clients dropping capped downloads early is expected
+
+    def record_request(self):
+        with self._lock:
+            self.request_times.append(time.monotonic())
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+def start_stand_ins(count, latency):
+    """Start ``count`` servers; each port counts as a separate domain"""
+    servers = []
+    for _ in range(count):
+        server = StandInServer(latency)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+    return servers
+
+
+def peak_requests_per_second(times):
+    """Largest number of requests seen in any half-open one-second window"""
+    times = sorted(times)
+    return max((i - bisect_right(times, t - 1.0) + 1 for i, t in enumerate(times)), default=0)
+
+
+def write_url_csv(path, urls):
+    with open(path, mode='w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['title', 'url'])
+        for i, url in enumerate(urls):
+            writer.writerow([f"Job {i}", url])
+
+
+def close_shared_stores():
+    """Close the process-wide SQLite stores; the next get_*() reopens them in the current directory"""
+    import dedup, host_health, http_cache, parse_memo
+    for module, name in ((http_cache, '_default_cache'), (host_health, '_default_health'),
+                         (parse_memo, '_default_memo'), (dedup, '_default_index')):
+        store = getattr(module, name)
+        if store is not None:
+            store.close()
+            setattr(module, name, None)
+
+
+def bench_fetch(args):
+    """Compare JobScraper.process_csv thread and asyncio modes"""
+    from extr import JobScraper
+
+    servers = start_stand_ins(args.domains, args.latency)
+    urls = [f"{servers[i % len(servers)].base_url}/job/{i}" for i in range(args.urls)]
+    cwd = os.getcwd()
+
+    for mode in args.modes:
+        # Each mode starts with empty caches, health, memo and dedup stores
+        with tempfile.TemporaryDirectory() as tmp:
+            os.chdir(tmp)
+            try:
+                input_csv = os.path.join(tmp, 'urls.csv')
+                write_url_csv(input_csv, urls)
+                for server in servers:
+                    server.request_times = []
+                scraper = JobScraper()
+                started = time.perf_counter()
+                scraper.process_csv(
+                    input_csv, os.path.join(tmp, f'{mode}.csv'),
+                    use_async=(mode == 'async'),
+                    max_connections=args.max_connections,
+                    per_domain_concurrency=args.per_domain_concurrency,
+                    per_domain_rate=args.rate,
+                )
+                elapsed = time.perf_counter() - started
+            finally:
+                close_shared_stores()
+                os.chdir(cwd)
+        peak = max(peak_requests_per_second(s.request_times) for s in servers)
+        print(f"{mode:>8}: {len(urls)} URLs in {elapsed:.2f}s "
+              f"({len(urls) / elapsed * 60:.0f} URLs/min), "
+              f"peak {peak} req/s to a single domain")
+
+    for server in servers:
+        server.shutdown()
+
+
+def bench_transport(args):
+    """Compare bare requests.get with the shared pooled transport (connections, DNS, time)"""
+    import requests
+    from concurrent.futures import ThreadPoolExecutor
+    from transport import DnsCache, Transport
+
+    servers = start_stand_ins(args.hosts, 0)
+    # By name, so each new connection needs a lookup
+    urls = [f"http://localhost:{servers[i % len(servers)].server_address[1]}/job/{i}"
+            for i in range(args.urls)]
+    for mode in ('requests.get', 'transport'):
+        for server in servers:
+            server.connections = 0
+        if mode == 'transport':
+            dns = DnsCache().install()
+            transport = Transport(http2=False)
+            get = transport.get
+        else:
+            get = requests.get
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.threads) as executor:
+            statuses = list(executor.map(lambda url: get(url, timeout=10).status_code, urls))
+        elapsed = time.perf_counter() - started
+        connections = sum(server.connections for server in servers)
+        line = (f"{mode:>12}: {elapsed / len(urls) * 1000:.2f} ms/request, "
+                f"{statuses.count(200)}/{len(urls)} ok, {connections} connections opened")
+        if mode == 'transport':
+            line += f", {dns.stats['misses']} DNS lookups ({dns.stats['hits']} cached)"
+            dns.uninstall()
+            transport.close()
+        print(line)
+    for server in servers:
+        server.shutdown()
+
+
+def bloated_job_page(filler_bytes):
+    """A generic job page with its fields up front and a large SPA-style tail"""
+    chunk = '<div class="card"><script>window.__STATE__ = {"x": 1};</script>filler</div>\n'
+    return ("<html><body><table><tr><td>Experience</td><td>3-5 years</td></tr>"
+            "<tr><td>Salary</td><td>$90,000 - $120,000</td></tr></table>"
+            '<div class="job-details"><p>Build data pipelines in Python.</p></div>'
+            + chunk * (filler_bytes // len(chunk)) + "</body></html>")
+
+
+def bench_generic(args):
+    """Compare full and incremental generic job page parsing (parity, bytes, time)"""
+    import requests
+    from extra import GenericJobParser, parse_generic_job
+    from http_cache import HTML_CONTENT_TYPES, MAX_PAGE_BYTES, ResponseCache, read_capped
+
+    mismatches = 0
+    for path in ('debug_page.html', 'inde.html'):
+        with open(path, 'rb') as f:
+            content = f.read()
+        if parse_generic_job(content) != GenericJobParser().parse(content):
+            mismatches += 1
+            print(f"Mismatch on {path}")
+    print(f"Saved pages: {mismatches} mismatches")
+
+    server = start_stand_ins(1, 0)[0]
+    server.page = bloated_job_page(args.page_kb * 1024).encode('utf-8')
+    for mode in ('full', 'incremental'):
+        downloaded = 0
+        started = time.perf_counter()
+        for i in range(args.repeat):
+            url = f"{server.base_url}/job/{i}"
+            if mode == 'full':
+                response = requests.get(url)
+                result = parse_generic_job(response.content)
+            else:
+                parser = GenericJobParser()
+                response = read_capped(requests.get(url, stream=True), MAX_PAGE_BYTES,
+                                       HTML_CONTENT_TYPES, parser.feed_bytes)
+                result = parser.parse(response.content)
+            downloaded += len(response.content)
+        elapsed = time.perf_counter() - started
+        print(f"{mode:>12}: {elapsed / args.repeat * 1000:.1f} ms/page, "
+              f"{downloaded / args.repeat / 1024:.0f} KiB read/page, details={result['details']!r}")
+
+    # An early-stopped download is cached as a prefix: incremental parses reuse
+    # and revalidate it, but it must never be served as the whole page
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ResponseCache(os.path.join(tmp, 'cache.sqlite'))
+        url = f"{server.base_url}/job/cached"
+
+        def incremental():
+            parser = GenericJobParser()
+            response = cache.get(url, max_bytes=MAX_PAGE_BYTES, content_types=HTML_CONTENT_TYPES,
+                                 on_chunk=parser.feed_bytes)
+            return response, parser.parse(response.content)
+
+        first, expected = incremental()
+        for label in ('fresh', 'revalidated'):
+            requests_before = len(server.request_times)
+            response, result = incremental()
+            print(f"Cached prefix ({label}): {len(response.content) / 1024:.0f} KiB, "
+                  f"from_cache={response.from_cache}, 304={response.not_modified}, "
+                  f"{len(server.request_times) - requests_before} requests, "
+                  f"{'same fields' if result == expected else 'DIFFERENT FIELDS'}")
+            cache.ttl = 0  # the next lookup is stale and revalidates
+        response = cache.get(url)
+        cache.close()
+    complete = len(response.content) == len(server.page)
+    print(f"Full-body get after an early stop: {len(response.content) / 1024:.0f} KiB, "
+          f"{'full page OK' if complete else 'TRUNCATED'}")
+    server.shutdown()
+
+
+def synthetic_serp(results, repeat_every=4):
+    """A Google-like results page; every ``repeat_every``-th result repeats an earlier URL"""
+    blocks = []
+    for i in range(results):
+        n = i - 1 if i and i % repeat_every == 0 else i
+        blocks.append(
+            f'<div class="g"><div><div><a href="https://jobs{n}.example.com/job/{n}?utm_source=g">'
+            f'<br><h3 class="LC20lb">Software Engineer &amp; <em>Python</em> {n}</h3>'
+            f'<div><cite>jobs{n}.example.com</cite></div></a></div>'
+            f'<div><a href="https://www.google.com/search?q=related:{n}">Similar</a></div>'
+            f'<div><span>Posted 3 hours ago. Build services in Python.</span></div></div></div>')
+    return ('<html><body><div id="search"><div id="rso">' + '\n'.join(blocks)
+            + '</div></div></body></html>')
+
+
+def bench_serp(args):
+    """Compare the single-pass SERP parser with the div:has(h3) selector (parity, time)"""
+    from parsing import _parse_search_results, _parse_search_results_soup, check_serp_parity
+
+    with open('debug_page.html', encoding='utf-8') as f:
+        pages = {'debug_page.html': f.read(), f'synthetic ({args.results} results)':
+                 synthetic_serp(args.results)}
+    for name, html in pages.items():
+        with contextlib.redirect_stdout(io.StringIO()):
+            fast, reference = check_serp_parity(html)
+            timings = {}
+            for parse in (_parse_search_results_soup, _parse_search_results):
+                started = time.perf_counter()
+                for _ in range(args.repeat):
+                    parse(html)
+                timings[parse.__name__] = (time.perf_counter() - started) / args.repeat * 1000
+        print(f"{name}: {len(html) / 1024:.0f} KiB, {len(fast)} results, "
+              f"{'parity OK' if fast == reference else 'MISMATCH'}")
+        for parser_name, ms in timings.items():
+            print(f"  {parser_name:>28}: {ms:.1f} ms/page")
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True, cwd=REPO_DIR).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_pipeline(name, input_csv, output_csv, args):
+    """Run one process_csv pipeline quietly; returns (ok, failed) URL counts"""
+    if name == 'extra':
+        import extra
+        extra.REQUEST_DELAY = extra.REQUEST_JITTER = 0
+        extra.process_csv(input_csv, output_csv)
+        with open(output_csv, encoding='utf-8', newline='') as f:
+            ok = sum(1 for _ in csv.DictReader(f))
+        return ok, args.urls - ok
+    if name == 'scraper':
+        from extr import JobScraper
+        scraper = JobScraper()
+        scraper.request_delay = 0
+        scraper.process_csv(input_csv, output_csv, max_workers=args.workers,
+                            use_async=args.scraper_mode == 'async',
+                            per_domain_concurrency=args.workers, per_domain_rate=None)
+        with open(output_csv, encoding='utf-8', newline='') as f:
+            failed = sum(1 for row in csv.DictReader(f) if row['error'])
+        return args.urls - failed, failed
+    if name == 'keywords':
+        from job_keyword_extractor import JobKeywordExtractor
+        df = JobKeywordExtractor().process_csv(input_csv, 'url', delay=0)
+        failed = int(df['error'].notna().sum()) if 'error' in df else 0
+        return len(df) - failed, failed
+    if name == 'pipeline':
+        from job_pipeline import JobPipeline
+        JobPipeline(max_workers=args.workers, request_delay=0).process_csv(input_csv, output_csv)
+        with open(output_csv, encoding='utf-8', newline='') as f:
+            failed = sum(1 for row in csv.DictReader(f) if row['error'])
+        return args.urls - failed, failed
+    raise ValueError(f"Unknown pipeline {name}")
+
+
+def previous_result(path, record):
+    """Latest recorded run of the same pipeline with the same parameters"""
+    if not os.path.exists(path):
+        return None
+    match = None
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            old = json.loads(line)
+            if old['pipeline'] == record['pipeline'] and old['params'] == record['params']:
+                match = old
+    return match
+
+
+def bench_pipelines(args):
+    """Drive the process_csv pipelines against the local fake job board"""
+    from fake_job_board import FakeJobBoard, board_urls
+    from metrics import get_metrics
+
+    record_path = os.path.abspath(args.record)
+    board = FakeJobBoard(latency=args.latency, error_rate=args.error_rate,
+                         error_status=args.error_status, body_kb=args.body_kb).start()
+    # requests and aiohttp both send http:// URLs through the proxy from the environment
+    os.environ['HTTP_PROXY'] = os.environ['http_proxy'] = board.proxy_url
+    import extr, extra, job_keyword_extractor, job_pipeline  # noqa: F401 -- configure logging before quieting it
+    logging.getLogger().setLevel(logging.WARNING)
+    cwd = os.getcwd()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)  # fresh caches, memo, journal and logs
+        try:
+            for name in args.pipelines:
+                urls = board_urls(args.urls, prefix=name)
+                input_csv = os.path.join(tmp, f'{name}_urls.csv')
+                write_url_csv(input_csv, urls)
+                metrics = get_metrics()
+                metrics.reset()
+                requests_before, bytes_before = board.requests, board.bytes_sent
+
+                started = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    ok, failed = run_pipeline(name, input_csv, os.path.join(tmp, f'{name}.csv'), args)
+                elapsed = time.perf_counter() - started
+
+                fetch = metrics.to_dict()['stages'].get('fetch', {})
+                record = {
+                    'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                    'revision': git_revision(),
+                    'pipeline': name,
+                    'params': {'urls': args.urls, 'latency': args.latency,
+                               'error_rate': args.error_rate, 'error_status': args.error_status,
+                               'body_kb': args.body_kb, 'workers': args.workers,
+                               'scraper_mode': args.scraper_mode if name == 'scraper' else None},
+                    'elapsed': elapsed,
+                    'urls_per_min': args.urls / elapsed * 60,
+                    'ok': ok,
+                    'failed': failed,
+                    'requests': board.requests - requests_before,
+                    'bytes_served': board.bytes_sent - bytes_before,
+                    'fetch_p50_ms': fetch.get('p50', 0) * 1000,
+                    'fetch_p90_ms': fetch.get('p90', 0) * 1000,
+                }
+                print(f"{name:>9}: {args.urls} URLs in {elapsed:.1f}s ({record['urls_per_min']:.0f} URLs/min), "
+                      f"{ok} ok, {failed} failed, {record['requests']} requests, "
+                      f"fetch p50 {record['fetch_p50_ms']:.0f} ms / p90 {record['fetch_p90_ms']:.0f} ms")
+
+                previous = previous_result(record_path, record)
+                if previous:
+                    change = record['urls_per_min'] / previous['urls_per_min'] - 1
+                    flag = "  REGRESSION" if change < -args.tolerance else ""
+                    print(f"{'':>11}{change:+.1%} throughput vs {previous['revision']} "
+                          f"({previous['timestamp']}){flag}")
+                with open(record_path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(record) + '\n')
+        finally:
+            os.chdir(cwd)
+            board.shutdown()
+
+
+def bench_output(args):
+    """Write and reload keyword results as CSV (stringified lists) and as Parquet"""
+    import ast
+    import random
+    from job_keyword_extractor import JobKeywordExtractor
+    from job_store import is_parquet, open_output, read_output
+
+    keywords = JobKeywordExtractor().keywords
+    fieldnames = ['url', 'title', 'description', *keywords, 'error']
+    rng = random.Random(0)
+    words = re.findall(r'\w+', STAND_IN_PAGE.lower())
+    rows = [{'url': f"https://jobs.example.com/job/{i}", 'title': f"Job {i}",
+             'description': ' '.join(rng.choices(words, k=120)),
+             **{category: [' '.join(rng.choices(words, k=6)) for _ in range(rng.randint(0, 4))]
+                for category in keywords}}
+            for i in range(args.rows)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for path in (os.path.join(tmp, 'keywords.csv'), os.path.join(tmp, 'keywords.parquet')):
+            started = time.perf_counter()
+            with open_output(path, fieldnames, list_fields=keywords) as writer:
+                for row in rows:
+                    writer.write(row)
+            written = time.perf_counter() - started
+            size = (sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+                    if is_parquet(path) else os.path.getsize(path))
+
+            started = time.perf_counter()
+            df = read_output(path, columns=['url', 'skills'])
+            if not is_parquet(path):
+                df['skills'] = df['skills'].map(ast.literal_eval)  # what CSV consumers have to do
+            loaded = time.perf_counter() - started
+            skills = sum(len(value) for value in df['skills'])
+            print(f"{os.path.basename(path):>17}: write {written * 1000:.0f} ms, {size / 1024:.0f} KiB, "
+                  f"load url+skills {loaded * 1000:.0f} ms ({skills} skills)")
+
+
+def bench_parse(args):
+    """JobScraper throughput with parsing in the fetch threads vs on a process pool
+
+    Each configuration scrapes new URLs (cold: every page is parsed), then
+    the same URLs again (warm: pages come from the HTTP cache and the parse
+    memo, so only hashing is left).
+    """
+    from fake_job_board import FakeJobBoard, board_urls
+
+    board = FakeJobBoard(latency=0, body_kb=args.body_kb).start()
+    os.environ['HTTP_PROXY'] = os.environ['http_proxy'] = board.proxy_url
+    from extr import JobScraper  # configures logging, quieted below
+    logging.getLogger().setLevel(logging.WARNING)
+    cwd = os.getcwd()
+    print(f"{os.cpu_count()} CPUs, {args.urls} pages of {args.body_kb} KiB, "
+          f"{args.workers} fetch threads")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)  # fresh caches and memo
+        try:
+            baseline = None
+            for parse_workers in [None] + args.parse_workers:
+                label = 'in threads' if parse_workers is None else f"{parse_workers} processes"
+                # New URLs for every run, so no page is served from the parse memo
+                input_csv = os.path.join(tmp, f'parse_{parse_workers}.csv')
+                write_url_csv(input_csv, board_urls(args.urls, prefix=f'parse{parse_workers}'))
+                rates = []
+                for _ in ('cold', 'warm'):
+                    scraper = JobScraper()
+                    scraper.request_delay = 0
+                    started = time.perf_counter()
+                    scraper.process_csv(input_csv, os.path.join(tmp, f'out_{parse_workers}.csv'),
+                                        max_workers=args.workers, parse_workers=parse_workers)
+                    rates.append(args.urls / (time.perf_counter() - started))
+                baseline = baseline or rates
+                print(f"  {label:>12}: cold {rates[0]:6.1f} pages/s ({rates[0] / baseline[0]:.2f}x), "
+                      f"warm {rates[1]:6.1f} pages/s ({rates[1] / baseline[1]:.2f}x)")
+        finally:
+            os.chdir(cwd)
+            board.shutdown()
+
+
+def load_corpus_descriptions(limit=None):
+    """Read job descriptions from the bundled job_title_des.csv archive"""
+    with zipfile.ZipFile(CORPUS_ZIP) as archive:
+        with archive.open(CORPUS_MEMBER) as raw:
+            reader = csv.DictReader(io.TextIOWrapper(raw, encoding='utf-8'))
+            return [row['Job Description'] for _, row in zip(range(limit or 10**9), reader)]
+
+
+def legacy_extract_keywords(keywords, text, keyword_type):
+    """The original per-keyword regex loop, kept as the benchmark baseline"""
+    text = text.lower()
+    found = []
+    for keyword in keywords[keyword_type]:
+        for match in re.finditer(f"{keyword}[:\\s]+([^.!?]+)", text):
+            found.append(match.group(1).strip())
+    return found
+
+
+def bench_keywords(args):
+    """Compare the single-pass keyword matcher with the per-keyword regexes"""
+    from job_keyword_extractor import JobKeywordExtractor
+
+    extractor = JobKeywordExtractor()
+    docs = load_corpus_descriptions(args.limit)
+
+    started = time.perf_counter()
+    for _ in range(args.repeat):
+        legacy = [{t: legacy_extract_keywords(extractor.keywords, d, t) for t in extractor.keywords}
+                  for d in docs]
+    legacy_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for _ in range(args.repeat):
+        compiled = [extractor.extract_all_keywords(d) for d in docs]
+    compiled_time = time.perf_counter() - started
+
+    mismatches = sum(a != b for a, b in zip(legacy, compiled))
+    print(f"{len(docs)} descriptions x {args.repeat}: per-keyword {legacy_time:.3f}s, "
+          f"single-pass {compiled_time:.3f}s ({legacy_time / compiled_time:.2f}x), "
+          f"{mismatches} mismatching documents")
+
+
+def legacy_extract_technical_skills(taxonomy, text):
+    """The original per-skill regex scan, kept as the benchmark baseline"""
+    skills_found = {}
+    text_lower = text.lower()
+    for category, skills in taxonomy.items():
+        for skill in skills:
+            if re.search(r'\b' + re.escape(skill) + r'\b', text_lower):
+                level_match = re.search(
+                    fr'{re.escape(skill)}.*?(advanced|intermediate|expert|beginner|proficient)',
+                    text_lower)
+                skills_found.setdefault(category, []).append(
+                    {'skill': skill, 'level': level_match.group(1) if level_match else None})
+    return skills_found
+
+
+SAMPLE_RESUME = """Jane Doe
+jane.doe@example.com | +1 (555) 123-4567
+Summary
+Data engineer with six years of experience building pipelines.
+Work Experience
+Senior Data Engineer at Acme Analytics 2019 - present
+Built Kafka and Spark streaming jobs on AWS.
+Software Developer, Initech Systems (2016 - 2019)
+Python Developer @ Globex 2015-2016
+Education
+Master of Science in Computer Science, Stanford University 2013 - 2015
+B.Tech in Electronics from IIT Madras (2009 - 2013)
+Projects
+Streaming ETL: Kafka and Spark pipeline on AWS (advanced)
+  - loads 2 TB/day into BigQuery
+Recommender - TensorFlow model served with Docker and Kubernetes
+Technical Skills
+Python (expert), SQL, Scala, Airflow, Docker
+"""
+
+LEGACY_EDUCATION = re.compile(
+    r'(?P<degree>bachelor|master|ph\.?d|m\.?tech|b\.?tech|mba|msc?|bsc?)\s*(?:in|of)?\s*(?P<field>[\w\s]+)\s*'
+    r'(?:at|from|,)\s*(?P<institution>[^\n]+?)\s*'
+    r'(?P<year>\(?\d{4}\s*[-–]\s*(?:\d{4}|present|current)\)?)',
+    re.IGNORECASE)
+LEGACY_EXPERIENCE = re.compile(
+    r'(?P<title>[A-Z][\w\s]+(?:Engineer|Developer|Analyst|Scientist|Manager))\s*'
+    r'(?:at|@|,)\s*(?P<company>[^\n,;]+?)\s*'
+    r'(?P<duration>\(?\d{4}\s*[-–]\s*(?:\d{4}|present|current)\)?)',
+    re.IGNORECASE)
+LEGACY_EMAIL = re.compile(r'[\w\.-]+@[\w\.-]+\.[a-zA-Z]{2,}')
+
+
+def legacy_resume_entries(text):
+    """The original whole-text resume regexes, kept as the benchmark baseline"""
+    education = [(m.group('degree').title(), m.group('field').strip().title(),
+                  m.group('institution'), m.group('year')) for m in LEGACY_EDUCATION.finditer(text)]
+    experience = [(m.group('title'), m.group('company').strip(), m.group('duration'))
+                  for m in LEGACY_EXPERIENCE.finditer(text)]
+    sections = re.split(r'\n\s*(?:projects|work experience|experience)\s*\n', text, flags=re.IGNORECASE)
+    items = re.split(r'\n\s*(?=\w)', sections[1]) if len(sections) > 1 else []
+    email = LEGACY_EMAIL.search(text)
+    return education, experience, items, email.group() if email else None
+
+
+def resume_entries(text):
+    from resume import (extract_contact_info, extract_education, extract_projects,
+                        extract_work_experience, segment_resume)
+    sections = segment_resume(text)
+    education = [(e['degree'], e['field'], e['institution'], e['duration'])
+                 for e in extract_education(text, sections)]
+    experience = [(e['position'], e['company'], e['duration'])
+                  for e in extract_work_experience(text, sections)]
+    return (education, experience, extract_projects(text, sections),
+            extract_contact_info(text)['email'])
+
+
+# Inputs on which the original patterns backtrack, as functions of a size in characters
+PATHOLOGICAL_RESUMES = {
+    'degree words': lambda n: 'master ' * (n // 7),
+    'title words': lambda n: 'senior engineer ' * (n // 16),
+    'blank lines': lambda n: 'Projects\n' + ' \n' * (n // 2),
+    'long token': lambda n: 'a' * n,
+}
+
+
+def bench_resume(args):
+    """Time the resume extractors on pathological inputs of doubling size (linearity)"""
+    from resume import segment_resume
+
+    entries = resume_entries(SAMPLE_RESUME)
+    legacy = legacy_resume_entries(SAMPLE_RESUME)
+    print(f"Sample resume sections: {[section[0] for section in segment_resume(SAMPLE_RESUME)]}")
+    print(f"  education:  {entries[0]}\n    original: {legacy[0]}")
+    print(f"  experience: {entries[1]}\n    original: {legacy[1]}")
+    print(f"  projects:   {[p['name'] for p in entries[2]]}, email: {entries[3]}")
+
+    sizes = [args.start * 2 ** i for i in range(args.steps)]
+    for name, make in PATHOLOGICAL_RESUMES.items():
+        print(f"{name}:")
+        previous = None
+        legacy_skipped = False
+        for size in sizes:
+            text = make(size)
+            started = time.perf_counter()
+            resume_entries(text)
+            elapsed = time.perf_counter() - started
+            growth = f" (x{elapsed / previous:.1f})" if previous else ""
+            line = f"  {len(text):>9} chars: segmented {elapsed * 1000:8.1f} ms{growth}"
+            if not legacy_skipped:
+                started = time.perf_counter()
+                legacy_resume_entries(text)
+                legacy_elapsed = time.perf_counter() - started
+                line += f", original {legacy_elapsed * 1000:9.1f} ms"
+                legacy_skipped = legacy_elapsed > args.legacy_budget
+            print(line)
+            previous = elapsed
+
+
+def bench_skills(args):
+    """Compare batch skill extraction with the per-skill regex scan"""
+    from resume import TECH_SKILLS, extract_skills_batch
+
+    docs = load_corpus_descriptions(args.limit)
+
+    started = time.perf_counter()
+    legacy = [legacy_extract_technical_skills(TECH_SKILLS, d) for d in docs]
+    legacy_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    matrix = extract_skills_batch(docs)
+    batch_time = time.perf_counter() - started
+
+    same_skills = sum(
+        {s['skill'] for ss in old.values() for s in ss} == set(matrix.row(i))
+        for i, old in enumerate(legacy))
+    top = sorted(matrix.skill_counts().items(), key=lambda kv: -kv[1])[:5]
+    print(f"{len(docs)} documents: per-skill regex {legacy_time:.3f}s, "
+          f"batch {batch_time:.3f}s ({legacy_time / batch_time:.2f}x), "
+          f"{len(matrix.indices)} non-zeros, identical skill sets for {same_skills}")
+    print("Most demanded:", ", ".join(f"{skill} ({count})" for skill, count in top))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmarks for the scraping pipeline")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    fetch = sub.add_parser('fetch', help=bench_fetch.__doc__)
+    fetch.add_argument('--urls', type=int, default=500)
+    fetch.add_argument('--domains', type=int, default=20)
+    fetch.add_argument('--latency', type=float, default=0.05)
+    fetch.add_argument('--rate', type=float, default=5.0, help="max requests/s per domain")
+    fetch.add_argument('--max-connections', type=int, default=100)
+    fetch.add_argument('--per-domain-concurrency', type=int, default=2)
+    fetch.add_argument('--modes', nargs='+', default=['threads', 'async'],
+                       choices=['threads', 'async'])
+    fetch.set_defaults(func=bench_fetch)
+
+    keywords = sub.add_parser('keywords', help=bench_keywords.__doc__)
+    keywords.add_argument('--limit', type=int, default=None)
+    keywords.add_argument('--repeat', type=int, default=3)
+    keywords.set_defaults(func=bench_keywords)
+
+    skills = sub.add_parser('skills', help=bench_skills.__doc__)
+    skills.add_argument('--limit', type=int, default=None)
+    skills.set_defaults(func=bench_skills)
+
+    resume = sub.add_parser('resume', help=bench_resume.__doc__)
+    resume.add_argument('--start', type=int, default=10000, help="smallest input in characters")
+    resume.add_argument('--steps', type=int, default=6, help="input size doublings")
+    resume.add_argument('--legacy-budget', type=float, default=5.0,
+                        help="stop timing the original patterns once a run takes this long (s)")
+    resume.set_defaults(func=bench_resume)
+
+    generic = sub.add_parser('generic', help=bench_generic.__doc__)
+    generic.add_argument('--page-kb', type=int, default=3000, help="size of the bloated page")
+    generic.add_argument('--repeat', type=int, default=5)
+    generic.set_defaults(func=bench_generic)
+
+    serp = sub.add_parser('serp', help=bench_serp.__doc__)
+    serp.add_argument('--results', type=int, default=200, help="results on the synthetic page")
+    serp.add_argument('--repeat', type=int, default=10)
+    serp.set_defaults(func=bench_serp)
+
+    parse = sub.add_parser('parse', help=bench_parse.__doc__)
+    parse.add_argument('--urls', type=int, default=600)
+    parse.add_argument('--body-kb', type=int, default=300, help="pad pages to this size")
+    parse.add_argument('--workers', type=int, default=16, help="fetch threads")
+    parse.add_argument('--parse-workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parse.set_defaults(func=bench_parse)
+
+    transport = sub.add_parser('transport', help=bench_transport.__doc__)
+    transport.add_argument('--urls', type=int, default=2000)
+    transport.add_argument('--hosts', type=int, default=10)
+    transport.add_argument('--threads', type=int, default=8)
+    transport.set_defaults(func=bench_transport)
+
+    output = sub.add_parser('output', help=bench_output.__doc__)
+    output.add_argument('--rows', type=int, default=50000)
+    output.set_defaults(func=bench_output)
+
+    pipelines = sub.add_parser('pipelines', help=bench_pipelines.__doc__)
+    pipelines.add_argument('--urls', type=int, default=1000)
+    pipelines.add_argument('--pipelines', nargs='+', default=['extra', 'scraper', 'keywords'],
+                           choices=['extra', 'scraper', 'keywords', 'pipeline'])
+    pipelines.add_argument('--latency', type=float, default=0.02)
+    pipelines.add_argument('--error-rate', type=float, default=0.0)
+    pipelines.add_argument('--error-status', type=int, default=503)
+    pipelines.add_argument('--body-kb', type=int, default=None, help="pad pages to this size")
+    pipelines.add_argument('--workers', type=int, default=5, help="JobScraper and JobPipeline workers")
+    pipelines.add_argument('--scraper-mode', choices=['threads', 'async'], default='threads')
+    pipelines.add_argument('--record', default=PIPELINE_RESULTS,
+                           help="JSON lines file runs are appended to and compared against")
+    pipelines.add_argument('--tolerance', type=float, default=0.1,
+                           help="throughput drop flagged as a regression")
+    pipelines.set_defaults(func=bench_pipelines)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+import argparse
+import csv
+import io
+import os
+import sys
+import time
+import zipfile
+from collections import Counter, defaultdict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+CORPUS_ZIP = 'archive (1).zip'
+CORPUS_MEMBER = 'job_title_des.csv'
+TITLE_COLUMN = 'Job Title'
+TEXT_COLUMN = 'Job Description'
+CHUNK_ROWS = 500  # rows per task sent to a worker
+CHUNKS_PER_WORKER = 2  # chunks queued per worker; bounds the rows held in memory
+
+csv.field_size_limit(min(sys.maxsize, 2 ** 31 - 1))  # descriptions can be long
+
+
+def normalize_title(title):
+    return ' '.join((title or '').lower().split())
+
+
+class CorpusStats:
+    """Mergeable per-title counts: jobs, skill mentions and keyword categories.
+
+    ``skills[title][skill]`` and ``keywords[title][category]`` count the
+    jobs with that title whose description mentions the skill or has a
+    capture for the keyword category. Partial stats from separate chunks
+    merge into the stats of the whole corpus, in any order.
+    """
+
+    def __init__(self):
+        self.jobs = Counter()
+        self.skills = defaultdict(Counter)
+        self.keywords = defaultdict(Counter)
+
+    def add(self, title, skills, keyword_categories):
+        title = normalize_title(title)
+        self.jobs[title] += 1
+        self.skills[title].update(skills)
+        self.keywords[title].update(keyword_categories)
+
+    def merge(self, other):
+        self.jobs.update(other.jobs)
+        for title, counts in other.skills.items():
+            self.skills[title].update(counts)
+        for title, counts in other.keywords.items():
+            self.keywords[title].update(counts)
+        return self
+
+    @property
+    def total_jobs(self):
+        return sum(self.jobs.values())
+
+    def skill_demand(self):
+        """Jobs mentioning each skill across all titles"""
+        total = Counter()
+        for counts in self.skills.values():
+            total.update(counts)
+        return total
+
+    def top_titles(self, n=10, min_jobs=1):
+        return [(title, jobs) for title, jobs in self.jobs.most_common(n) if jobs >= min_jobs]
+
+    def rows(self, min_jobs=1):
+        """Flat rows (title, jobs, kind, name, count, share) for output files"""
+        for title, jobs in self.jobs.most_common():
+            if jobs < min_jobs:
+                break
+            for kind, counts in (('skill', self.skills[title]), ('keyword', self.keywords[title])):
+                for name, count in counts.most_common():
+                    yield {'title': title, 'jobs': jobs, 'kind': kind, 'name': name,
+                           'count': count, 'share': round(count / jobs, 4)}
+
+
+def iter_chunks(path=CORPUS_ZIP, member=CORPUS_MEMBER, chunk_rows=CHUNK_ROWS,
+                title_column=TITLE_COLUMN, text_column=TEXT_COLUMN):
+    """Stream [(title, text)] chunks from a CSV, or a CSV member of a zip archive
+
+    Rows are decoded and parsed as the file is read, so only one chunk is
+    held at a time however large the corpus is.
+    """
+    with _open_corpus(path, member) as raw:
+        reader = csv.DictReader(io.TextIOWrapper(raw, encoding='utf-8', newline=''))
+        chunk = []
+        for row in reader:
+            chunk.append((row.get(title_column) or '', row.get(text_column) or ''))
+            if len(chunk) >= chunk_rows:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+
+class _open_corpus:
+    """Binary file object for a CSV or for a CSV member of a zip archive"""
+
+    def __init__(self, path, member=None):
+        self.archive = zipfile.ZipFile(path) if zipfile.is_zipfile(path) else None
+        if self.archive:
+            self.file = self.archive.open(member or self.archive.namelist()[0])
+        else:
+            self.file = open(path, 'rb')
+
+    def __enter__(self):
+        return self.file
+
+    def __exit__(self, *exc):
+        self.file.close()
+        if self.archive:
+            self.archive.close()
+
+
+_matchers = None
+
+
+def _get_matchers():
+    """SkillIndex and KeywordMatcher, built once per (worker) process"""
+    global _matchers
+    if _matchers is None:
+        from job_keyword_extractor import JobKeywordExtractor, KeywordMatcher
+        from resume import SKILL_INDEX
+        _matchers = SKILL_INDEX, KeywordMatcher(JobKeywordExtractor().keywords)
+    return _matchers
+
+
+def analyze_chunk(chunk):
+    """CorpusStats for one chunk of (title, text) rows"""
+    skill_index, keyword_matcher = _get_matchers()
+    stats = CorpusStats()
+    for title, text in chunk:
+        skills = [skill_index.columns[column][1] for column in skill_index.match(text)]
+        categories = [category for category, captures in keyword_matcher.match_all(text).items()
+                      if captures]
+        stats.add(title, skills, categories)
+    return stats
+
+
+def analyze_corpus(path=CORPUS_ZIP, member=CORPUS_MEMBER, workers=None, chunk_rows=CHUNK_ROWS,
+                   title_column=TITLE_COLUMN, text_column=TEXT_COLUMN):
+    """Skill and keyword demand per job title over a whole corpus
+
+    Chunks are analyzed on ``workers`` processes (os.cpu_count() if None;
+    1 runs in this process) and merged as they finish. At most
+    CHUNKS_PER_WORKER chunks per worker are read ahead, so memory does not
+    grow with the corpus, only with the number of distinct titles.
+    """
+    chunks = iter_chunks(path, member, chunk_rows, title_column, text_column)
+    stats = CorpusStats()
+    if workers == 1:
+        for chunk in chunks:
+            stats.merge(analyze_chunk(chunk))
+        return stats
+
+    workers = workers or os.cpu_count()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = set()
+        for chunk in chunks:
+            if len(pending) >= workers * CHUNKS_PER_WORKER:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stats.merge(future.result())
+            pending.add(executor.submit(analyze_chunk, chunk))
+        for future in pending:
+            stats.merge(future.result())
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Skill and keyword demand per job title in a job corpus")
+    parser.add_argument('corpus', nargs='?', default=CORPUS_ZIP, help="CSV, or zip archive holding one")
+    parser.add_argument('--member', default=None, help=f"CSV inside the zip (default {CORPUS_MEMBER})")
+    parser.add_argument('--workers', type=int, default=None, help="processes (1: no pool)")
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS)
+    parser.add_argument('--title-column', default=TITLE_COLUMN)
+    parser.add_argument('--text-column', default=TEXT_COLUMN)
+    parser.add_argument('--top', type=int, default=10, help="titles to print")
+    parser.add_argument('--min-jobs', type=int, default=1, help="titles with fewer jobs are not written")
+    parser.add_argument('--output', help="write (title, kind, name, count) rows to a CSV or *.parquet")
+    args = parser.parse_args()
+
+    member = args.member or (CORPUS_MEMBER if args.corpus == CORPUS_ZIP else None)
+    started = time.perf_counter()
+    stats = analyze_corpus(args.corpus, member, args.workers, args.chunk_rows,
+                           args.title_column, args.text_column)
+    elapsed = time.perf_counter() - started
+    print(f"{stats.total_jobs} jobs, {len(stats.jobs)} titles in {elapsed:.1f}s "
+          f"({stats.total_jobs / elapsed:.0f} jobs/s)")
+    print("Most demanded skills:", ", ".join(
+        f"{skill} ({count})" for skill, count in stats.skill_demand().most_common(10)))
+    for title, jobs in stats.top_titles(args.top, args.min_jobs):
+        skills = ", ".join(f"{skill} {count / jobs:.0%}"
+                           for skill, count in stats.skills[title].most_common(5))
+        print(f"  {title} ({jobs} jobs): {skills}")
+
+    if args.output:
+        from job_store import open_output
+        fieldnames = ['title', 'jobs', 'kind', 'name', 'count', 'share']
+        # A snapshot of the whole corpus: replace earlier results rather than add to them
+        with open_output(args.output, fieldnames, overwrite=True) as writer:
+            for row in stats.rows(args.min_jobs):
+                writer.write(row)
+        print(f"Saved to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,182 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_PATH = 'crawl_journal.sqlite'
+MAX_RETRIES = 3
+
+# URL states
+PENDING = 'pending'
+FETCHED = 'fetched'
+PARSED = 'parsed'
+FAILED = 'failed'
+
+
+class CrawlJournal:
+    """Durable per-URL crawl state so interrupted runs can resume.
+
+    Each scraping pipeline (``job``) records every URL as pending, fetched,
+    parsed or failed (with the reason and retry count) in a local SQLite
+    file. Every transition is committed immediately, so after a crash or
+    Ctrl-C a restarted run skips parsed URLs, redoes the ones that were in
+    flight and retries failures until ``max_retries`` is reached.
+
+    Runs that write an output file call begin() and finish(): only a run
+    that was interrupted is resumed, and only into the same output.
+    """
+
+    def __init__(self, job, path=JOURNAL_PATH, max_retries=MAX_RETRIES):
+        self.job = job
+        self.path = path
+        self.max_retries = max_retries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS crawl (
+                job TEXT NOT NULL,
+                url TEXT NOT NULL,
+                state TEXT NOT NULL,
+                retries INTEGER NOT NULL DEFAULT 0,
+                reason TEXT,
+                result TEXT,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (job, url)
+            )""")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS runs (
+                job TEXT PRIMARY KEY,
+                output TEXT NOT NULL,
+                finished INTEGER NOT NULL DEFAULT 0,
+                started_at REAL NOT NULL
+            )""")
+        self._conn.commit()
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            self._conn.execute(sql, params)
+            self._conn.commit()
+
+    def add(self, urls):
+        """Register URLs as pending (already known URLs keep their state)"""
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO crawl (job, url, state, updated_at) VALUES (?, ?, ?, ?)",
+                [(self.job, url, PENDING, now) for url in urls])
+            self._conn.commit()
+
+    def has_progress(self):
+        """True if an earlier run of this job completed at least one URL"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM crawl WHERE job = ? AND state IN (?, ?) LIMIT 1",
+                (self.job, PARSED, FAILED)).fetchone()
+        return row is not None
+
+    def begin(self, output):
+        """Start a run writing to ``output``; returns True if it resumes an interrupted run
+
+        A run resumes when this job's previous run wrote to the same
+        output, did not finish, and the output still exists. Otherwise the
+        job's URL states are cleared, so a new, deleted or already complete
+        output gets every URL again.
+        """
+        output = os.path.abspath(output)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT output, finished FROM runs WHERE job = ?", (self.job,)).fetchone()
+        # Journals from before runs were recorded resume as they used to
+        same_run = row is None or (row[0] == output and not row[1])
+        resuming = same_run and self.has_progress() and os.path.exists(output)
+        with self._lock:
+            if not resuming:
+                self._conn.execute("DELETE FROM crawl WHERE job = ?", (self.job,))
+            self._conn.execute("INSERT OR REPLACE INTO runs VALUES (?, ?, 0, ?)",
+                               (self.job, output, time.time()))
+            self._conn.commit()
+        if resuming:
+            logger.info(f"Crawl journal: resuming the interrupted '{self.job}' run into {output}")
+        return resuming
+
+    def finish(self):
+        """Mark the current run complete; the next begin() starts afresh"""
+        self._execute("UPDATE runs SET finished = 1 WHERE job = ?", (self.job,))
+
+    def todo(self, urls):
+        """Filter ``urls`` down to those that still need work, in input order"""
+        self.add(urls)
+        with self._lock:
+            done = {url for url, in self._conn.execute(
+                "SELECT url FROM crawl WHERE job = ? AND (state = ? OR (state = ? AND retries >= ?))",
+                (self.job, PARSED, FAILED, self.max_retries))}
+        remaining = [url for url in urls if url not in done]
+        skipped = len(urls) - len(remaining)
+        if skipped:
+            logger.info(f"Crawl journal: resuming '{self.job}', skipping {skipped} completed URLs")
+        return remaining
+
+    def needs_work(self, url):
+        """Register ``url`` if new and report whether it still needs processing"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO crawl (job, url, state, updated_at) VALUES (?, ?, ?, ?)",
+                (self.job, url, PENDING, time.time()))
+            self._conn.commit()
+            state, retries = self._conn.execute(
+                "SELECT state, retries FROM crawl WHERE job = ? AND url = ?",
+                (self.job, url)).fetchone()
+        return not (state == PARSED or (state == FAILED and retries >= self.max_retries))
+
+    def mark_fetched(self, url):
+        self._execute(
+            "UPDATE crawl SET state = ?, updated_at = ? WHERE job = ? AND url = ?",
+            (FETCHED, time.time(), self.job, url))
+
+    def mark_parsed(self, url, result=None):
+        self._execute(
+            "UPDATE crawl SET state = ?, reason = NULL, result = ?, updated_at = ? "
+            "WHERE job = ? AND url = ?",
+            (PARSED, json.dumps(result) if result is not None else None,
+             time.time(), self.job, url))
+
+    def mark_failed(self, url, reason, result=None):
+        self._execute(
+            "UPDATE crawl SET state = ?, retries = retries + 1, reason = ?, result = ?, "
+            "updated_at = ? WHERE job = ? AND url = ?",
+            (FAILED, str(reason), json.dumps(result) if result is not None else None,
+             time.time(), self.job, url))
+
+    def result(self, url):
+        """Stored result for ``url``, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT result FROM crawl WHERE job = ? AND url = ?", (self.job, url)).fetchone()
+        return json.loads(row[0]) if row and row[0] else None
+
+    def results(self, urls):
+        """Stored results for the given URLs, as {url: result}"""
+        wanted = set(urls)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT url, result FROM crawl WHERE job = ? AND result IS NOT NULL",
+                (self.job,)).fetchall()
+        return {url: json.loads(result) for url, result in rows if url in wanted}
+
+    def summary(self):
+        """Number of URLs in each state"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT state, COUNT(*) FROM crawl WHERE job = ? GROUP BY state",
+                (self.job,)).fetchall()
+        return dict(rows)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,286 @@
+import argparse
+import hashlib
+import logging
+import re
+import sqlite3
+import sys
+import threading
+import time
+import zlib
+from collections import Counter
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEDUP_PATH = 'dedup.sqlite'
+NUM_PERM = 128  # MinHash permutations per signature
+BANDS = 16  # LSH bands of NUM_PERM // BANDS rows; pairs above ~0.7 Jaccard nearly always share one
+THRESHOLD = 0.8  # estimated Jaccard similarity at which two descriptions are the same posting
+SHINGLE_SIZE = 5  # words per shingle
+MIN_WORDS = 20  # shorter texts ("No details available") are never clustered
+MAX_CANDIDATES = 50  # candidates compared per document, most shared bands first
+PRIME = (1 << 31) - 1
+
+_WORD = re.compile(r'\w+')
+
+
+def shingles(text, size=SHINGLE_SIZE):
+    """Set of overlapping ``size``-word shingles of the lowercased text"""
+    words = _WORD.findall(text.lower())
+    return {' '.join(words[i:i + size]) for i in range(max(len(words) - size + 1, 1))}
+
+
+def cluster_key(key):
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()[:12]
+
+
+def text_digest(text):
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]
+
+
+class MinHasher:
+    """MinHash signatures from ``num_perm`` universal hash functions.
+
+    Shingles are hashed with CRC32 and permuted as ``(a * x + b) mod p``
+    for all permutations at once with numpy.
+    """
+
+    def __init__(self, num_perm=NUM_PERM, seed=1):
+        rng = np.random.RandomState(seed)
+        self.num_perm = num_perm
+        self.a = rng.randint(1, PRIME, size=(num_perm, 1)).astype(np.uint64)
+        self.b = rng.randint(0, PRIME, size=(num_perm, 1)).astype(np.uint64)
+
+    def signature(self, text):
+        hashes = np.fromiter((zlib.crc32(s.encode('utf-8')) for s in shingles(text)),
+                             dtype=np.uint64)
+        # a < 2**31 and x < 2**32, so a * x + b fits in 64 bits
+        return ((self.a * hashes + self.b) % PRIME).min(axis=1).astype(np.uint32)
+
+
+def similarity(sig1, sig2):
+    """Estimated Jaccard similarity of the texts behind two signatures"""
+    return float(np.count_nonzero(sig1 == sig2)) / len(sig1)
+
+
+class DuplicateIndex:
+    """Near-duplicate clusters of job descriptions, persisted across runs.
+
+    Each description is MinHashed and its signature split into ``bands``;
+    descriptions sharing a band are candidates and join the cluster of the
+    most similar candidate at or above ``threshold``. Lookups touch only
+    the matching buckets, so the cost per document does not grow with the
+    number indexed. A cluster's ID is derived from its first document's
+    key, and a key keeps its cluster when seen again with the same text;
+    a key whose text changed is signed and clustered again.
+    """
+
+    def __init__(self, path=DEDUP_PATH, threshold=THRESHOLD, num_perm=NUM_PERM, bands=BANDS,
+                 seed=1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.path = path
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.hasher = MinHasher(num_perm, seed)
+        self.stats = {'documents': 0, 'updated': 0, 'duplicates': 0, 'comparisons': 0}
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS documents (
+                key TEXT PRIMARY KEY,
+                cluster_id TEXT NOT NULL,
+                signature BLOB NOT NULL,
+                digest TEXT
+            )""")
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(documents)")]
+        if 'digest' not in columns:
+            # Indexes from before edited texts were tracked; filled in as keys come back
+            self._conn.execute("ALTER TABLE documents ADD COLUMN digest TEXT")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS buckets (
+                band INTEGER NOT NULL,
+                bucket BLOB NOT NULL,
+                key TEXT NOT NULL
+            )""")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS buckets_lookup ON buckets (band, bucket)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS buckets_key ON buckets (key)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS settings (name TEXT PRIMARY KEY, value TEXT)")
+        self._check_settings(f"{num_perm}/{bands}/{seed}/{SHINGLE_SIZE}")
+        self._conn.commit()
+
+    def _check_settings(self, version):
+        # Signatures from other hash settings are not comparable
+        row = self._conn.execute("SELECT value FROM settings WHERE name = 'minhash'").fetchone()
+        if row and row[0] != version:
+            logger.info(f"Duplicate index: MinHash settings changed, dropping {self.path}")
+            self._conn.execute("DELETE FROM documents")
+            self._conn.execute("DELETE FROM buckets")
+        self._conn.execute("INSERT OR REPLACE INTO settings VALUES ('minhash', ?)", (version,))
+
+    def assign(self, key, text):
+        """Cluster a document; returns (cluster_id, is_duplicate).
+
+        ``is_duplicate`` is true when the document joined a cluster started
+        by another key. Texts under MIN_WORDS words get a cluster of their own.
+        """
+        if not text or len(_WORD.findall(text)) < MIN_WORDS:
+            with self._lock:
+                if self._forget(key):  # an edit emptied a posting
+                    self._conn.commit()
+            return cluster_key(key), False
+        digest = text_digest(text)
+        signature = self.hasher.signature(text)
+        buckets = [signature[i * self.rows:(i + 1) * self.rows].tobytes()
+                   for i in range(self.bands)]
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT cluster_id, signature, digest FROM documents WHERE key = ?",
+                (key,)).fetchone()
+            if row:
+                known_id, stored, stored_digest = row
+                if stored_digest == digest or (stored_digest is None
+                                               and stored == signature.tobytes()):
+                    if stored_digest is None:
+                        self._conn.execute("UPDATE documents SET digest = ? WHERE key = ?",
+                                           (digest, key))
+                        self._conn.commit()
+                    return known_id, known_id != cluster_key(key)
+                # Edited since it was indexed: drop the old signature and cluster it again
+                self._forget(key)
+
+            shared = Counter()
+            for band, bucket in enumerate(buckets):
+                shared.update(other for (other,) in self._conn.execute(
+                    "SELECT key FROM buckets WHERE band = ? AND bucket = ?", (band, bucket)))
+            best, best_score = None, self.threshold
+            for other, _ in shared.most_common(MAX_CANDIDATES):
+                cluster_id, stored = self._conn.execute(
+                    "SELECT cluster_id, signature FROM documents WHERE key = ?", (other,)).fetchone()
+                score = similarity(signature, np.frombuffer(stored, dtype=np.uint32))
+                self.stats['comparisons'] += 1
+                if score >= best_score:
+                    best, best_score = cluster_id, score
+
+            cluster_id = best or cluster_key(key)
+            self._conn.execute("INSERT INTO documents VALUES (?, ?, ?, ?)",
+                               (key, cluster_id, signature.tobytes(), digest))
+            self._conn.executemany("INSERT INTO buckets VALUES (?, ?, ?)",
+                                   [(band, bucket, key) for band, bucket in enumerate(buckets)])
+            self._conn.commit()
+            if row:
+                self.stats['updated'] += 1
+            else:
+                self.stats['documents'] += 1
+                self.stats['duplicates'] += best is not None
+        # A key that founded its cluster may be matched back into it after an edit
+        return cluster_id, cluster_id != cluster_key(key)
+
+    def _forget(self, key):
+        """Drop a key's document and buckets; the caller holds the lock and commits"""
+        if not self._conn.execute("DELETE FROM documents WHERE key = ?", (key,)).rowcount:
+            return False
+        self._conn.execute("DELETE FROM buckets WHERE key = ?", (key,))
+        return True
+
+    def summary(self):
+        with self._lock:
+            documents, clusters = self._conn.execute(
+                "SELECT COUNT(*), COUNT(DISTINCT cluster_id) FROM documents").fetchone()
+        return {'documents': documents, 'clusters': clusters, 'duplicates': documents - clusters}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_default_index = None
+_default_lock = threading.Lock()
+
+
+def get_dedup():
+    """Return the duplicate index shared by all pipelines, opening it on first use"""
+    global _default_index
+    with _default_lock:
+        if _default_index is None:
+            _default_index = DuplicateIndex()
+    return _default_index
+
+
+def exact_pairs(texts, threshold=THRESHOLD):
+    """Pairs of texts whose true shingle Jaccard similarity reaches the threshold (quadratic)"""
+    sets = [shingles(text) if len(_WORD.findall(text)) >= MIN_WORDS else None for text in texts]
+    pairs = set()
+    for i, a in enumerate(sets):
+        if a is None:
+            continue
+        for j in range(i + 1, len(sets)):
+            b = sets[j]
+            if b is not None and len(a & b) >= threshold * len(a | b):
+                pairs.add((i, j))
+    return pairs
+
+
+def check_edited_posting():
+    """A posting whose text is edited moves to the cluster its new text matches"""
+    words = [f"word{i}" for i in range(2 * MIN_WORDS * SHINGLE_SIZE)]
+    first, second = ' '.join(words[:len(words) // 2]), ' '.join(words[len(words) // 2:])
+    index = DuplicateIndex(':memory:')
+    index.assign('a', first)
+    index.assign('b', second)
+    results = [index.assign('c', first),  # a copy of a
+               index.assign('c', second),  # edited into a copy of b
+               index.assign('c', second),  # seen again unchanged
+               index.assign('c', "No details available")]
+    remaining = index.summary()['documents']
+    index.close()
+    return results == [(cluster_key('a'), True), (cluster_key('b'), True),
+                       (cluster_key('b'), True), (cluster_key('c'), False)] and remaining == 2
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cluster near-duplicate job descriptions")
+    parser.add_argument('--limit', type=int, default=None, help="descriptions to read from the corpus")
+    parser.add_argument('--threshold', type=float, default=THRESHOLD)
+    parser.add_argument('--check', action='store_true',
+                        help="compare with exact all-pairs Jaccard (quadratic, use a small --limit)")
+    args = parser.parse_args()
+
+    from benchmarks import load_corpus_descriptions
+    texts = load_corpus_descriptions(args.limit)
+    index = DuplicateIndex(':memory:', threshold=args.threshold)
+    clusters = []
+    started = time.perf_counter()
+    for i, text in enumerate(texts):
+        clusters.append(index.assign(str(i), text)[0])
+        if (i + 1) % 1000 == 0:
+            print(f"  {i + 1} documents, {(time.perf_counter() - started) / (i + 1) * 1000:.2f} ms/doc")
+    elapsed = time.perf_counter() - started
+    summary = index.summary()
+    print(f"{len(texts)} descriptions in {elapsed:.1f}s ({elapsed / len(texts) * 1000:.2f} ms/doc): "
+          f"{summary['clusters']} clusters, {summary['duplicates']} duplicates, "
+          f"{index.stats['comparisons']} signature comparisons")
+    for cluster_id, size in Counter(clusters).most_common(3):
+        if size > 1:
+            first = texts[clusters.index(cluster_id)]
+            print(f"  cluster {cluster_id}: {size} documents, e.g. {first[:80]!r}")
+
+    if args.check:
+        edits_ok = check_edited_posting()
+        print(f"Edited posting re-clustered: {'OK' if edits_ok else 'FAILED'}")
+        expected = exact_pairs(texts, args.threshold)
+        same = {(i, j) for i in range(len(texts)) for j in range(i + 1, len(texts))
+                if clusters[i] == clusters[j]}
+        found = len(expected & same)
+        print(f"Exact pairs: {len(expected)}, clustered together: {found} "
+              f"(recall {found / len(expected) if expected else 1:.1%}), "
+              f"clustered pairs below threshold: {len(same - expected)}")
+        if not edits_ok:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,12 +1,23 @@
+import asyncio
 import csv
-import requests
-from bs4 import BeautifulSoup
+import multiprocessing
+import os
 from urllib.parse import urlparse
 import time
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 import logging
-from fake_useragent import UserAgent
 import json
+from async_fetcher import AsyncFetcher
+from http_cache import get_cache
+from host_health import get_health
+from parse_memo import config_version, get_memo, memoize
+from crawl_journal import CrawlJournal, JOURNAL_PATH
+from extraction_plan import ExtractionPlan, extract_in_process
+from site_adapters import REGISTRY
+from job_store import open_output
+from dedup import get_dedup
+from metrics import get_metrics
+from transport import get_transport
 
 # Configure logging
 logging.basicConfig(
@@ -18,39 +29,30 @@ logging.basicConfig(
     ]
 )
 
+# Site adapters (site_adapters.REGISTRY) whose selectors JobScraper uses
+SCRAPER_SITES = ('indeed', 'linkedin', 'glassdoor')
+PARSE_BACKLOG = 2  # pages waiting per parse worker when the async engine feeds the pool
+
 class JobScraper:
     def __init__(self):
-        self.ua = UserAgent()
-        self.session = requests.Session()
-        self.session.headers.update({
-            'Accept-Language': 'en-US,en;q=0.9',
-            'Accept-Encoding': 'gzip, deflate, br',
-            'Connection': 'keep-alive',
-        })
+        self.transport = get_transport()
+        self.cache = get_cache()
+        self.health = get_health()
+        self.journal = None  # set by process_csv when resuming is enabled
+        self.parsers = None  # process pool pages are parsed on (see process_csv parse_workers)
+        self.parse_workers = 0
+        self._sites = {}  # domain -> site_selectors key
+        self._plans = {}  # site_selectors key -> ExtractionPlan
+        self.metrics = get_metrics()
+        self.dedup = get_dedup()
+        self.request_delay = 1  # seconds each worker waits before a request
+        self.session = self.transport.session  # pooled per host, shared with the other fetchers
         
-        # Domain-specific selectors (can be extended)
+        # Domain-specific selectors, from the shared site adapters (can be extended)
         self.site_selectors = {
-            'indeed.com': {
-                'title': 'h1.jobsearch-JobInfoHeader-title',
-                'company': 'div[data-company-name="true"] a',
-                'experience': 'div#jobDetailsSection div:contains("Experience") + div',
-                'salary': 'div#salaryInfoAndJobType span',
-                'description': 'div#jobDescriptionText',
-            },
-            'linkedin.com': {
-                'title': 'h1.top-card-layout__title',
-                'company': 'a.topcard__org-name-link',
-                'experience': 'li.description__job-criteria-item:contains("Experience") span',
-                'salary': 'li.description__job-criteria-item:contains("Salary") span',
-                'description': 'div.show-more-less-html__markup',
-            },
-            'glassdoor.com': {
-                'title': 'div.jobTitle h1',
-                'company': 'div.employerName',
-                'experience': 'div.jobDescriptionContent div:contains("Experience")',
-                'salary': 'div.salaryEstimate',
-                'description': 'div.jobDescriptionContent',
-            }
+            domain: dict(adapter.selectors)
+            for adapter in REGISTRY if adapter.name in SCRAPER_SITES
+            for domain in adapter.domains
         }
         
     def get_domain(self, url):
@@ -58,38 +60,53 @@ class JobScraper:
         parsed = urlparse(url)
         return parsed.netloc.replace('www.', '')
     
+    def get_site(self, url):
+        """Get the site_selectors key matching the URL's domain ('' if none)"""
+        return self._site_for_domain(self.get_domain(url))
+    
+    def _site_for_domain(self, domain):
+        site = self._sites.get(domain)
+        if site is None:
+            site = next((site for site in self.site_selectors if site in domain), '')
+            self._sites[domain] = site
+        return site
+    
+    def get_site_selectors(self, url):
+        """Get the selector set for the URL's domain (empty if unknown)"""
+        return self.site_selectors.get(self.get_site(url), {})
+    
     def get_selector(self, url, field):
         """Get appropriate selector based on domain"""
-        domain = self.get_domain(url)
-        for site in self.site_selectors:
-            if site in domain:
-                return self.site_selectors[site].get(field, '')
-        return ''
+        return self.get_site_selectors(url).get(field, '')
+    
+    def get_plan(self, site):
+        """Compiled extraction plan for a site (rebuilt if its selectors change)"""
+        selectors = self.site_selectors.get(site, {})
+        plan = self._plans.get(site)
+        if plan is None or any(plan.selectors[f] != selectors.get(f, '') for f in plan.selectors):
+            plan = self._plans[site] = ExtractionPlan(selectors)
+        return plan
     
     def scrape_job_page(self, url):
         """Scrape a single job listing page"""
+        with self.metrics.busy('scrape'), self.metrics.timer('scrape'):
+            return self._scrape_job_page(url)
+    
+    def _scrape_job_page(self, url):
         try:
             # Rotate user agent and add delay to avoid blocking
-            headers = {'User-Agent': self.ua.random}
-            time.sleep(1)  # Be polite with delay between requests
+            headers = {'User-Agent': self.transport.user_agent()}
+            self.health.check(url)  # fail fast on dead URLs and refusing hosts
+            if not self.cache.is_fresh(url):
+                time.sleep(self.request_delay)  # Be polite with delay between requests
             
-            response = self.session.get(url, headers=headers, timeout=10)
+            response = self.health.request(
+                lambda: self.cache.get(url, session=self.session, headers=headers, timeout=10), url)
             response.raise_for_status()
+            if self.journal:
+                self.journal.mark_fetched(url)
             
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # Extract data using domain-specific selectors
-            data = {
-                'url': url,
-                'title': self._extract_text(soup, self.get_selector(url, 'title')),
-                'company': self._extract_text(soup, self.get_selector(url, 'company')),
-                'experience': self._extract_text(soup, self.get_selector(url, 'experience')),
-                'salary': self._extract_text(soup, self.get_selector(url, 'salary')),
-                'description': self._extract_text(soup, self.get_selector(url, 'description')),
-                'domain': self.get_domain(url),
-            }
-            
-            return data
+            return self.parse_job_page(url, response.text)
         
         except Exception as e:
             logging.error(f"Error scraping {url}: {str(e)}")
@@ -98,40 +115,192 @@ class JobScraper:
                 'error': str(e)
             }
     
-    def _extract_text(self, soup, selector):
-        """Helper method to extract text using CSS selector"""
-        if not selector:
-            return ''
-        
-        element = soup.select_one(selector)
-        return element.get_text(strip=True) if element else ''
+    def parse_job_page(self, url, html):
+        """Extract the job fields from an already fetched page
+
+        The domain's selectors are resolved once per URL and run as a compiled
+        ExtractionPlan on lxml. Results are memoized on the page's normalized
+        content hash and the selectors, so unchanged pages aren't parsed again
+        and editing ``site_selectors`` invalidates the stored results.
+        """
+        domain = self.get_domain(url)
+        site = self._site_for_domain(domain)
+        plan = self.get_plan(site)
+        namespace = f'job_scraper:{site}'
+        config = (ExtractionPlan.extract, plan.selectors)
+        run = digest = None
+        if self.parsers is not None:
+            # Hashing the page for the memo costs about as much as parsing it, so
+            # the worker hashes it, checks the memo and only extracts on a miss,
+            # all in one round trip
+            memo_key = (os.path.abspath(get_memo().path), namespace,
+                        config_version(plan.extract, *config))
+            digest, extracted = self._on_parse_pool(extract_in_process, plan.selectors, html,
+                                                    memo_key)
+            # None: the memo had the page (if it has been pruned since, parse here)
+            run = lambda page: plan.extract(page) if extracted is None else extracted
+        fields = memoize(namespace, html, plan.extract, *config, run=run, digest=digest)
+        return {'url': url, **fields, 'domain': domain}
+    
+    def _on_parse_pool(self, fn, *args):
+        """Run a timed worker function on the parse pool, blocking the calling thread"""
+        result, busy = self.parsers.submit(fn, *args).result()
+        self.metrics.add_busy('parse', busy)
+        return result
+    
+    def _start_parsers(self, parse_workers):
+        if parse_workers is None:
+            return None
+        self.parse_workers = parse_workers or os.cpu_count()
+        self.metrics.pool_started('parse', self.parse_workers)
+        # spawn on every platform: it is the only start method on Windows, and
+        # forking a process that is already running fetch threads is unsafe
+        return ProcessPoolExecutor(max_workers=self.parse_workers,
+                                   mp_context=multiprocessing.get_context('spawn'))
     
-    def process_csv(self, input_file, output_file, max_workers=5):
-        """Process CSV file with URLs and save results"""
+    def _stop_parsers(self):
+        if self.parsers:
+            self.parsers.shutdown()
+            self.parsers = None
+            self.metrics.pool_finished('parse')
+    
+    def process_csv(self, input_file, output_file, max_workers=5, use_async=False,
+                    max_connections=100, per_domain_concurrency=2, per_domain_rate=1.0,
+                    journal_path=None, metrics_json=None, parse_workers=None, overwrite=False):
+        """Process CSV file with URLs and save results
+
+        With ``use_async`` the pages are fetched by the asyncio engine, which
+        enforces politeness per host (``per_domain_rate`` requests/s and
+        ``per_domain_concurrency`` in flight) instead of sleeping in every
+        worker. Rows are then written in completion order.
+
+        With ``journal_path`` every URL's state is recorded in a crawl
+        journal; rerunning after an interruption with the same
+        ``output_file`` appends to it and only processes URLs that are not
+        done yet. Any other run starts over. An ``output_file``
+        named *.parquet is written as a Parquet dataset instead of CSV; new
+        rows are added to it unless ``overwrite`` is set.
+
+        Each row's ``cluster_id`` groups reposts of the same job: rows whose
+        descriptions are near-duplicates share it.
+
+        With ``parse_workers`` pages are parsed on a process pool of that
+        many workers (``os.cpu_count()`` if 0) instead of in the fetch
+        threads, so parsing is no longer serialized by the GIL once fetching
+        is fast (cached pages, a local mirror). Fetch threads hand each page
+        to the pool and wait for it, so at most ``max_workers`` pages (with
+        ``use_async``, PARSE_BACKLOG per parse worker) queue for parsing, and
+        rows are written in completion order. Memo lookups stay in this
+        process.
+        
+        A run metrics report is logged at the end and, with ``metrics_json``,
+        also saved as JSON.
+        """
         try:
-            with open(input_file, mode='r', encoding='utf-8') as infile, \
-                 open(output_file, mode='w', encoding='utf-8', newline='') as outfile:
-                
-                reader = csv.DictReader(infile)
-                fieldnames = ['url', 'title', 'company', 'experience', 'salary', 'description', 'domain', 'error']
-                writer = csv.DictWriter(outfile, fieldnames=fieldnames)
-                writer.writeheader()
-                
-                urls = [row['url'] for row in reader if row.get('url')]
-                
-                # Use threading to speed up scraping
-                with ThreadPoolExecutor(max_workers=max_workers) as executor:
-                    results = executor.map(self.scrape_job_page, urls)
-                    
-                    for result in results:
-                        writer.writerow(result)
-                        outfile.flush()  # Ensure data is written after each row
+            with open(input_file, mode='r', encoding='utf-8') as infile:
+                urls = [row['url'] for row in csv.DictReader(infile) if row.get('url')]
+            
+            self.journal = CrawlJournal('job_scraper', journal_path) if journal_path else None
+            resuming = self.journal is not None and self.journal.begin(output_file)
+            if resuming:
+                urls = self.journal.todo(urls)
+            
+            fieldnames = ['url', 'title', 'company', 'experience', 'salary', 'description', 'domain',
+                          'cluster_id', 'error']
+            with open_output(output_file, fieldnames, append=resuming,
+                             on_flush=self._record_written, overwrite=overwrite) as writer:
+                self.parsers = self._start_parsers(parse_workers)
+                try:
+                    if use_async:
+                        fetcher = AsyncFetcher(
+                            max_connections=max_connections,
+                            per_domain_concurrency=per_domain_concurrency,
+                            per_domain_rate=per_domain_rate,
+                            # aiohttp negotiates its own content encodings
+                            headers={k: v for k, v in self.session.headers.items()
+                                     if k.lower() != 'accept-encoding'},
+                            header_factory=lambda: {'User-Agent': self.transport.user_agent()},
+                            health=self.health,
+                        )
+                        asyncio.run(self._process_async(fetcher, urls, writer))
+                    else:
+                        # Use threading to speed up scraping
+                        self.metrics.pool_started('scrape', max_workers)
+                        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                            if self.parsers:
+                                futures = [executor.submit(self.scrape_job_page, url) for url in urls]
+                                results = (future.result() for future in as_completed(futures))
+                            else:
+                                results = executor.map(self.scrape_job_page, urls)
+                            
+                            for written, result in enumerate(results, 1):
+                                writer.write(self._assign_cluster(result))
+                                self.metrics.queue_depth('scrape.pending', len(urls) - written)
+                        self.metrics.pool_finished('scrape')
+                finally:
+                    self._stop_parsers()
                         
+            self.cache.log_stats()
+            logging.info(self.metrics.report())
+            if metrics_json:
+                self.metrics.export_json(metrics_json)
+            if self.journal:
+                logging.info(f"Crawl journal: {self.journal.summary()}")
+                self.journal.finish()
             logging.info(f"Scraping completed. Results saved to {output_file}")
             
         except Exception as e:
             logging.error(f"Error processing files: {str(e)}")
             raise
+    
+    def _assign_cluster(self, result):
+        """Tag a scraped result with the near-duplicate cluster of its description"""
+        if not result.get('error'):
+            result['cluster_id'], _ = self.dedup.assign(result['url'], result.get('description'))
+        return result
+    
+    def _record_written(self, results):
+        """Record the outcome of rows that are now on disk in the crawl journal"""
+        if not self.journal:
+            return
+        for result in results:
+            if result.get('error'):
+                self.journal.mark_failed(result['url'], result['error'])
+            else:
+                self.journal.mark_parsed(result['url'])
+    
+    async def _process_async(self, fetcher, urls, writer):
+        """Parse and write pages as the async engine delivers them
+
+        With a parse pool, pages are parsed off the event loop, up to
+        PARSE_BACKLOG per parse worker at a time, and written as they finish.
+        """
+        parsing = set()
+        backlog = self.parse_workers * PARSE_BACKLOG
+        async for fetched in fetcher.fetch_all(urls):
+            if not self.parsers:
+                writer.write(self._assign_cluster(self._parse_fetched(fetched)))
+                continue
+            if len(parsing) >= backlog:
+                done, parsing = await asyncio.wait(parsing, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    writer.write(self._assign_cluster(task.result()))
+            parsing.add(asyncio.ensure_future(asyncio.to_thread(self._parse_fetched, fetched)))
+        for task in asyncio.as_completed(parsing):
+            writer.write(self._assign_cluster(await task))
+    
+    def _parse_fetched(self, fetched):
+        url = fetched['url']
+        if fetched['error']:
+            logging.error(f"Error scraping {url}: {fetched['error']}")
+            return {'url': url, 'error': fetched['error']}
+        if self.journal:
+            self.journal.mark_fetched(url)
+        try:
+            return self.parse_job_page(url, fetched['text'])
+        except Exception as e:
+            logging.error(f"Error scraping {url}: {str(e)}")
+            return {'url': url, 'error': str(e)}
 
 # Example usage
 if __name__ == "__main__":
@@ -144,7 +313,7 @@ if __name__ == "__main__":
     # Run the scraper
     try:
         logging.info("Starting job scraping process...")
-        scraper.process_csv(INPUT_CSV, OUTPUT_CSV)
+        scraper.process_csv(INPUT_CSV, OUTPUT_CSV, journal_path=JOURNAL_PATH)
         logging.info("Scraping process completed successfully.")
     except Exception as e:
         logging.error(f"Scraping process failed: {str(e)}")
\ No newline at end of file
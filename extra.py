@@ -1,148 +1,349 @@
+import codecs
 import csv
-import requests
 from bs4 import BeautifulSoup
+from html.parser import HTMLParser
 from urllib.parse import urlparse
 import time
-from fake_useragent import UserAgent
 import random
+from http_cache import HTML_CONTENT_TYPES, MAX_PAGE_BYTES, cached_get, get_cache
+from host_health import get_health
+from parse_memo import memoize
+from crawl_journal import CrawlJournal, JOURNAL_PATH
+from metrics import get_metrics
+from site_adapters import get_adapter
+from job_store import open_output
+from dedup import get_dedup
+from transport import get_transport
 
 # Constants
 CSV_FILE = 'search_results_20250403_223812.csv'
 OUTPUT_FILE = 'job_data_results.csv'
 REQUEST_DELAY = 2  # seconds between requests to be polite
+REQUEST_JITTER = 1  # up to this many extra random seconds
 TIMEOUT = 10  # seconds for request timeout
-
-# Initialize user agent generator
-ua = UserAgent()
+INCREMENTAL_PARSE = True  # parse generic pages while they download and stop early
+DETAILS_LIMIT = 1000  # characters of job details kept
 
 def get_headers():
-    """Generate random headers for requests"""
-    return {
-        'User-Agent': ua.random,
-        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-        'Accept-Language': 'en-US,en;q=0.5',
-        'Referer': 'https://www.google.com/',
-        'DNT': '1',
-        'Connection': 'keep-alive',
-        'Upgrade-Insecure-Requests': '1'
-    }
+    """Request headers with a rotating user agent (prebuilt by the shared transport)"""
+    return get_transport().headers()
 
 def get_domain(url):
     """Extract domain from URL"""
     parsed_uri = urlparse(url)
     return '{uri.netloc}'.format(uri=parsed_uri)
 
+def fetch(url, on_chunk=None):
+    """GET a job page through the shared cache, with host health checks and retries
+
+    The body is streamed and capped at MAX_PAGE_BYTES; non-HTML responses
+    (PDFs, images, ...) are rejected before their body is downloaded.
+    """
+    return get_health().request(
+        lambda: cached_get(url, headers=get_headers(), timeout=TIMEOUT, max_bytes=MAX_PAGE_BYTES,
+                           content_types=HTML_CONTENT_TYPES, on_chunk=on_chunk), url)
+
+def parse_naukri(content):
+    """Extract job fields from a Naukri.com job page"""
+    soup = BeautifulSoup(content, 'html.parser')
+    
+    # Extract experience
+    experience = soup.find('div', {'class': 'exp'})
+    experience = experience.get_text(strip=True) if experience else "Not specified"
+    
+    # Extract salary
+    salary = soup.find('div', {'class': 'salary'})
+    salary = salary.get_text(strip=True) if salary else "Not disclosed"
+    
+    # Extract job details
+    job_details = soup.find('div', {'class': 'job-desc'})
+    job_details = job_details.get_text(strip=True) if job_details else "No details available"
+    
+    return {
+        'experience': experience,
+        'salary': salary,
+        'details': job_details
+    }
+
 def scrape_naukri(url):
     """Scrape data from Naukri.com job listings"""
     try:
-        response = requests.get(url, headers=get_headers(), timeout=TIMEOUT)
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        # Extract experience
-        experience = soup.find('div', {'class': 'exp'})
-        experience = experience.get_text(strip=True) if experience else "Not specified"
-        
-        # Extract salary
-        salary = soup.find('div', {'class': 'salary'})
-        salary = salary.get_text(strip=True) if salary else "Not disclosed"
-        
-        # Extract job details
-        job_details = soup.find('div', {'class': 'job-desc'})
-        job_details = job_details.get_text(strip=True) if job_details else "No details available"
-        
-        return {
-            'experience': experience,
-            'salary': salary,
-            'details': job_details
-        }
+        response = fetch(url)
+        return memoize('naukri', response.content, parse_naukri)
     except Exception as e:
         print(f"Error scraping Naukri: {e}")
         return None
 
+def parse_apple_jobs(content):
+    """Extract job fields from an Apple job page"""
+    soup = BeautifulSoup(content, 'html.parser')
+    
+    # Apple jobs typically have this structure
+    experience = soup.find('span', {'class': 'job-experience'})
+    experience = experience.get_text(strip=True) if experience else "Not specified"
+    
+    salary = soup.find('span', {'class': 'job-salary'})
+    salary = salary.get_text(strip=True) if salary else "Not disclosed"
+    
+    job_details = soup.find('div', {'class': 'job-description'})
+    job_details = job_details.get_text(strip=True) if job_details else "No details available"
+    
+    return {
+        'experience': experience,
+        'salary': salary,
+        'details': job_details
+    }
+
 def scrape_apple_jobs(url):
     """Scrape data from Apple job listings"""
     try:
-        response = requests.get(url, headers=get_headers(), timeout=TIMEOUT)
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        # Apple jobs typically have this structure
-        experience = soup.find('span', {'class': 'job-experience'})
-        experience = experience.get_text(strip=True) if experience else "Not specified"
-        
-        salary = soup.find('span', {'class': 'job-salary'})
-        salary = salary.get_text(strip=True) if salary else "Not disclosed"
-        
-        job_details = soup.find('div', {'class': 'job-description'})
-        job_details = job_details.get_text(strip=True) if job_details else "No details available"
-        
-        return {
-            'experience': experience,
-            'salary': salary,
-            'details': job_details
-        }
+        response = fetch(url)
+        return memoize('apple', response.content, parse_apple_jobs)
     except Exception as e:
         print(f"Error scraping Apple Jobs: {e}")
         return None
 
+def parse_generic_job(content):
+    """Extract job fields from a page using common markup conventions"""
+    soup = BeautifulSoup(content, 'html.parser')
+    
+    # Try to find common elements
+    experience = soup.find(string=['Experience', 'Years of Experience', 'Exp'])
+    experience = experience.find_next().get_text(strip=True) if experience else "Not specified"
+    
+    salary = soup.find(string=['Salary', 'Compensation', 'Pay Range'])
+    salary = salary.find_next().get_text(strip=True) if salary else "Not disclosed"
+    
+    # Try to get main content
+    job_details = soup.find('div', {'class': ['description', 'job-details', 'content']})
+    if not job_details:
+        job_details = soup.find('main') or soup.find('article') or soup.find('div', {'role': 'main'})
+    
+    job_details = job_details.get_text(strip=True, separator='\n') if job_details else "No details available"
+    
+    return {
+        'experience': experience,
+        'salary': salary,
+        'details': job_details[:DETAILS_LIMIT] + "..." if len(job_details) > DETAILS_LIMIT else job_details  # Limit details length
+    }
+
+class GenericJobParser(HTMLParser):
+    """Incremental parse_generic_job that stops once every field is found
+
+    Fed the page chunk by chunk while it downloads, it sets ``done`` as soon as
+    the elements after the experience and salary labels and the first
+    description/job-details/content div are complete (or the details passed
+    DETAILS_LIMIT characters), so the rest of the page is never fetched.
+    Pages without such a div are read to the end for the main/article
+    fallbacks, as before.
+    """
+    EXPERIENCE_LABELS = {'Experience', 'Years of Experience', 'Exp'}
+    SALARY_LABELS = {'Salary', 'Compensation', 'Pay Range'}
+    DETAILS_CLASSES = {'description', 'job-details', 'content'}
+    VOID_TAGS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'keygen', 'link',
+                 'menuitem', 'meta', 'param', 'source', 'track', 'wbr'}
+    SKIPPED_TEXT_TAGS = {'script', 'style', 'template'}
+    
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self._decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self._stack = []  # open tags
+        self._text = []  # pieces of the current text node
+        self._labels = {}  # field -> True once its label text was seen
+        self._waiting = []  # fields whose capture starts at the next tag
+        self._captures = {}  # name -> {'depth', 'parts', 'open'}
+        self.bytes_fed = 0
+        self.fed = False
+        self.done = False
+    
+    def feed_bytes(self, chunk):
+        """Feed a chunk of the raw page; returns True once no more input is needed"""
+        self.fed = True
+        if not self.done:
+            self.bytes_fed += len(chunk)
+            self.feed(self._decoder.decode(chunk))
+        return self.done
+    
+    def parse(self, content):
+        """Return the fields, first feeding ``content`` unless it was streamed in"""
+        if not self.fed:
+            for start in range(0, len(content), 16 * 1024):
+                if self.feed_bytes(content[start:start + 16 * 1024]):
+                    break
+        if not self.done:
+            self.close()
+        return self.result()
+    
+    def _start_capture(self, name, void=False):
+        self._captures[name] = {'depth': len(self._stack), 'parts': [], 'open': not void}
+    
+    def _flush_text(self):
+        if not self._text:
+            return
+        text = ''.join(self._text)
+        self._text = []
+        if 'experience' not in self._labels and text in self.EXPERIENCE_LABELS:
+            self._labels['experience'] = True
+            self._waiting.append('experience')
+        if 'salary' not in self._labels and text in self.SALARY_LABELS:
+            self._labels['salary'] = True
+            self._waiting.append('salary')
+        text = text.strip()
+        if not text:
+            return
+        # get_text() leaves out script/style/template text below the element
+        skipped = next((i for i, tag in enumerate(self._stack) if tag in self.SKIPPED_TEXT_TAGS), None)
+        for capture in self._captures.values():
+            if capture['open'] and (skipped is None or skipped <= capture['depth']):
+                capture['parts'].append(text)
+    
+    def handle_starttag(self, tag, attrs):
+        self._flush_text()
+        void = tag in self.VOID_TAGS
+        for field in self._waiting:
+            self._start_capture(field, void)
+        self._waiting = []
+        attrs = dict(attrs)
+        if tag == 'div':
+            if 'details' not in self._captures and \
+                    self.DETAILS_CLASSES & set((attrs.get('class') or '').split()):
+                self._start_capture('details', void)
+            if 'role_main' not in self._captures and attrs.get('role') == 'main':
+                self._start_capture('role_main', void)
+        elif tag in ('main', 'article') and tag not in self._captures:
+            self._start_capture(tag, void)
+        if not void:
+            self._stack.append(tag)
+        self._check_done()
+    
+    def handle_endtag(self, tag):
+        self._flush_text()
+        if tag not in self._stack:
+            return  # stray end tag, ignored like BeautifulSoup does
+        del self._stack[len(self._stack) - 1 - self._stack[::-1].index(tag):]
+        for capture in self._captures.values():
+            if capture['open'] and capture['depth'] >= len(self._stack):
+                capture['open'] = False
+        self._check_done()
+    
+    def handle_data(self, data):
+        self._text.append(data)
+    
+    def handle_comment(self, data):
+        self._flush_text()
+    
+    def handle_decl(self, decl):
+        self._flush_text()
+    
+    def handle_pi(self, data):
+        self._flush_text()
+    
+    def close(self):
+        super().close()
+        self._flush_text()
+    
+    def _complete(self, name):
+        capture = self._captures.get(name)
+        return capture is not None and not capture['open']
+    
+    def _check_done(self):
+        details = self._captures.get('details')
+        details_done = details is not None and (
+            not details['open'] or sum(len(p) + 1 for p in details['parts']) > DETAILS_LIMIT + 1)
+        self.done = self._complete('experience') and self._complete('salary') and details_done
+    
+    def _field_text(self, name, separator=''):
+        capture = self._captures.get(name)
+        return separator.join(capture['parts']) if capture else None
+    
+    def result(self):
+        experience = self._field_text('experience')
+        salary = self._field_text('salary')
+        job_details = next((text for text in map(lambda name: self._field_text(name, '\n'),
+                                                 ('details', 'main', 'article', 'role_main'))
+                            if text is not None), "No details available")
+        return {
+            'experience': experience if experience is not None else "Not specified",
+            'salary': salary if salary is not None else "Not disclosed",
+            'details': job_details[:DETAILS_LIMIT] + "..." if len(job_details) > DETAILS_LIMIT else job_details
+        }
+
 def scrape_generic_job(url):
     """Generic scraper for job sites we don't have a specific handler for"""
     try:
-        response = requests.get(url, headers=get_headers(), timeout=TIMEOUT)
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        # Try to find common elements
-        experience = soup.find(string=['Experience', 'Years of Experience', 'Exp'])
-        experience = experience.find_next().get_text(strip=True) if experience else "Not specified"
-        
-        salary = soup.find(string=['Salary', 'Compensation', 'Pay Range'])
-        salary = salary.find_next().get_text(strip=True) if salary else "Not disclosed"
-        
-        # Try to get main content
-        job_details = soup.find('div', {'class': ['description', 'job-details', 'content']})
-        if not job_details:
-            job_details = soup.find('main') or soup.find('article') or soup.find('div', {'role': 'main'})
-        
-        job_details = job_details.get_text(strip=True, separator='\n') if job_details else "No details available"
-        
-        return {
-            'experience': experience,
-            'salary': salary,
-            'details': job_details[:1000] + "..." if len(job_details) > 1000 else job_details  # Limit details length
-        }
+        if not INCREMENTAL_PARSE:
+            response = fetch(url)
+            return memoize('generic', response.content, parse_generic_job)
+        # Parse while downloading; the rest of the page is skipped once the fields are found
+        parser = GenericJobParser()
+        response = fetch(url, on_chunk=parser.feed_bytes)
+        return memoize('generic:incremental', response.content, parser.parse,
+                       GenericJobParser.handle_starttag, GenericJobParser.handle_endtag,
+                       GenericJobParser._flush_text, GenericJobParser.result)
     except Exception as e:
         print(f"Error scraping generic job: {e}")
         return None
 
+# Site adapter name -> dedicated scraper; other sites use scrape_generic_job
+SITE_SCRAPERS = {
+    'naukri': scrape_naukri,
+    'apple': scrape_apple_jobs,
+}
+
 def get_scraper_for_url(url):
     """Determine which scraper to use based on URL domain"""
-    domain = get_domain(url).lower()
-    
-    if 'naukri.com' in domain:
-        return scrape_naukri
-    elif 'apple.com' in domain:
-        return scrape_apple_jobs
-    else:
-        return scrape_generic_job
-
-def process_csv(input_file, output_file):
-    """Process the input CSV and write results to output CSV"""
-    with open(input_file, mode='r', encoding='utf-8') as infile, \
-         open(output_file, mode='w', encoding='utf-8', newline='') as outfile:
-        
-        reader = csv.DictReader(infile)
-        fieldnames = ['title', 'url', 'experience', 'salary', 'details']
-        writer = csv.DictWriter(outfile, fieldnames=fieldnames)
-        writer.writeheader()
+    return SITE_SCRAPERS.get(get_adapter(url).name, scrape_generic_job)
+
+def process_csv(input_file, output_file, journal_path=None, metrics_json=None, overwrite=False):
+    """Process the input CSV and write results to output CSV
+
+    An output_file named *.parquet is written as a Parquet dataset instead,
+    and new rows are added to it unless overwrite is set.
+    With a journal_path every URL's progress is recorded, and rerunning after
+    an interruption with the same output_file appends to it, skipping URLs
+    already scraped.
+    A run metrics report is printed at the end and, with metrics_json, also
+    saved as JSON. Rows whose details are near-duplicates share a cluster_id.
+    """
+    with open(input_file, mode='r', encoding='utf-8') as infile:
+        rows = [row for row in csv.DictReader(infile) if row.get('url')]
+    
+    journal = CrawlJournal('extra', journal_path) if journal_path else None
+    resuming = journal is not None and journal.begin(output_file)
+    if resuming:
+        todo = set(journal.todo([row['url'] for row in rows]))
+        rows = [row for row in rows if row['url'] in todo]
+    
+    fieldnames = ['title', 'url', 'experience', 'salary', 'details', 'cluster_id']
+    
+    def mark_written(written):
+        # Rows are only marked done once they are on disk
+        for result in written:
+            journal.mark_parsed(result['url'])
+    
+    with open_output(output_file, fieldnames, append=resuming,
+                     on_flush=mark_written if journal else None, overwrite=overwrite) as writer:
         
-        for row in reader:
+        cache = get_cache()
+        health = get_health()
+        metrics = get_metrics()
+        dedup = get_dedup()
+        for done, row in enumerate(rows):
+            metrics.queue_depth('scrape.pending', len(rows) - done)
             url = row['url']
-            print(f"Processing: {row['title']} - {url}")
-            
             # Get appropriate scraper
             scraper = get_scraper_for_url(url)
             
+            # Cache hits and refused URLs never reach the site; the incremental
+            # generic scraper can also use a page prefix cached after an early stop
+            partial = INCREMENTAL_PARSE and scraper is scrape_generic_job
+            no_request = cache.is_fresh(url, partial) or health.is_blocked(url)
+            print(f"Processing: {row['title']} - {url}")
+            
             # Scrape the data
-            scraped_data = scraper(url)
+            with metrics.timer('scrape'):
+                scraped_data = scraper(url)
+            metrics.count('scrape.ok' if scraped_data else 'scrape.failed')
             
             if scraped_data:
                 # Combine original data with scraped data
@@ -151,17 +352,33 @@ def process_csv(input_file, output_file):
                     'url': url,
                     'experience': scraped_data['experience'],
                     'salary': scraped_data['salary'],
-                    'details': scraped_data['details']
+                    'details': scraped_data['details'],
+                    # Reposts of the same job share a cluster
+                    'cluster_id': dedup.assign(url, scraped_data['details'])[0],
                 }
-                writer.writerow(result)
+                writer.write(result)
                 print(f"Successfully scraped: {row['title']}")
             else:
+                if journal:
+                    journal.mark_failed(url, 'scrape failed')
                 print(f"Failed to scrape: {row['title']}")
             
             # Be polite - delay between requests
-            time.sleep(REQUEST_DELAY + random.uniform(0, 1))
+            if not no_request:
+                with metrics.timer('scrape.politeness_delay'):
+                    time.sleep(REQUEST_DELAY + random.uniform(0, REQUEST_JITTER))
+        
+        stats = cache.stats
+        print(f"Cache: {stats['hits']} hits, {stats['revalidated']} revalidated, "
+              f"{stats['misses']} misses, {stats['bytes_saved']} bytes saved")
+        print(metrics.report())
+        if metrics_json:
+            metrics.export_json(metrics_json)
+    if journal:
+        journal.finish()
 
 if __name__ == "__main__":
     print("Starting job scraping process...")
-    process_csv("D:\Machine Learning\search_results_20250403_223812.csv", "output.csv")
+    process_csv("D:\Machine Learning\search_results_20250403_223812.csv", "output.csv",
+                journal_path=JOURNAL_PATH)
     print(f"Scraping complete. Results saved to {OUTPUT_FILE}")
\ No newline at end of file
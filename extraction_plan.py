@@ -0,0 +1,244 @@
+import re
+import sys
+import time
+from functools import lru_cache
+
+from bs4 import BeautifulSoup
+
+from parse_memo import ParseMemo, content_hash
+
+try:
+    import lxml.html
+    from lxml import etree
+    from cssselect import HTMLTranslator, SelectorError
+    HAVE_LXML = True
+except ImportError:
+    HAVE_LXML = False
+
+FIELDS = ('title', 'company', 'experience', 'salary', 'description')
+# BeautifulSoup's get_text() leaves out the text of these elements
+SKIPPED_TEXT_TAGS = {'script', 'style', 'template'}
+# bs4 keeps whitespace-only strings as they are only inside these
+PRESERVE_WHITESPACE_TAGS = {'pre', 'textarea'}
+ASCII_SPACES = ' \n\t\f\r'
+
+
+@lru_cache(maxsize=None)
+def compile_selector(selector):
+    """Compile a CSS selector to an lxml XPath, or None if lxml can't run it.
+
+    Compiled once per process; ``:contains()`` becomes an XPath
+    ``contains(string(.), ...)`` test, which has the same meaning as in
+    soupsieve.
+    """
+    if not HAVE_LXML or not selector:
+        return None
+    try:
+        return etree.XPath(HTMLTranslator().css_to_xpath(selector))
+    except SelectorError:
+        return None
+
+
+def element_text(element, separator=''):
+    """Text of an lxml element, the same as bs4's ``get_text(separator, strip=True)``
+
+    Script, style and template text and comments are left out unless the
+    element is one.
+    """
+    parts = []
+
+    def add(text):
+        text = text.strip() if text else ''
+        if text:
+            parts.append(text)
+
+    def collect(el):
+        add(el.text)
+        for child in el:
+            if isinstance(child.tag, str) and child.tag not in SKIPPED_TEXT_TAGS:
+                collect(child)
+            add(child.tail)
+
+    collect(element)
+    return separator.join(parts)
+
+
+def document_text(tree):
+    """All text of a parsed page, the same as bs4's ``soup.get_text()``
+
+    Like bs4's html.parser builder, whitespace-only strings outside
+    pre/textarea become a single newline (or space if they had none).
+    """
+    return _join_text(_DOCUMENT_TEXT(tree))
+
+
+def get_text(element):
+    """Unstripped text of one element, the same as bs4's ``element.get_text()``"""
+    return _join_text(_ELEMENT_TEXT(element))
+
+
+def _join_text(texts):
+    parts = []
+    for text in texts:
+        if not text.strip(ASCII_SPACES):
+            element = text.getparent()
+            if text.is_tail:
+                element = element.getparent()
+            if element is not None and not _preserves_whitespace(element):
+                text = '\n' if '\n' in text else ' '
+        parts.append(text)
+    return ''.join(parts)
+
+
+def _preserves_whitespace(element):
+    return element.tag in PRESERVE_WHITESPACE_TAGS or any(
+        True for _ in element.iterancestors(*PRESERVE_WHITESPACE_TAGS))
+
+
+if HAVE_LXML:
+    _DOCUMENT_TEXT = etree.XPath(
+        '//text()[not(ancestor::script or ancestor::style or ancestor::template)]')
+    _ELEMENT_TEXT = etree.XPath(
+        './/text()[not(ancestor::script or ancestor::style or ancestor::template)]')
+
+
+def parse_lxml(html):
+    """Parse a page with lxml's HTML parser
+
+    Comments stay in the tree, so the text on either side of one stays two
+    strings as in bs4; element_text and document_text skip them.
+    """
+    try:
+        return lxml.html.document_fromstring(html)
+    except ValueError:
+        # str input with an XML encoding declaration
+        return lxml.html.document_fromstring(html.encode('utf-8'))
+
+
+class ExtractionPlan:
+    """The selectors for one site, compiled once and run on lxml.
+
+    Fields whose selector cssselect can't translate, or every field if lxml
+    is not installed or can't parse the page, are extracted with
+    BeautifulSoup as before.
+    """
+
+    def __init__(self, selectors, fields=FIELDS):
+        self.selectors = {field: selectors.get(field, '') for field in fields}
+        self._xpaths = {field: compile_selector(selector)
+                        for field, selector in self.selectors.items() if selector}
+
+    @property
+    def fast(self):
+        """True if every field runs on lxml"""
+        return HAVE_LXML and all(x is not None for x in self._xpaths.values())
+
+    def extract(self, html, tree=None):
+        """Extract every field from a page (``tree``: the page already parsed by parse_lxml)"""
+        fields = dict.fromkeys(self.selectors, '')
+        slow = [field for field, xpath in self._xpaths.items() if xpath is None]
+        fast = [field for field, xpath in self._xpaths.items() if xpath is not None]
+        if fast and tree is None:
+            try:
+                tree = parse_lxml(html)
+            except (etree.ParserError, ValueError):
+                slow, fast = slow + fast, []
+        for field in fast:
+            matches = self._xpaths[field](tree)
+            fields[field] = element_text(matches[0]) if matches else ''
+        if slow:
+            fields.update(self.extract_with_soup(html, slow))
+        return fields
+
+    def extract_with_soup(self, html, fields=None):
+        """Reference extraction with BeautifulSoup and soupsieve"""
+        soup = BeautifulSoup(html, 'html.parser')
+        result = {}
+        for field in fields or self.selectors:
+            selector = self.selectors[field]
+            element = soup.select_one(selector) if selector else None
+            result[field] = element.get_text(strip=True) if element else ''
+        return result
+
+
+_process_plans = {}
+_process_memos = {}
+
+
+def extract_in_process(selectors, html, memo_key=None):
+    """The page's content_hash and ``ExtractionPlan(selectors).extract(html)``, for process pool workers
+
+    Both come from one task so each page is sent to a worker only once.
+    With ``memo_key`` (memo path, namespace, version) the worker first looks
+    the digest up in the parse memo and skips the extraction (fields is
+    None) when a result is already stored. Plans and memo connections are
+    opened once per worker process. Returns ((digest, fields), seconds
+    spent) so the parent can account the worker's busy time.
+    """
+    started = time.perf_counter()
+    digest, fields = content_hash(html), None
+    if memo_key is None or not _process_memo(memo_key[0]).has(memo_key[1], memo_key[2], digest):
+        key = tuple(sorted(selectors.items()))
+        plan = _process_plans.get(key)
+        if plan is None:
+            plan = _process_plans[key] = ExtractionPlan(selectors)
+        fields = plan.extract(html)
+    return (digest, fields), time.perf_counter() - started
+
+
+def _process_memo(path):
+    memo = _process_memos.get(path)
+    if memo is None:
+        memo = _process_memos[path] = ParseMemo(path)
+    return memo
+
+
+def probe_selectors(html, limit=200):
+    """Selectors that exercise a saved page: tags, classes, :contains() and '+'"""
+    soup = BeautifulSoup(html, 'html.parser')
+    selectors = []
+    for element in soup.find_all(True):
+        selectors.append(element.name)
+        for cls in element.get('class') or []:
+            if re.fullmatch(r'[A-Za-z_][\w-]*', cls):
+                selectors.append(f'{element.name}.{cls}')
+                selectors.append(f'.{cls} + {element.name}')
+    for heading in soup.find_all(['h1', 'h2', 'h3']):
+        for word in re.findall(r'[A-Za-z]{4,}', heading.get_text())[:2]:
+            selectors.append(f'div:contains("{word}")')
+            selectors.append(f'div:contains("{word}") + div')
+    return list(dict.fromkeys(selectors))[:limit]
+
+
+def check_parity(html, selectors):
+    """Compare lxml and BeautifulSoup results; returns [(selector, fast, soup)] that differ"""
+    names = [f'probe{i}' for i in range(len(selectors))]
+    plan = ExtractionPlan(dict(zip(names, selectors)), fields=names)
+    fast, soup = plan.extract(html), plan.extract_with_soup(html)
+    return [(plan.selectors[name], fast[name], soup[name])
+            for name in names if fast[name] != soup[name]]
+
+
+def main(paths):
+    """Check lxml/BeautifulSoup parity on saved pages (default: the repo's samples)"""
+    import warnings
+    from extr import JobScraper
+    warnings.filterwarnings('ignore', message=".*:contains.*")  # soupsieve deprecation
+
+    site_selectors = [s for selectors in JobScraper().site_selectors.values()
+                      for s in selectors.values()]
+    failed = 0
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            html = f.read()
+        selectors = list(dict.fromkeys(site_selectors + probe_selectors(html)))
+        mismatches = check_parity(html, selectors)
+        failed += len(mismatches)
+        print(f"{path}: {len(selectors)} selectors, {len(mismatches)} mismatches")
+        for selector, fast, soup in mismatches[:10]:
+            print(f"  {selector!r}\n    lxml: {fast[:80]!r}\n    bs4:  {soup[:80]!r}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:] or ['debug_page.html', 'inde.html']))
@@ -0,0 +1,187 @@
+import argparse
+import hashlib
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from string import Template
+from urllib.parse import urlsplit
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_fixtures')
+
+# Host suffix -> fixture, checked in order; anything else gets generic.html
+SITE_FIXTURES = (
+    ('naukri.com', 'naukri.html'),
+    ('apple.com', 'apple.html'),
+    ('indeed.com', 'indeed.html'),
+    ('linkedin.com', 'linkedin.html'),
+    ('glassdoor.com', 'glassdoor.html'),
+)
+# One host per layout, as the pipelines see them
+BOARD_HOSTS = ('www.naukri.com', 'jobs.apple.com', 'www.indeed.com', 'www.linkedin.com',
+               'www.glassdoor.com', 'careers.example.com')
+
+TITLES = ('Data Engineer', 'Python Developer', 'Machine Learning Engineer', 'Backend Engineer',
+          'Data Analyst', 'Site Reliability Engineer')
+COMPANIES = ('Acme Analytics', 'Globex', 'Initech', 'Umbrella Labs', 'Hooli', 'Vandelay Industries')
+LOCATIONS = ('Bangalore', 'Hyderabad', 'Pune', 'Remote', 'Cupertino', 'London')
+FILLER = ('<div class="card"><script>window.__STATE__.push({"widget": "recommendation"});'
+          '</script><p>Similar jobs you may like, recommended for you.</p></div>\n')
+
+
+def load_fixtures(directory=FIXTURES_DIR):
+    """Read the page templates, as {file name: Template}"""
+    fixtures = {}
+    for name in os.listdir(directory):
+        if name.endswith('.html'):
+            with open(os.path.join(directory, name), encoding='utf-8') as f:
+                fixtures[name] = Template(f.read())
+    return fixtures
+
+
+def fixture_for_host(host):
+    host = host.split(':')[0].lower()
+    for suffix, fixture in SITE_FIXTURES:
+        if host == suffix or host.endswith('.' + suffix):
+            return fixture
+    return 'generic.html'
+
+
+def board_urls(count, prefix='job'):
+    """``count`` job URLs spread evenly over the board's hosts (plain http, for the proxy)"""
+    return [f"http://{BOARD_HOSTS[i % len(BOARD_HOSTS)]}/{prefix}/{i}" for i in range(count)]
+
+
+class FakeJobBoardHandler(BaseHTTPRequestHandler):
+    """Renders a job page in the layout of the requested host"""
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        board = self.server
+        # Proxied requests carry the absolute URL; direct ones only the path
+        parts = urlsplit(self.path)
+        host = parts.netloc or self.headers.get('Host', '')
+        path = parts.path or '/'
+        board.record_request()
+        if board.latency:
+            time.sleep(board.latency)
+
+        if board.should_fail():
+            self._send(board.error_status, b'<html><body>Service unavailable</body></html>',
+                       {'Retry-After': '0'} if board.error_status in (429, 503) else {})
+            return
+
+        body = board.render(host, path)
+        etag = '"%s"' % hashlib.sha1(body).hexdigest()[:16]
+        if self.headers.get('If-None-Match') == etag:
+            self._send(304, b'', {'ETag': etag})
+            return
+        self._send(200, body, {'ETag': etag})
+
+    def _send(self, status, body, headers):
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+        self.server.add_bytes(len(body))
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeJobBoard(ThreadingHTTPServer):
+    """Local stand-in for the job boards the scrapers target.
+
+    Serves pages built from bench_fixtures/ in the layout of the requested
+    host (Naukri, Apple, Indeed, LinkedIn, Glassdoor, or a generic page), so
+    pointing HTTP_PROXY at it routes ``http://`` job URLs here unchanged.
+    Each response waits ``latency`` seconds, a seeded ``error_rate`` share
+    of requests fail with ``error_status``, and pages are padded to
+    ``body_kb`` when set. Page content depends only on the URL.
+    """
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, port=0, latency=0.05, error_rate=0.0, error_status=503,
+                 body_kb=None, seed=0):
+        super().__init__(('127.0.0.1', port), FakeJobBoardHandler)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.body_kb = body_kb
+        self.fixtures = load_fixtures()
+        self.requests = 0
+        self.bytes_sent = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @property
+    def proxy_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def handle_error(self, request, client_address):
+        pass  # clients dropping capped downloads early is expected
+
+    def record_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def add_bytes(self, n):
+        with self._lock:
+            self.bytes_sent += n
+
+    def should_fail(self):
+        with self._lock:
+            return self._random.random() < self.error_rate
+
+    def render(self, host, path):
+        rng = random.Random(f"{host}{path}")
+        years = rng.randint(1, 8)
+        low = rng.randint(5, 30)
+        fields = {
+            'job_id': hashlib.md5(path.encode('utf-8')).hexdigest()[:10],
+            'title': rng.choice(TITLES),
+            'company': rng.choice(COMPANIES),
+            'location': rng.choice(LOCATIONS),
+            'experience': f"{years}-{years + rng.randint(1, 4)} Yrs",
+            'salary': f"{low}-{low + rng.randint(2, 20)} Lacs P.A.",
+            'description': "We are looking for an engineer to build and run data pipelines. "
+                           "Skills: Python, SQL, Spark and AWS.",
+            'padding': '',
+        }
+        page = self.fixtures[fixture_for_host(host)].substitute(fields)
+        if self.body_kb:
+            missing = self.body_kb * 1024 - len(page)
+            if missing > 0:
+                fields['padding'] = FILLER * (missing // len(FILLER) + 1)
+                page = self.fixtures[fixture_for_host(host)].substitute(fields)
+        return page.encode('utf-8')
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve fake job board pages for offline runs")
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--error-status', type=int, default=503)
+    parser.add_argument('--body-kb', type=int, default=None)
+    args = parser.parse_args()
+
+    board = FakeJobBoard(args.port, args.latency, args.error_rate, args.error_status, args.body_kb)
+    print(f"Fake job board on {board.proxy_url}; run the scrapers with HTTP_PROXY={board.proxy_url}")
+    try:
+        board.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,214 @@
+import logging
+import random
+import sqlite3
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+HEALTH_PATH = 'host_health.sqlite'
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+BLOCKED_STATUSES = {401, 403}
+GONE_STATUSES = {404, 410}
+
+
+class HostUnavailable(Exception):
+    """The host's circuit breaker is open; no request was sent"""
+
+
+class DeadURL(Exception):
+    """The URL returned 404/410 before and is never fetched again"""
+
+
+def get_host(url):
+    return urlparse(url).netloc.lower().replace('www.', '')
+
+
+def parse_retry_after(value):
+    """Seconds to wait according to a Retry-After header (delta or HTTP date)"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class HostHealth:
+    """Per-host health tracking for the fetch layer.
+
+    * Transient failures (429 and 5xx) are retried with exponential backoff
+      and jitter, honouring ``Retry-After``.
+    * ``failure_threshold`` consecutive 401/403 responses open a host's
+      circuit breaker: requests to it fail fast with HostUnavailable for
+      ``cooldown`` seconds, after which a single trial request is let through.
+      Other requests to the host are refused until the trial's response is
+      recorded (or the trial is released, or gets no answer for ``cooldown``).
+    * 404/410 URLs are recorded as dead in SQLite and refused with DeadURL in
+      this and every later run.
+    """
+
+    def __init__(self, path=HEALTH_PATH, failure_threshold=3, cooldown=300.0,
+                 max_retries=3, base_delay=1.0, max_delay=60.0):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._lock = threading.Lock()
+        self._failures = {}
+        self._open_until = {}
+        self._trials = {}  # host -> (url, expires) of the trial request in flight
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS dead_urls (
+                url TEXT PRIMARY KEY,
+                status INTEGER NOT NULL,
+                marked_at REAL NOT NULL
+            )""")
+        self._conn.commit()
+        self._dead = {url for url, in self._conn.execute("SELECT url FROM dead_urls")}
+
+    def is_dead(self, url):
+        return url in self._dead
+
+    def is_blocked(self, url):
+        """True if a request to ``url`` would be refused without being sent"""
+        host = get_host(url)
+        now = time.time()
+        trial = self._trials.get(host)
+        return (url in self._dead or self._open_until.get(host, 0) > now
+                or (trial is not None and trial[0] != url and trial[1] > now))
+
+    def check(self, url):
+        """Raise DeadURL or HostUnavailable if ``url`` must not be requested
+
+        Once a host's cooldown is over the first URL checked becomes its
+        trial request; checking that URL again (a retry) is allowed.
+        """
+        if url in self._dead:
+            raise DeadURL(f"{url} is gone (marked dead in an earlier request)")
+        host = get_host(url)
+        now = time.time()
+        with self._lock:
+            trial = self._trials.get(host)
+            if trial is not None:
+                trial_url, expires = trial
+                if trial_url == url:
+                    return
+                if expires > now:
+                    raise HostUnavailable(f"Trial request to {host} in flight")
+                # The trial never reported back; let this one try instead
+            else:
+                open_until = self._open_until.get(host)
+                if open_until is None:
+                    return
+                if open_until > now:
+                    raise HostUnavailable(
+                        f"Circuit open for {host} for another {open_until - now:.0f}s")
+                # Cooldown over: half-open, let this one trial request through and
+                # re-open straight away if it is refused again.
+                del self._open_until[host]
+                self._failures[host] = self.failure_threshold - 1
+            self._trials[host] = (url, now + self.cooldown)
+
+    def release(self, url):
+        """End ``url``'s trial request without a verdict (no response, or served from the cache)
+
+        The host stays half-open: the next URL checked becomes its trial.
+        """
+        host = get_host(url)
+        with self._lock:
+            if self._end_trial(host, url):
+                self._open_until[host] = time.time()
+
+    def _end_trial(self, host, url):
+        # caller holds the lock
+        trial = self._trials.get(host)
+        if trial is None or trial[0] != url:
+            return False
+        del self._trials[host]
+        return True
+
+    def record(self, url, status):
+        """Update host and URL health from a response status"""
+        host = get_host(url)
+        with self._lock:
+            self._end_trial(host, url)
+        if status in BLOCKED_STATUSES:
+            with self._lock:
+                failures = self._failures.get(host, 0) + 1
+                self._failures[host] = failures
+                if failures >= self.failure_threshold:
+                    self._open_until[host] = time.time() + self.cooldown
+                    logger.warning(f"Circuit opened for {host} after {failures} refused "
+                                   f"requests; pausing it for {self.cooldown:.0f}s")
+        elif status in GONE_STATUSES:
+            self.mark_dead(url, status)
+        elif status < 400:
+            with self._lock:
+                self._failures.pop(host, None)
+
+    def mark_dead(self, url, status):
+        with self._lock:
+            self._dead.add(url)
+            self._conn.execute("INSERT OR REPLACE INTO dead_urls VALUES (?, ?, ?)",
+                               (url, status, time.time()))
+            self._conn.commit()
+
+    def retry_delay(self, status, headers, attempt):
+        """Seconds to wait before retrying, or None if the response is final"""
+        if status not in RETRYABLE_STATUSES or attempt >= self.max_retries:
+            return None
+        delay = parse_retry_after(headers.get('Retry-After')) if headers else None
+        if delay is None:
+            delay = self.base_delay * (2 ** attempt) * random.uniform(0.5, 1.5)
+        return min(delay, self.max_delay)
+
+    def request(self, send, url):
+        """Call ``send()`` for ``url`` with health checks and retries.
+
+        ``send`` performs the request and returns a requests-style response.
+        Responses served from the cache bypass the bookkeeping.
+        """
+        attempt = 0
+        while True:
+            self.check(url)
+            try:
+                response = send()
+            except BaseException:
+                self.release(url)
+                raise
+            if getattr(response, 'from_cache', False):
+                self.release(url)
+                return response
+            delay = self.retry_delay(response.status_code, response.headers, attempt)
+            if delay is None:
+                self.record(url, response.status_code)
+                return response
+            logger.info(f"{response.status_code} from {url}; retrying in {delay:.1f}s")
+            time.sleep(delay)
+            attempt += 1
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_default_health = None
+_default_lock = threading.Lock()
+
+
+def get_health():
+    """Return the host health tracker shared by all fetchers"""
+    global _default_health
+    with _default_lock:
+        if _default_health is None:
+            _default_health = HostHealth()
+        return _default_health
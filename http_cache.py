@@ -0,0 +1,266 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+import zlib
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from metrics import get_metrics
+from transport import get_transport
+
+logger = logging.getLogger(__name__)
+
+CACHE_PATH = 'http_cache.sqlite'
+MAX_CACHE_BYTES = 256 * 1024 * 1024  # compressed bodies
+DEFAULT_TTL = 6 * 60 * 60  # seconds a page is served without revalidation
+MAX_PAGE_BYTES = 2 * 1024 * 1024  # default download budget for a single page
+CHUNK_SIZE = 64 * 1024
+# Responses the page parsers can read; anything else is rejected from its headers
+HTML_CONTENT_TYPES = ('text/html', 'application/xhtml+xml', 'text/plain',
+                      'text/xml', 'application/xml')
+
+
+class UnsupportedContent(Exception):
+    """The response is not a parseable page (PDF, image, ...); its body was not downloaded"""
+
+
+def read_capped(response, max_bytes=None, content_types=None, on_chunk=None):
+    """Download a streamed response's body within a byte budget.
+
+    A 200 response whose Content-Type is not in ``content_types`` is closed
+    before any of the body is read and UnsupportedContent is raised. At most
+    ``max_bytes`` are read, and ``on_chunk(chunk)`` (called for each chunk of
+    a 200 response) can stop the download early by returning True. Sets
+    ``response.truncated`` when the body was cut short.
+    """
+    content_type = response.headers.get('Content-Type', '').split(';')[0].strip().lower()
+    if response.status_code == 200 and content_types and content_type \
+            and content_type not in content_types:
+        response.close()
+        raise UnsupportedContent(f"Refusing {content_type} response for url: {response.url}")
+
+    body = bytearray()
+    truncated = False
+    for chunk in response.iter_content(CHUNK_SIZE):
+        if max_bytes is not None and len(body) + len(chunk) > max_bytes:
+            chunk = chunk[:max_bytes - len(body)]
+            truncated = True
+        body += chunk
+        if on_chunk and response.status_code == 200 and on_chunk(chunk):
+            truncated = True
+        if truncated:
+            break
+    response.close()
+    response._content = bytes(body)
+    response.truncated = truncated
+    return response
+
+
+class ResponseCache:
+    """Persistent, size-bounded HTTP response cache.
+
+    Bodies are stored zlib-compressed in SQLite together with their ETag and
+    Last-Modified validators. Fresh entries (younger than ``ttl``) are served
+    without touching the network; stale ones are revalidated with
+    If-None-Match / If-Modified-Since so an unchanged page costs a 304.
+    A body cut short while streaming is kept too, flagged ``truncated``; only
+    callers that stop reading early themselves (``on_chunk``) are served it.
+    Least recently used entries are evicted once ``max_bytes`` is exceeded.
+    """
+
+    def __init__(self, path=CACHE_PATH, max_bytes=MAX_CACHE_BYTES, ttl=DEFAULT_TTL):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.stats = {'hits': 0, 'revalidated': 0, 'misses': 0, 'stored': 0,
+                      'evicted': 0, 'bytes_saved': 0}
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                url TEXT PRIMARY KEY,
+                body BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                raw_size INTEGER NOT NULL,
+                headers TEXT NOT NULL,
+                encoding TEXT,
+                stored_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                truncated INTEGER NOT NULL DEFAULT 0
+            )""")
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(responses)")]
+        if 'truncated' not in columns:  # caches written before prefixes were kept
+            self._conn.execute(
+                "ALTER TABLE responses ADD COLUMN truncated INTEGER NOT NULL DEFAULT 0")
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS responses_lru ON responses (last_access)")
+        self._conn.commit()
+
+    def _count(self, key, saved=0):
+        with self._lock:
+            self.stats[key] += 1
+            self.stats['bytes_saved'] += saved
+
+    def _lookup(self, url):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, raw_size, headers, encoding, stored_at, truncated "
+                "FROM responses WHERE url = ?", (url,)).fetchone()
+        if not row:
+            return None
+        body, raw_size, headers, encoding, stored_at, truncated = row
+        return {'body': body, 'raw_size': raw_size, 'headers': json.loads(headers),
+                'encoding': encoding, 'stored_at': stored_at, 'truncated': bool(truncated)}
+
+    def is_fresh(self, url, partial=False):
+        """True if ``url`` would be served from the cache without a request
+
+        ``partial`` is for callers that pass ``on_chunk`` to get(), for which
+        a truncated entry counts.
+        """
+        entry = self._lookup(url)
+        return bool(entry) and (partial or not entry['truncated']) \
+            and time.time() - entry['stored_at'] < self.ttl
+
+    def _build_response(self, url, entry, status_code):
+        response = requests.Response()
+        response.url = url
+        response.status_code = 200
+        response.headers = CaseInsensitiveDict(entry['headers'])
+        response.encoding = entry['encoding']
+        response._content = zlib.decompress(entry['body'])
+        response.from_cache = True
+        response.not_modified = status_code == 304
+        response.truncated = entry['truncated']
+        return response
+
+    def _touch(self, url, revalidated=False):
+        now = time.time()
+        with self._lock:
+            if revalidated:
+                self._conn.execute(
+                    "UPDATE responses SET stored_at = ?, last_access = ? WHERE url = ?",
+                    (now, now, url))
+            else:
+                self._conn.execute(
+                    "UPDATE responses SET last_access = ? WHERE url = ?", (now, url))
+            self._conn.commit()
+
+    def _store(self, url, response):
+        headers = {name: response.headers[name]
+                   for name in ('Content-Type', 'ETag', 'Last-Modified')
+                   if name in response.headers}
+        body = zlib.compress(response.content)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, body, len(body), len(response.content), json.dumps(headers),
+                 response.encoding, now, now, int(response.truncated)))
+            self._evict()
+            self._conn.commit()
+        self._count('stored')
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute("SELECT url, size FROM responses ORDER BY last_access")
+        doomed = []
+        for url, size in rows:
+            if total <= self.max_bytes:
+                break
+            doomed.append((url,))
+            total -= size
+        self._conn.executemany("DELETE FROM responses WHERE url = ?", doomed)
+        self.stats['evicted'] += len(doomed)  # caller holds the lock
+
+    def get(self, url, session=None, headers=None, max_bytes=None, content_types=None,
+            on_chunk=None, **kwargs):
+        """GET ``url`` through the cache.
+
+        Returns a ``requests.Response``; ``response.from_cache`` is True when
+        the body came from disk (fresh hit or 304) and ``response.not_modified``
+        is True when the server confirmed the cached copy with a 304.
+        Requests go through ``session``, by default the shared pooled
+        transport (see transport.py).
+        With ``max_bytes``, ``content_types`` or ``on_chunk`` the body is
+        streamed through read_capped. A truncated body is cached as such and
+        only served (fresh or after a 304) to callers passing ``on_chunk``,
+        which parse incrementally and stop early anyway; other callers
+        refetch the whole page.
+        """
+        metrics = get_metrics()
+        entry = self._lookup(url)
+        if entry and entry['truncated'] and on_chunk is None:
+            entry = None  # a prefix can't stand in for the page, nor can a 304 on it
+        if entry and time.time() - entry['stored_at'] < self.ttl:
+            metrics.count('fetch.cache_hits')
+            self._count('hits', saved=entry['raw_size'])
+            self._touch(url)
+            return self._build_response(url, entry, 200)
+
+        headers = dict(headers or {})
+        if entry:
+            if entry['headers'].get('ETag'):
+                headers['If-None-Match'] = entry['headers']['ETag']
+            if entry['headers'].get('Last-Modified'):
+                headers['If-Modified-Since'] = entry['headers']['Last-Modified']
+
+        streamed = max_bytes is not None or content_types is not None or on_chunk is not None
+        started = time.perf_counter()
+        try:
+            response = (session or get_transport().session).get(
+                url, headers=headers, stream=streamed, **kwargs)
+            response.truncated = False
+            if streamed:
+                if response.status_code == 304:
+                    response.close()
+                else:
+                    read_capped(response, max_bytes, content_types, on_chunk)
+        except Exception as e:
+            metrics.record_domain(url, e.__class__.__name__)
+            raise
+        metrics.observe('fetch', time.perf_counter() - started)
+        metrics.add_bytes('fetch', len(response.content))
+        metrics.record_domain(url, response.status_code)
+        if response.status_code == 304 and entry:
+            self._count('revalidated', saved=entry['raw_size'])
+            self._touch(url, revalidated=True)
+            return self._build_response(url, entry, 304)
+
+        self._count('misses')
+        if response.status_code == 200:
+            self._store(url, response)
+        response.from_cache = False
+        response.not_modified = False
+        return response
+
+    def log_stats(self):
+        logger.info("HTTP cache: {hits} hits, {revalidated} revalidated (304), {misses} misses, "
+                    "{evicted} evicted, {bytes_saved} bytes saved".format(**self.stats))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def get_cache():
+    """Return the cache shared by all fetchers, opening it on first use"""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = ResponseCache()
+    return _default_cache
+
+
+def cached_get(url, session=None, **kwargs):
+    """Drop-in replacement for ``requests.get`` backed by the shared cache and transport"""
+    return get_cache().get(url, session=session, **kwargs)
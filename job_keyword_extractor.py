@@ -1,11 +1,19 @@
+import csv
 import pandas as pd
-import requests
 from bs4 import BeautifulSoup
 import time
 from urllib.parse import urlparse
 import re
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, Iterator, List, Optional
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, as_completed, wait
 import logging
+from http_cache import HTML_CONTENT_TYPES, MAX_PAGE_BYTES, cached_get, get_cache
+from host_health import get_health
+from parse_memo import memoize
+from crawl_journal import CrawlJournal, JOURNAL_PATH
+from metrics import get_metrics
+from job_store import open_output
+from transport import get_transport
 
 # Set up logging
 logging.basicConfig(
@@ -14,11 +22,102 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Stable default output, so a rerun after an interruption resumes into it
+OUTPUT_PATH = 'job_keywords.csv'
+
+def build_trie_regex(phrases: List[str]) -> str:
+    """Build a regex matching any of the phrases, factored as a prefix trie.
+
+    Shared prefixes are tested once, so the regex engine does far less
+    branching than with a flat alternation; longer phrases are preferred.
+    """
+    trie: Dict = {}
+    for phrase in phrases:
+        node = trie
+        for char in phrase:
+            node = node.setdefault(char, {})
+        node[''] = True
+
+    def build(node: Dict) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        return f'(?:{body})?' if '' in node else body
+
+    return build(trie)
+
+
+class KeywordMatcher:
+    """Finds the keywords of every category in a single pass over the text.
+
+    Produces exactly what running ``keyword[:\\s]+([^.!?]+)`` for each keyword
+    separately would, including overlapping phrases such as 'experience'
+    inside 'years of experience'.
+    """
+
+    def __init__(self, keywords: Dict[str, List[str]]):
+        self.keywords = {category: list(phrases) for category, phrases in keywords.items()}
+        phrases = sorted({p for ps in self.keywords.values() for p in ps}, key=len, reverse=True)
+        self._tail = re.compile(r'[:\s]+([^.!?]+)')
+        trie = build_trie_regex(phrases)
+
+        # A match consumes its phrase, so the phrase itself and any phrases
+        # nested inside it are reported from this table of (offset, phrase).
+        self._hits = {
+            p: [(m.start(), q) for q in phrases
+                for m in re.finditer(f'(?={re.escape(q)})', p)]
+            for p in phrases
+        }
+        if self._has_straddling_phrases(phrases):
+            # Some phrase can start inside another and run past its end, so
+            # scan every position instead and only keep prefix nesting.
+            self._scanner = re.compile(rf'(?=({trie})(?=[:\s]))')
+            self._hits = {p: [(o, q) for o, q in hits if o == 0] for p, hits in self._hits.items()}
+        else:
+            self._scanner = re.compile(rf'({trie})(?=[:\s])')
+
+    @staticmethod
+    def _has_straddling_phrases(phrases: List[str]) -> bool:
+        """Check whether a phrase can begin inside another and continue past it."""
+        for p in phrases:
+            for q in phrases:
+                for cut in range(1, len(p)):
+                    suffix = p[cut:]
+                    if len(q) > len(suffix) and q.startswith(suffix) and re.match(r'[:\s]', q[len(suffix)]):
+                        return True
+        return False
+
+    def match_all(self, text: str) -> Dict[str, List[str]]:
+        """Return the captures for every category, in keyword order."""
+        text = text.lower()
+        captures: Dict[str, List[str]] = {}
+        ends: Dict[str, int] = {}
+        tail_match = self._tail.match
+
+        for match in self._scanner.finditer(text):
+            phrase = match.group(1)
+            start = match.start(1)
+            for offset, hit in self._hits[phrase]:
+                pos = start + offset
+                # Each keyword's matches never overlap, as with re.finditer
+                if pos < ends.get(hit, 0):
+                    continue
+                tail = tail_match(text, pos + len(hit))
+                if tail:
+                    captures.setdefault(hit, []).append(tail.group(1).strip())
+                    ends[hit] = tail.end()
+
+        return {
+            category: [c for phrase in phrases for c in captures.get(phrase, ())]
+            for category, phrases in self.keywords.items()
+        }
+
+
 class JobKeywordExtractor:
     def __init__(self):
-        self.headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
+        # Fixed request headers; None rotates the shared transport's user agents
+        self.headers: Optional[Dict[str, str]] = None
         self.keywords = {
             'experience': ['experience', 'years of experience', 'work experience'],
             'skills': ['skills', 'required skills', 'qualifications', 'requirements'],
@@ -27,6 +126,9 @@ class JobKeywordExtractor:
             'salary': ['salary', 'compensation', 'pay', 'package'],
             'job_type': ['job type', 'employment type', 'full-time', 'part-time', 'contract']
         }
+        self._matcher: Optional[KeywordMatcher] = None
+        # Download budget per page; text past it is not searched for keywords
+        self.max_page_bytes = MAX_PAGE_BYTES
 
     def is_valid_url(self, url: str) -> bool:
         """Check if the URL is valid and accessible."""
@@ -37,29 +139,39 @@ class JobKeywordExtractor:
             return False
 
     def fetch_page_content(self, url: str) -> Optional[str]:
-        """Fetch the content of a webpage."""
+        """Fetch the content of a webpage.
+
+        The body is streamed and capped at max_page_bytes; non-HTML responses
+        are rejected before their body is downloaded.
+        """
         try:
-            response = requests.get(url, headers=self.headers, timeout=10)
+            response = get_health().request(
+                lambda: cached_get(url, headers=self.headers or get_transport().headers(), timeout=10,
+                                   max_bytes=self.max_page_bytes,
+                                   content_types=HTML_CONTENT_TYPES), url)
             response.raise_for_status()
+            if response.truncated:
+                logger.warning(f"Page truncated at {self.max_page_bytes} bytes: {url}")
             return response.text
         except Exception as e:
             logger.error(f"Error fetching {url}: {str(e)}")
             return None
 
+    @property
+    def matcher(self) -> KeywordMatcher:
+        """Compiled matcher for the current keyword table (rebuilt if it changes)."""
+        if self._matcher is None or self._matcher.keywords != self.keywords:
+            self._matcher = KeywordMatcher(self.keywords)
+        return self._matcher
+
     def extract_keywords(self, text: str, keyword_type: str) -> List[str]:
         """Extract relevant information based on keyword type."""
-        text = text.lower()
-        found_keywords = []
-        
-        for keyword in self.keywords[keyword_type]:
-            # Create a pattern that looks for the keyword and captures text after it
-            pattern = f"{keyword}[:\s]+([^.!?]+)"
-            matches = re.finditer(pattern, text)
-            
-            for match in matches:
-                found_keywords.append(match.group(1).strip())
-        
-        return found_keywords
+        return self.extract_all_keywords(text)[keyword_type]
+
+    def extract_all_keywords(self, text: str) -> Dict[str, List[str]]:
+        """Extract every keyword category in one pass over the text."""
+        with get_metrics().timer('keywords'):
+            return self.matcher.match_all(text)
 
     def process_url(self, url: str) -> Dict:
         """Process a single URL and extract relevant information."""
@@ -71,37 +183,123 @@ class JobKeywordExtractor:
         if not content:
             return {'url': url, 'error': 'Failed to fetch content'}
 
+        # Unchanged pages reuse the previous extraction without reparsing
+        extracted = memoize('job_keywords', content, self._extract_all,
+                            KeywordMatcher.match_all, self.keywords)
+        return {'url': url, **extracted}
+
+    def _extract_all(self, content: str) -> Dict:
+        """Parse a page and extract every keyword category from its text."""
         soup = BeautifulSoup(content, 'html.parser')
         text_content = soup.get_text()
 
-        result = {'url': url}
-        for keyword_type in self.keywords.keys():
-            extracted = self.extract_keywords(text_content, keyword_type)
-            result[keyword_type] = extracted if extracted else []
+        return self.extract_all_keywords(text_content)
 
+    def iter_urls(self, csv_path: str, url_column: str) -> Iterator[str]:
+        """Lazily yield the URLs of a CSV file, one row at a time."""
+        with open(csv_path, mode='r', encoding='utf-8', newline='') as infile:
+            reader = csv.DictReader(infile)
+            if url_column not in (reader.fieldnames or []):
+                raise ValueError(f"Column '{url_column}' not found in CSV file")
+            for row in reader:
+                yield row[url_column]
+
+    def _process_and_record(self, url: str, journal: Optional[CrawlJournal], delay: float) -> Dict:
+        """Process one URL, record the outcome and pause before the worker's next request."""
+        with get_metrics().busy('keywords'):
+            result = self.process_url(url)
+        if journal:
+            if result.get('error'):
+                journal.mark_failed(url, result['error'], result)
+            else:
+                journal.mark_parsed(url, result)
+        # Add a small delay to avoid overwhelming servers
+        time.sleep(delay)
         return result
 
-    def process_csv(self, csv_path: str, url_column: str) -> pd.DataFrame:
-        """Process URLs from a CSV file and extract keywords."""
-        try:
-            df = pd.read_csv(csv_path)
-            if url_column not in df.columns:
-                raise ValueError(f"Column '{url_column}' not found in CSV file")
+    def iter_results(self, urls: Iterable[str], max_in_flight: int = 4, delay: float = 2.0,
+                     journal: Optional[CrawlJournal] = None,
+                     include_done: bool = False, record: bool = True) -> Iterator[Dict]:
+        """Process URLs through a bounded window, yielding results as they complete.
 
-            results = []
-            total_urls = len(df)
-            
-            for idx, row in df.iterrows():
-                url = row[url_column]
-                logger.info(f"Processing URL {idx + 1}/{total_urls}: {url}")
-                
-                result = self.process_url(url)
-                results.append(result)
-                
-                # Add a small delay to avoid overwhelming servers
-                time.sleep(2)
-
-            return pd.DataFrame(results)
+        At most ``max_in_flight`` URLs are being processed at any time and the
+        input is only read as slots free up, so memory does not grow with the
+        number of URLs. URLs the journal already has are skipped, or replayed
+        from the journal when ``include_done`` is set. Without ``record`` the
+        caller records outcomes in the journal itself.
+        """
+        metrics = get_metrics()
+        metrics.pool_started('keywords', max_in_flight)
+        with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+            in_flight = set()
+            for idx, url in enumerate(urls, 1):
+                if journal and not journal.needs_work(url):
+                    stored = journal.result(url) if include_done else None
+                    if stored:
+                        yield stored
+                    continue
+                if len(in_flight) >= max_in_flight:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield future.result()
+                logger.info(f"Processing URL {idx}: {url}")
+                in_flight.add(executor.submit(self._process_and_record, url,
+                                              journal if record else None, delay))
+                metrics.queue_depth('keywords.in_flight', len(in_flight))
+            for future in as_completed(in_flight):
+                yield future.result()
+        metrics.pool_finished('keywords')
+
+    def process_csv_stream(self, csv_path: str, url_column: str, output_path: str,
+                           max_in_flight: int = 4, delay: float = 2.0,
+                           journal_path: Optional[str] = None,
+                           overwrite: bool = False) -> Dict[str, int]:
+        """Stream URLs from one CSV to keyword results in another.
+
+        Results are written in batches as they complete. An output_path
+        named *.parquet is written as a Parquet dataset whose keyword columns
+        are real lists rather than stringified ones; new rows are added to
+        an existing dataset unless ``overwrite`` is set. With a journal_path a
+        rerun appends to output_path and only processes unfinished URLs.
+        Returns counts of processed, successful and failed URLs.
+        """
+        journal = CrawlJournal('job_keywords', journal_path) if journal_path else None
+        resuming = journal is not None and journal.begin(output_path)
+        counts = {'processed': 0, 'successful': 0, 'failed': 0}
+
+        def record_written(results: List[Dict]) -> None:
+            # Rows are only marked done once they are on disk
+            for result in results:
+                if result.get('error'):
+                    journal.mark_failed(result['url'], result['error'], result)
+                else:
+                    journal.mark_parsed(result['url'], result)
+
+        with open_output(output_path, ['url', *self.keywords, 'error'], list_fields=self.keywords,
+                         append=resuming, on_flush=record_written if journal else None,
+                         overwrite=overwrite) as writer:
+            urls = self.iter_urls(csv_path, url_column)
+            for result in self.iter_results(urls, max_in_flight, delay, journal, record=False):
+                writer.write(result)
+                counts['processed'] += 1
+                counts['failed' if result.get('error') else 'successful'] += 1
+        if journal:
+            journal.finish()
+
+        return counts
+
+    def process_csv(self, csv_path: str, url_column: str,
+                    journal_path: Optional[str] = None, delay: float = 2.0) -> pd.DataFrame:
+        """Process URLs from a CSV file and extract keywords.
+
+        Returns every result as a DataFrame, in input order. Prefer
+        process_csv_stream for large inputs.
+        """
+        try:
+            journal = CrawlJournal('job_keywords', journal_path) if journal_path else None
+            urls = self.iter_urls(csv_path, url_column)
+            return pd.DataFrame(list(self.iter_results(urls, max_in_flight=1, delay=delay,
+                                                       journal=journal, include_done=True)))
 
         except Exception as e:
             logger.error(f"Error processing CSV: {str(e)}")
@@ -113,21 +311,23 @@ def main():
         # Get input from user
         csv_path = input("Enter the path to your CSV file: ").strip()
         url_column = input("Enter the name of the column containing URLs: ").strip()
+        output_file = input(f"Enter the output file (*.csv or *.parquet) [{OUTPUT_PATH}]: ").strip()
+        output_file = output_file or OUTPUT_PATH
 
-        # Initialize extractor and process CSV
+        # Initialize extractor and stream results to the output file
         extractor = JobKeywordExtractor()
-        results_df = extractor.process_csv(csv_path, url_column)
-
-        # Save results
-        output_file = f"job_keywords_{time.strftime('%Y%m%d_%H%M%S')}.csv"
-        results_df.to_csv(output_file, index=False)
+        counts = extractor.process_csv_stream(csv_path, url_column, output_file,
+                                              journal_path=JOURNAL_PATH)
         logger.info(f"Results saved to {output_file}")
 
         # Display summary
         print("\nExtraction Summary:")
-        print(f"Total URLs processed: {len(results_df)}")
-        print(f"Successful extractions: {len(results_df[~results_df['error'].notna()])}")
-        print(f"Failed extractions: {len(results_df[results_df['error'].notna()])}")
+        print(f"Total URLs processed: {counts['processed']}")
+        print(f"Successful extractions: {counts['successful']}")
+        print(f"Failed extractions: {counts['failed']}")
+        stats = get_cache().stats
+        print(f"Cache hits: {stats['hits'] + stats['revalidated']}, bytes saved: {stats['bytes_saved']}")
+        print(get_metrics().report())
 
     except Exception as e:
         logger.error(f"An error occurred: {str(e)}")
@@ -0,0 +1,243 @@
+import argparse
+import csv
+import logging
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from crawl_journal import CrawlJournal, JOURNAL_PATH
+from dedup import get_dedup
+from extraction_plan import FIELDS, document_text, parse_lxml
+from extra import get_headers
+from host_health import get_health
+from job_store import open_output
+from http_cache import HTML_CONTENT_TYPES, MAX_PAGE_BYTES, cached_get, get_cache
+from job_keyword_extractor import JobKeywordExtractor, KeywordMatcher
+from metrics import get_metrics
+from parse_memo import memoize
+from site_adapters import generic_fields, get_adapter
+
+logger = logging.getLogger(__name__)
+
+GENERIC_FIELDS = ('experience', 'salary', 'details')
+
+
+class JobPipeline:
+    """Single-fetch job page pipeline.
+
+    Each URL is downloaded once and parsed once with lxml; the site
+    adapter's structured fields, the generic label heuristics and the
+    keyword extraction all run over that one document and are written as
+    one row. Replaces running extra.py, JobScraper and JobKeywordExtractor
+    over the same URL list. Keyword extraction is skipped for near-duplicate
+    reposts of a page already seen.
+    """
+
+    def __init__(self, max_workers=5, request_delay=1.0, timeout=10):
+        self.max_workers = max_workers
+        self.request_delay = request_delay
+        self.timeout = timeout
+        self.keywords = JobKeywordExtractor().keywords
+        self.matcher = KeywordMatcher(self.keywords)
+        self.cache = get_cache()
+        self.health = get_health()
+        self.dedup = get_dedup()
+        self.fieldnames = ['url', 'site', *FIELDS,
+                           *(f'generic_{field}' for field in GENERIC_FIELDS),
+                           *(f'kw_{category}' for category in self.keywords), 'cluster_id', 'error']
+
+    def fetch(self, url):
+        self.health.check(url)
+        if not self.cache.is_fresh(url):
+            time.sleep(self.request_delay)
+        response = self.health.request(
+            lambda: cached_get(url, headers=get_headers(), timeout=self.timeout,
+                               max_bytes=MAX_PAGE_BYTES, content_types=HTML_CONTENT_TYPES), url)
+        response.raise_for_status()
+        return response
+
+    def analyze(self, url, content):
+        """Every extraction stage for one page; returns (result, cluster_id).
+
+        Site fields and the generic heuristics always run. Keywords are only
+        extracted for the first page of a near-duplicate cluster; reposts get
+        an empty ``keywords``. Each stage is memoized on the page content and
+        the page is parsed at most once.
+        """
+        adapter = get_adapter(url)
+        parsed = []
+
+        def tree(page):
+            if not parsed:
+                parsed.append(parse_lxml(page))
+            return parsed[0]
+
+        result = memoize(f'pipeline:{adapter.name}', content,
+                         lambda page: self._extract(adapter, page, tree(page)),
+                         self._extract, generic_fields, adapter.selectors, adapter.defaults)
+        text = result['fields'].get('description') or result['generic']['details']
+        cluster_id, duplicate = self.dedup.assign(url, text)
+        if duplicate:
+            result['keywords'] = {}
+        else:
+            result['keywords'] = memoize('pipeline:keywords', content,
+                                         lambda page: self._keywords(tree(page)),
+                                         self._keywords, document_text, KeywordMatcher.match_all,
+                                         self.keywords)
+        return result, cluster_id
+
+    def _extract(self, adapter, content, tree):
+        return {
+            'site': adapter.name,
+            'fields': adapter.extract(content, tree),
+            'generic': generic_fields(tree),
+        }
+
+    def _keywords(self, tree):
+        return self.matcher.match_all(document_text(tree))
+
+    def process_url(self, url):
+        """Fetch and analyze one URL; returns a flat output row"""
+        try:
+            response = self.fetch(url)
+            result, cluster_id = self.analyze(url, response.content)
+        except Exception as e:
+            logger.error(f"Error processing {url}: {e}")
+            return {'url': url, 'error': str(e)}
+        row = {'url': url, 'site': result['site'], **result['fields'], 'cluster_id': cluster_id}
+        row.update((f'generic_{field}', value) for field, value in result['generic'].items())
+        row.update((f'kw_{category}', values) for category, values in result['keywords'].items())
+        return row
+
+    def process_csv(self, input_file, output_file, journal_path=None, metrics_json=None,
+                    overwrite=False):
+        """Run the pipeline over the 'url' column of a CSV, writing one row per URL
+
+        Takes the same crawl journal (resume), metrics_json and overwrite
+        arguments as the other process_csv functions. Keyword columns are joined with
+        ' | ' in CSV output and kept as lists in *.parquet output. Reposts
+        share the ``cluster_id`` of the first page of their cluster and only
+        that row has keyword columns.
+        """
+        with open(input_file, mode='r', encoding='utf-8') as infile:
+            urls = [row['url'] for row in csv.DictReader(infile) if row.get('url')]
+
+        journal = CrawlJournal('job_pipeline', journal_path) if journal_path else None
+        resuming = journal is not None and journal.begin(output_file)
+        if resuming:
+            urls = journal.todo(urls)
+
+        def record_written(rows):
+            # Rows are only marked done once they are on disk
+            for row in rows:
+                if row.get('error'):
+                    journal.mark_failed(row['url'], row['error'])
+                else:
+                    journal.mark_parsed(row['url'])
+
+        metrics = get_metrics()
+        list_fields = [f'kw_{category}' for category in self.keywords]
+        with open_output(output_file, self.fieldnames, list_fields, append=resuming,
+                         on_flush=record_written if journal else None,
+                         list_separator=' | ', overwrite=overwrite) as writer:
+            metrics.pool_started('pipeline', self.max_workers)
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                for written, row in enumerate(executor.map(self._process_timed, urls), 1):
+                    writer.write(row)
+                    metrics.queue_depth('pipeline.pending', len(urls) - written)
+            metrics.pool_finished('pipeline')
+        if journal:
+            journal.finish()
+
+        self.cache.log_stats()
+        logger.info(metrics.report())
+        if metrics_json:
+            metrics.export_json(metrics_json)
+
+    def _process_timed(self, url):
+        metrics = get_metrics()
+        with metrics.busy('pipeline'), metrics.timer('pipeline'):
+            return self.process_url(url)
+
+
+def check_parity(pages):
+    """Compare the pipeline's stages with the separate scrapers on (url, content) pages.
+
+    Returns a list of (url, stage, pipeline value, scraper value) differences.
+    """
+    import extra
+    from extr import JobScraper
+
+    pipeline = JobPipeline()
+    extractor = JobKeywordExtractor()
+    scraper = JobScraper()
+    legacy_parsers = {'naukri': extra.parse_naukri, 'apple': extra.parse_apple_jobs}
+    differences = []
+    for url, content in pages:
+        tree = parse_lxml(content)
+        result = pipeline._extract(get_adapter(url), content, tree)
+        result['keywords'] = pipeline._keywords(tree)
+        expected = {
+            'generic': extra.parse_generic_job(content),
+            'keywords': extractor._extract_all(content),
+        }
+        site = result['site']
+        if site in legacy_parsers:
+            legacy = legacy_parsers[site](content)
+            expected['fields'] = {'experience': legacy['experience'], 'salary': legacy['salary'],
+                                  'description': legacy['details']}
+        elif site != 'generic':
+            plan = scraper.get_plan(scraper.get_site(url))
+            expected['fields'] = plan.extract_with_soup(content.decode('utf-8'))
+        for stage, value in expected.items():
+            actual = result[stage]
+            if stage == 'fields':
+                actual = {field: actual[field] for field in value}
+            if actual != value:
+                differences.append((url, stage, actual, value))
+    return differences
+
+
+def parity_pages():
+    """Fake job board pages for every adapter plus the saved sample pages"""
+    from fake_job_board import BOARD_HOSTS, FakeJobBoard
+
+    board = FakeJobBoard(latency=0)
+    pages = [(f"http://{host}/job/{i}", board.render(host, f"/job/{i}"))
+             for host in BOARD_HOSTS for i in range(5)]
+    board.server_close()
+    for path in ('debug_page.html', 'inde.html'):
+        with open(path, 'rb') as f:
+            pages.append((f"http://saved.example.com/{path}", f.read()))
+    return pages
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fetch each job page once and extract everything")
+    parser.add_argument('input', nargs='?', help="CSV with a 'url' column")
+    parser.add_argument('output', nargs='?', default='job_pipeline.csv')
+    parser.add_argument('--workers', type=int, default=5)
+    parser.add_argument('--metrics-json')
+    parser.add_argument('--overwrite', action='store_true',
+                        help="replace an existing *.parquet dataset instead of adding to it")
+    parser.add_argument('--check', action='store_true',
+                        help="compare against the separate scrapers on sample pages and exit")
+    args = parser.parse_args()
+
+    if args.check:
+        differences = check_parity(parity_pages())
+        for url, stage, actual, expected in differences:
+            print(f"{url} [{stage}]\n  pipeline: {actual!r}\n  scraper:  {expected!r}")
+        print(f"{len(differences)} differences")
+        return 1 if differences else 0
+    if not args.input:
+        parser.error("input is required unless --check is given")
+
+    JobPipeline(max_workers=args.workers).process_csv(
+        args.input, args.output, journal_path=JOURNAL_PATH, metrics_json=args.metrics_json,
+        overwrite=args.overwrite)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
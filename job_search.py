@@ -0,0 +1,355 @@
+import argparse
+import csv
+import hashlib
+import io
+import json
+import math
+import os
+import shutil
+import sys
+import time
+import zipfile
+from collections import Counter
+
+import numpy as np
+
+from resume import tokenize
+
+INDEX_PATH = 'job_index'
+CORPUS_ZIP = 'archive (1).zip'
+CORPUS_MEMBER = 'job_title_des.csv'
+K1 = 1.2  # BM25 term frequency saturation
+B = 0.75  # BM25 document length normalisation
+MAX_SEGMENTS = 8  # merge once more segments than this have been committed
+SNIPPET_CHARS = 200
+STOPWORDS = frozenset("""
+a an and are as at be by for from has have in is it its of on or our that the this to
+was we were will with you your
+""".split())
+
+
+def index_terms(text):
+    return [token for token in tokenize(text) if token not in STOPWORDS]
+
+
+def text_digest(text):
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]
+
+
+class Segment:
+    """One immutable on-disk slice of the index.
+
+    Postings are stored as flat numpy arrays (document numbers and term
+    frequencies) that are memory-mapped, not read, when the segment is
+    opened; the lexicon maps each term to its slice of them.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.name = os.path.basename(path)
+        with open(os.path.join(path, 'lexicon.json'), encoding='utf-8') as f:
+            self.lexicon = json.load(f)
+        self.doc_ids = np.load(os.path.join(path, 'doc_ids.npy'), mmap_mode='r')
+        self.tfs = np.load(os.path.join(path, 'tfs.npy'), mmap_mode='r')
+        self.doc_lens = np.load(os.path.join(path, 'doc_lens.npy'), mmap_mode='r')
+        self.doc_offsets = np.load(os.path.join(path, 'doc_offsets.npy'), mmap_mode='r')
+        with open(os.path.join(path, 'keys.json'), encoding='utf-8') as f:
+            self.keys, self.digests = zip(*json.load(f)) if len(self.doc_lens) else ((), ())
+
+    def __len__(self):
+        return len(self.doc_lens)
+
+    def postings(self, term):
+        """(document numbers, term frequencies) for a term, as memory-mapped slices"""
+        entry = self.lexicon.get(term)
+        if entry is None:
+            return None
+        offset, count = entry
+        return self.doc_ids[offset:offset + count], self.tfs[offset:offset + count]
+
+    def document(self, doc):
+        with open(os.path.join(self.path, 'docs.jsonl'), 'rb') as f:
+            f.seek(int(self.doc_offsets[doc]))
+            return json.loads(f.readline())
+
+    @staticmethod
+    def write(path, documents, postings):
+        """Write documents [(meta, length)] and postings {term: [(doc, tf)]} as a segment"""
+        tmp = path + '.tmp'
+        os.makedirs(tmp)
+        lexicon = {}
+        doc_ids, tfs = [], []
+        for term in sorted(postings):
+            lexicon[term] = [len(doc_ids), len(postings[term])]
+            for doc, tf in postings[term]:
+                doc_ids.append(doc)
+                tfs.append(tf)
+        np.save(os.path.join(tmp, 'doc_ids.npy'), np.array(doc_ids, dtype=np.uint32))
+        np.save(os.path.join(tmp, 'tfs.npy'), np.array(tfs, dtype=np.uint16))
+        np.save(os.path.join(tmp, 'doc_lens.npy'),
+                np.array([length for _, length in documents], dtype=np.uint32))
+        offsets = []
+        with open(os.path.join(tmp, 'docs.jsonl'), 'wb') as f:
+            for meta, _ in documents:
+                offsets.append(f.tell())
+                f.write(json.dumps(meta).encode('utf-8') + b'\n')
+        np.save(os.path.join(tmp, 'doc_offsets.npy'), np.array(offsets, dtype=np.uint64))
+        with open(os.path.join(tmp, 'keys.json'), 'w', encoding='utf-8') as f:
+            json.dump([[meta['key'], meta['digest']] for meta, _ in documents], f)
+        with open(os.path.join(tmp, 'lexicon.json'), 'w', encoding='utf-8') as f:
+            json.dump(lexicon, f, separators=(',', ':'))
+        os.replace(tmp, path)
+
+
+class JobIndex:
+    """Persistent BM25 index over job descriptions, built incrementally.
+
+    Documents added with ``add`` are buffered and written as a new segment
+    by ``commit``; a document re-added under the same key replaces the old
+    one, which is marked deleted. Once there are more than MAX_SEGMENTS
+    segments they are merged into one. ``search`` scores every segment
+    term-at-a-time over the memory-mapped postings.
+    """
+
+    def __init__(self, path=INDEX_PATH):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self._manifest_path = os.path.join(path, 'manifest.json')
+        if os.path.exists(self._manifest_path):
+            with open(self._manifest_path, encoding='utf-8') as f:
+                manifest = json.load(f)
+        else:
+            manifest = {'segments': [], 'deleted': {}, 'next_segment': 1}
+        self._next_segment = manifest['next_segment']
+        self.segments = [Segment(os.path.join(path, name)) for name in manifest['segments']]
+        self.deleted = {segment.name: set(manifest['deleted'].get(segment.name, ()))
+                        for segment in self.segments}
+        self._locations = {key: (segment.name, doc, digest) for segment in self.segments
+                           for doc, (key, digest) in enumerate(zip(segment.keys, segment.digests))}
+        self._pending = {}
+
+    def __len__(self):
+        return len(self._locations)
+
+    def __contains__(self, key):
+        return key in self._locations or key in self._pending
+
+    def add(self, key, text, **meta):
+        """Queue a document for the next commit (``meta``: title, url, source, ...)
+
+        Returns False, and queues nothing, if the key is indexed with the same text.
+        """
+        digest = text_digest(text)
+        if self._locations.get(key, (None, None, None))[2] == digest:
+            return False
+        self._pending[key] = (text, dict(meta, digest=digest))
+        return True
+
+    def commit(self):
+        """Write the queued documents as a new segment; returns how many"""
+        if not self._pending:
+            return 0
+        documents, postings = [], {}
+        for doc, (key, (text, meta)) in enumerate(self._pending.items()):
+            terms = Counter(index_terms(text))
+            for term, tf in terms.items():
+                postings.setdefault(term, []).append((doc, min(tf, 0xFFFF)))
+            documents.append(({'key': key, **meta, 'snippet': ' '.join(text.split())[:SNIPPET_CHARS]},
+                              sum(terms.values())))
+        name = f"seg-{self._next_segment:06d}"
+        Segment.write(os.path.join(self.path, name), documents, postings)
+        self._next_segment += 1
+
+        for key in self._pending:
+            if key in self._locations:
+                old_segment, old_doc, _ = self._locations[key]
+                self.deleted[old_segment].add(old_doc)
+        segment = Segment(os.path.join(self.path, name))
+        self.segments.append(segment)
+        self.deleted[name] = set()
+        for doc, (key, digest) in enumerate(zip(segment.keys, segment.digests)):
+            self._locations[key] = (name, doc, digest)
+        added = len(self._pending)
+        self._pending = {}
+        self._save_manifest()
+        if len(self.segments) > MAX_SEGMENTS:
+            self.merge()
+        return added
+
+    def _save_manifest(self):
+        manifest = {'segments': [segment.name for segment in self.segments],
+                    'deleted': {name: sorted(docs) for name, docs in self.deleted.items() if docs},
+                    'next_segment': self._next_segment}
+        tmp = self._manifest_path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+        os.replace(tmp, self._manifest_path)
+
+    def merge(self):
+        """Merge every segment into one, dropping deleted documents"""
+        if len(self.segments) < 2 and not any(self.deleted.values()):
+            return
+        documents, postings, renumber = [], {}, {}
+        for segment in self.segments:
+            deleted = self.deleted[segment.name]
+            for doc in range(len(segment)):
+                if doc not in deleted:
+                    renumber[segment.name, doc] = len(documents)
+                    meta = segment.document(doc)
+                    documents.append((meta, int(segment.doc_lens[doc])))
+            for term, (offset, count) in segment.lexicon.items():
+                merged = postings.setdefault(term, [])
+                for doc, tf in zip(segment.doc_ids[offset:offset + count].tolist(),
+                                   segment.tfs[offset:offset + count].tolist()):
+                    new = renumber.get((segment.name, doc))
+                    if new is not None:
+                        merged.append((new, tf))
+        postings = {term: docs for term, docs in postings.items() if docs}
+        old = self.segments
+        name = f"seg-{self._next_segment:06d}"
+        Segment.write(os.path.join(self.path, name), documents, postings)
+        self._next_segment += 1
+        segment = Segment(os.path.join(self.path, name))
+        self.segments, self.deleted = [segment], {name: set()}
+        self._locations = {key: (name, doc, digest)
+                           for doc, (key, digest) in enumerate(zip(segment.keys, segment.digests))}
+        self._save_manifest()
+        for segment in old:
+            shutil.rmtree(segment.path, ignore_errors=True)
+
+    def search(self, query_terms, k=10):
+        """Top ``k`` documents for the query terms, as [(score, document metadata)]"""
+        weights = Counter(term for text in query_terms for term in index_terms(text))
+        # Deleted documents count for neither the collection statistics nor the results
+        live = []
+        for segment in self.segments:
+            alive = np.ones(len(segment), dtype=bool)
+            alive[sorted(self.deleted[segment.name])] = False
+            live.append((segment, alive))
+        n_docs = sum(int(alive.sum()) for _, alive in live)
+        if not n_docs or not weights:
+            return []
+        avg_len = sum(int(segment.doc_lens[alive].sum()) for segment, alive in live) / n_docs
+
+        scores = [np.zeros(len(segment), dtype=np.float32) for segment, _ in live]
+        for term, weight in weights.items():
+            found = [segment.postings(term) for segment, _ in live]
+            df = sum(int(alive[p[0]].sum()) for (_, alive), p in zip(live, found) if p is not None)
+            if not df:
+                continue
+            idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+            for (segment, _), segment_scores, posting in zip(live, scores, found):
+                if posting is None:
+                    continue
+                docs, tfs = posting
+                tfs = tfs.astype(np.float32)
+                norm = K1 * (1 - B + B * segment.doc_lens[docs] / avg_len)
+                segment_scores[docs] += weight * idf * tfs * (K1 + 1) / (tfs + norm)
+
+        candidates = []
+        for (segment, alive), segment_scores in zip(live, scores):
+            segment_scores[~alive] = 0
+            top = np.argpartition(segment_scores, -min(k, len(segment)))[-k:]
+            candidates.extend((float(segment_scores[doc]), segment, int(doc))
+                              for doc in top if segment_scores[doc] > 0)
+        candidates.sort(key=lambda c: c[0], reverse=True)
+        return [(score, segment.document(doc)) for score, segment, doc in candidates[:k]]
+
+
+def resume_query(analysis):
+    """Query terms from an analyze_resume() result: its skills and its projects"""
+    terms = [skill['skill'] for skills in analysis.get('skills', {}).values() for skill in skills]
+    for project in analysis.get('projects', []):
+        terms.append(project['name'])
+        terms.extend(project['technologies'])
+    return terms
+
+
+def iter_corpus_jobs(path=CORPUS_ZIP, member=CORPUS_MEMBER):
+    """(key, text, meta) for every job in the job_title_des.csv archive"""
+    with zipfile.ZipFile(path) as archive:
+        with archive.open(member) as raw:
+            for i, row in enumerate(csv.DictReader(io.TextIOWrapper(raw, encoding='utf-8'))):
+                title = row['Job Title']
+                yield (f"corpus:{row[''] or i}", f"{title}\n{row['Job Description']}",
+                       {'title': title, 'source': 'job_title_des.csv'})
+
+
+def iter_scraped_jobs(path):
+    """(key, text, meta) for the rows of a scraper output (CSV or Parquet)
+
+    Rows that failed or repeat an already seen cluster_id are skipped.
+    """
+    from job_store import read_output
+    df = read_output(path)
+    seen_clusters = set()
+    for row in df.to_dict('records'):
+        if isinstance(row.get('error'), str) and row['error']:
+            continue
+        cluster = row.get('cluster_id')
+        if isinstance(cluster, str):
+            if cluster in seen_clusters:
+                continue
+            seen_clusters.add(cluster)
+        text = next((row[field] for field in ('description', 'details', 'generic_details')
+                     if isinstance(row.get(field), str) and row[field]), '')
+        title = row.get('title') if isinstance(row.get('title'), str) else ''
+        if text:
+            yield row['url'], f"{title}\n{text}", {'title': title, 'url': row['url'],
+                                                   'source': os.path.basename(path)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search scraped jobs for the best matches to a resume")
+    parser.add_argument('--index', default=INDEX_PATH)
+    sub = parser.add_subparsers(dest='command', required=True)
+    add = sub.add_parser('add', help="index the corpus and/or scraper outputs")
+    add.add_argument('outputs', nargs='*', help="scraper output files (CSV or *.parquet)")
+    add.add_argument('--corpus', action='store_true', help=f"index {CORPUS_MEMBER}")
+    search = sub.add_parser('search', help="top jobs for a resume PDF or free-text query")
+    search.add_argument('query', help="resume PDF, or query text")
+    search.add_argument('-k', type=int, default=10)
+    sub.add_parser('merge', help="merge all segments into one")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    index = JobIndex(args.index)
+    print(f"Opened {len(index)} documents in {len(index.segments)} segments "
+          f"({(time.perf_counter() - started) * 1000:.0f} ms)")
+
+    if args.command == 'add':
+        sources = [iter_scraped_jobs(path) for path in args.outputs]
+        if args.corpus:
+            sources.append(iter_corpus_jobs())
+        unchanged = 0
+        for source in sources:
+            for key, text, meta in source:
+                unchanged += not index.add(key, text, **meta)
+        started = time.perf_counter()
+        added = index.commit()
+        print(f"Indexed {added} documents in {time.perf_counter() - started:.1f}s "
+              f"({unchanged} unchanged skipped)")
+    elif args.command == 'merge':
+        index.merge()
+        print(f"Merged into {len(index.segments)} segment")
+    else:
+        if args.query.lower().endswith('.pdf'):
+            from resume import analyze_resume
+            analysis = analyze_resume(args.query)
+            if 'error' in analysis:
+                print(f"Error: {analysis['error']}")
+                return 1
+            terms = resume_query(analysis)
+        else:
+            terms = [args.query]
+        started = time.perf_counter()
+        results = index.search(terms, args.k)
+        print(f"Query {terms!r}: {len(results)} results in {(time.perf_counter() - started) * 1000:.1f} ms")
+        for score, doc in results:
+            print(f"{score:7.2f}  {doc.get('title', '')} [{doc.get('url') or doc['key']}]\n"
+                  f"         {doc['snippet'][:120]}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
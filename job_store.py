@@ -0,0 +1,214 @@
+import argparse
+import csv
+import glob
+import os
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+    HAVE_ARROW = True
+except ImportError:
+    HAVE_ARROW = False
+
+CSV_BATCH_ROWS = 50  # rows between CSV flushes
+PARQUET_BATCH_ROWS = 1000  # rows per Parquet part file (one row group each)
+ROW_GROUP_ROWS = 64 * 1024  # rows per row group when compacting a dataset
+
+
+def is_parquet(path):
+    """Outputs named *.parquet are Parquet datasets, anything else is CSV"""
+    return path.rstrip('/\\').endswith('.parquet')
+
+
+class CsvOutput:
+    """Rows appended to a CSV file, flushed every ``batch_rows`` rows.
+
+    List values are written with ``str()`` (as csv.DictWriter does) or,
+    with ``list_separator``, joined into one string. ``on_flush`` is called
+    with the rows that have just reached the file.
+    """
+
+    def __init__(self, path, fieldnames, list_fields=(), append=False, on_flush=None,
+                 batch_rows=CSV_BATCH_ROWS, list_separator=None):
+        self.path = path
+        self.list_fields = set(list_fields)
+        self.list_separator = list_separator
+        self.on_flush = on_flush
+        self.batch_rows = batch_rows
+        self._pending = []
+        self._file = open(path, mode='a' if append else 'w', encoding='utf-8', newline='')
+        self._writer = csv.DictWriter(self._file, fieldnames=fieldnames)
+        if not append:
+            self._writer.writeheader()
+
+    def write(self, row):
+        if self.list_separator is not None:
+            row = {k: self.list_separator.join(v) if k in self.list_fields and isinstance(v, list) else v
+                   for k, v in row.items()}
+        self._writer.writerow(row)
+        self._pending.append(row)
+        if len(self._pending) >= self.batch_rows:
+            self.flush()
+
+    def flush(self):
+        self._file.flush()
+        rows, self._pending = self._pending, []
+        if rows and self.on_flush:
+            self.on_flush(rows)
+
+    def close(self):
+        self.flush()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ParquetOutput:
+    """Rows appended to a Parquet dataset directory.
+
+    Every ``batch_rows`` rows are written as one new part file, so a run
+    (or a resumed run) only ever adds files and rows are on disk as soon
+    as ``on_flush`` reports them. Earlier runs' part files are kept, so one
+    dataset can collect a month of scrapes; with ``append=False`` they are
+    deleted first. Scalar fields are strings, ``list_fields`` are lists of
+    strings, and the time each batch is written is added as a
+    ``scraped_at`` UTC timestamp.
+    """
+
+    def __init__(self, path, fieldnames, list_fields=(), append=True, on_flush=None,
+                 batch_rows=PARQUET_BATCH_ROWS):
+        if not HAVE_ARROW:
+            raise RuntimeError("Parquet output needs pyarrow (pip install pyarrow)")
+        self.path = path
+        self.schema = output_schema(fieldnames, list_fields)
+        self.on_flush = on_flush
+        self.batch_rows = batch_rows
+        self._pending = []
+        self._run = time.strftime('%Y%m%d%H%M%S')
+        self._parts = 0
+        os.makedirs(path, exist_ok=True)
+        if not append:
+            for part in glob.glob(os.path.join(path, 'part-*.parquet')) \
+                    + glob.glob(os.path.join(path, '.part-*.parquet.tmp')):
+                os.remove(part)
+
+    def write(self, row):
+        self._pending.append(row)
+        if len(self._pending) >= self.batch_rows:
+            self.flush()
+
+    def flush(self):
+        rows, self._pending = self._pending, []
+        if not rows:
+            return
+        columns = {field.name: [_coerce(row.get(field.name), field.type) for row in rows]
+                   for field in self.schema if field.name != 'scraped_at'}
+        columns['scraped_at'] = [datetime.now(timezone.utc)] * len(rows)
+        table = pa.Table.from_pydict(columns, schema=self.schema)
+        self._parts += 1
+        name = f"part-{self._run}-{self._parts:05d}-{uuid.uuid4().hex[:8]}.parquet"
+        # Write under a temporary name so readers never see a partial file
+        tmp = os.path.join(self.path, f".{name}.tmp")
+        pq.write_table(table, tmp, compression='zstd')
+        os.replace(tmp, os.path.join(self.path, name))
+        if self.on_flush:
+            self.on_flush(rows)
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def output_schema(fieldnames, list_fields=()):
+    list_fields = set(list_fields)
+    return pa.schema(
+        [(name, pa.list_(pa.string()) if name in list_fields else pa.string()) for name in fieldnames]
+        + [('scraped_at', pa.timestamp('s', tz='UTC'))])
+
+
+def _coerce(value, type_):
+    if value is None or value == '':
+        return None
+    if pa.types.is_list(type_):
+        return [str(v) for v in value] if isinstance(value, (list, tuple)) else [str(value)]
+    return str(value)
+
+
+def open_output(path, fieldnames, list_fields=(), append=False, on_flush=None,
+                list_separator=None, overwrite=False):
+    """Row writer for ``path``: a Parquet dataset for *.parquet, otherwise CSV
+
+    A CSV is continued with ``append`` (a resumed run) and rewritten
+    otherwise. A Parquet dataset always gets new part files added to it;
+    only ``overwrite`` (ignored when resuming) deletes the existing ones
+    first. ``list_separator`` only applies to CSV; Parquet keeps lists as
+    lists.
+    """
+    if is_parquet(path):
+        return ParquetOutput(path, fieldnames, list_fields, append or not overwrite, on_flush)
+    return CsvOutput(path, fieldnames, list_fields, append, on_flush,
+                     list_separator=list_separator)
+
+
+def read_output(path, columns=None, filter=None):
+    """Load a scraper output as a DataFrame, reading only ``columns``.
+
+    For Parquet datasets ``filter`` is a pyarrow.dataset expression, e.g.
+    ``ds.field('site') == 'naukri'``, and row groups it rules out are
+    skipped.
+    """
+    import pandas as pd
+    if is_parquet(path):
+        return ds.dataset(path, format='parquet').to_table(columns=columns, filter=filter).to_pandas()
+    if filter is not None:
+        raise ValueError("filter is only supported for Parquet outputs")
+    return pd.read_csv(path, usecols=columns)
+
+
+def compact(path, row_group_rows=ROW_GROUP_ROWS):
+    """Rewrite a dataset's part files as one file with large row groups"""
+    parts = sorted(glob.glob(os.path.join(path, 'part-*.parquet')))
+    if len(parts) < 2:
+        return 0
+    table = ds.dataset(parts, format='parquet').to_table()
+    name = f"part-{time.strftime('%Y%m%d%H%M%S')}-compacted-{uuid.uuid4().hex[:8]}.parquet"
+    tmp = os.path.join(path, f".{name}.tmp")
+    pq.write_table(table, tmp, row_group_size=row_group_rows, compression='zstd')
+    os.replace(tmp, os.path.join(path, name))
+    for part in parts:
+        os.remove(part)
+    return len(parts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or compact a Parquet job dataset")
+    parser.add_argument('path')
+    parser.add_argument('--columns', nargs='+')
+    parser.add_argument('--compact', action='store_true',
+                        help="merge the part files into one file with large row groups")
+    args = parser.parse_args()
+
+    if args.compact:
+        print(f"Compacted {compact(args.path)} part files")
+    df = read_output(args.path, columns=args.columns)
+    print(f"{len(df)} rows")
+    print(df.head())
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
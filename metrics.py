@@ -0,0 +1,231 @@
+import json
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+# Latency histogram bucket upper bounds, in seconds
+BUCKETS = (0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1, 2, 5, 10, 30, 60, float('inf'))
+
+
+class Histogram:
+    """Fixed-bucket latency histogram with exact count, total, min and max"""
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.count = 0
+        self.total = 0.0
+        self.min = float('inf')
+        self.max = 0.0
+
+    def observe(self, seconds):
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.counts[i] += 1
+                break
+        self.count += 1
+        self.total += seconds
+        self.min = min(self.min, seconds)
+        self.max = max(self.max, seconds)
+
+    def merge(self, other):
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def percentile(self, q):
+        """Estimate the q-th percentile, interpolating within its bucket"""
+        if not self.count:
+            return 0.0
+        rank = q / 100 * self.count
+        seen = 0
+        lower = 0.0
+        for bound, count in zip(BUCKETS, self.counts):
+            if count and seen + count >= rank:
+                low, high = max(lower, self.min), min(bound, self.max)
+                return low + (high - low) * (rank - seen) / count
+            seen += count
+            lower = bound
+        return self.max
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'total': self.total,
+            'mean': self.total / self.count if self.count else 0.0,
+            'min': self.min if self.count else 0.0,
+            'max': self.max,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+            'buckets': {str(bound): count for bound, count in zip(BUCKETS, self.counts) if count},
+        }
+
+
+class Metrics:
+    """Run-wide instrumentation shared by every pipeline stage.
+
+    Records per-stage latency histograms, bytes transferred, per-domain
+    outcomes, queue depths and worker busy time. ``report()`` renders a
+    summary table and ``export_json()`` writes the same data for comparing
+    runs.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started = time.time()
+            self.stages = defaultdict(Histogram)
+            self.counters = defaultdict(int)
+            self.bytes = defaultdict(int)
+            self.domains = defaultdict(lambda: defaultdict(int))
+            self.queues = {}
+            self.pools = {}
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            self.stages[stage].observe(seconds)
+
+    def merge_stages(self, stages):
+        """Add stage histograms recorded elsewhere (e.g. in a worker process)"""
+        with self._lock:
+            for stage, hist in stages.items():
+                self.stages[stage].merge(hist)
+
+    @contextmanager
+    def timer(self, stage):
+        """Time the enclosed block as one ``stage`` observation"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started)
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] += n
+
+    def add_bytes(self, stage, n):
+        with self._lock:
+            self.bytes[stage] += n
+
+    def record_domain(self, url, outcome):
+        """Count an outcome ('ok', 'error', a status code, ...) for the URL's domain"""
+        domain = urlparse(url).netloc.lower().replace('www.', '') or url
+        with self._lock:
+            self.domains[domain][str(outcome)] += 1
+
+    def queue_depth(self, name, depth):
+        """Sample the depth of a work queue"""
+        with self._lock:
+            queue = self.queues.setdefault(name, {'samples': 0, 'total': 0, 'max': 0, 'last': 0})
+            queue['samples'] += 1
+            queue['total'] += depth
+            queue['max'] = max(queue['max'], depth)
+            queue['last'] = depth
+
+    def pool_started(self, name, workers):
+        """Register a worker pool so its utilisation can be reported"""
+        with self._lock:
+            self.pools[name] = {'workers': workers, 'busy': 0.0, 'tasks': 0,
+                                'started': time.perf_counter(), 'wall': None}
+
+    def pool_finished(self, name):
+        with self._lock:
+            pool = self.pools.get(name)
+            if pool:
+                pool['wall'] = time.perf_counter() - pool['started']
+
+    def add_busy(self, name, seconds):
+        """Add one task's busy time to pool ``name``"""
+        with self._lock:
+            pool = self.pools.get(name)
+            if pool:
+                pool['busy'] += seconds
+                pool['tasks'] += 1
+
+    @contextmanager
+    def busy(self, name):
+        """Count the enclosed block as busy time of one worker of pool ``name``"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_busy(name, time.perf_counter() - started)
+
+    def to_dict(self):
+        with self._lock:
+            now = time.perf_counter()
+            pools = {}
+            for name, pool in self.pools.items():
+                wall = pool['wall'] if pool['wall'] is not None else now - pool['started']
+                capacity = wall * pool['workers']
+                pools[name] = {'workers': pool['workers'], 'tasks': pool['tasks'],
+                               'busy': pool['busy'], 'wall': wall,
+                               'utilisation': pool['busy'] / capacity if capacity else 0.0}
+            return {
+                'started': self.started,
+                'elapsed': time.time() - self.started,
+                'stages': {stage: hist.to_dict() for stage, hist in sorted(self.stages.items())},
+                'counters': dict(self.counters),
+                'bytes': dict(self.bytes),
+                'domains': {domain: dict(outcomes) for domain, outcomes in sorted(self.domains.items())},
+                'queues': {name: {'max': q['max'], 'last': q['last'],
+                                  'mean': q['total'] / q['samples'] if q['samples'] else 0.0}
+                           for name, q in self.queues.items()},
+                'pools': pools,
+            }
+
+    def report(self):
+        """Human-readable summary of the run"""
+        data = self.to_dict()
+        lines = [f"Run metrics ({data['elapsed']:.1f}s)"]
+        if data['stages']:
+            lines.append(f"  {'stage':<22}{'count':>8}{'total s':>10}{'mean ms':>10}"
+                         f"{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+            for stage, h in data['stages'].items():
+                lines.append(f"  {stage:<22}{h['count']:>8}{h['total']:>10.2f}{h['mean'] * 1000:>10.1f}"
+                             f"{h['p50'] * 1000:>9.0f}{h['p90'] * 1000:>9.0f}"
+                             f"{h['p99'] * 1000:>9.0f}{h['max'] * 1000:>9.0f}")
+        for stage, n in sorted(data['bytes'].items()):
+            lines.append(f"  bytes {stage}: {n / 1024:.0f} KiB")
+        for name, n in sorted(data['counters'].items()):
+            lines.append(f"  {name}: {n}")
+        for name, pool in data['pools'].items():
+            lines.append(f"  pool {name}: {pool['workers']} workers, {pool['tasks']} tasks, "
+                         f"{pool['utilisation']:.0%} utilised")
+        for name, q in data['queues'].items():
+            lines.append(f"  queue {name}: mean depth {q['mean']:.1f}, max {q['max']}")
+        if data['domains']:
+            lines.append("  domains:")
+            for domain, outcomes in data['domains'].items():
+                summary = ', '.join(f"{k}={v}" for k, v in sorted(outcomes.items()))
+                lines.append(f"    {domain}: {summary}")
+        return '\n'.join(lines)
+
+    def export_json(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+
+_default_metrics = None
+_default_lock = threading.Lock()
+
+
+def get_metrics():
+    """Return the metrics shared by all pipeline stages"""
+    global _default_metrics
+    with _default_lock:
+        if _default_metrics is None:
+            _default_metrics = Metrics()
+    return _default_metrics
+
+
+def timer(stage):
+    return get_metrics().timer(stage)
@@ -0,0 +1,181 @@
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+
+from metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+MEMO_PATH = 'parse_memo.sqlite'
+MAX_MEMO_ENTRIES = 200000
+
+# Markup that changes between otherwise identical page loads and that none of
+# the extractors read: scripts, styles, comments, nonces/CSRF tokens and
+# tracking parameters in links.
+_VOLATILE_BLOCKS = re.compile(
+    r'<script\b[^>]*>.*?</script\s*>|<style\b[^>]*>.*?</style\s*>|<!--.*?-->',
+    re.IGNORECASE | re.DOTALL)
+_VOLATILE_ATTRS = re.compile(
+    r'\s(?:nonce|data-ved|data-hveid|jsdata|data-csrf[\w-]*|csrf[\w-]*)\s*=\s*("[^"]*"|\'[^\']*\'|[^\s>]+)',
+    re.IGNORECASE)
+_TRACKING_PARAMS = re.compile(
+    r'(?<=[?&;])(?:utm_\w+|gclid|fbclid|msclkid|ved|ei|sid|sessionid|jsessionid|_ga|trk\w*|ref(?:id)?)=[^&"\'\s>]*&?',
+    re.IGNORECASE)
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_html(content):
+    """Strip volatile markup so byte-different but equivalent pages hash equal"""
+    if isinstance(content, bytes):
+        content = content.decode('utf-8', errors='replace')
+    content = _VOLATILE_BLOCKS.sub('', content)
+    content = _VOLATILE_ATTRS.sub('', content)
+    content = _TRACKING_PARAMS.sub('', content)
+    return _WHITESPACE.sub(' ', content).strip()
+
+
+def content_hash(content):
+    return hashlib.sha256(normalize_html(content).encode('utf-8')).hexdigest()
+
+
+def config_version(*parts):
+    """Fingerprint extractor configuration (selectors, keywords, code).
+
+    Functions are fingerprinted by their bytecode and constants, so editing a
+    selector literal inside an extractor also produces a new version.
+    """
+    def describe(part):
+        if callable(part) and hasattr(part, '__code__'):
+            code = part.__code__
+            return [code.co_code.hex(), repr(code.co_consts)]
+        return part
+    payload = json.dumps([describe(p) for p in parts], sort_keys=True, default=repr)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+class ParseMemo:
+    """Persistent memo of extraction results keyed by normalized page hash.
+
+    Entries are stored per ``namespace`` (one per extractor) together with the
+    extractor's config version; looking a page up under a new version misses,
+    and rows written under older versions are purged the first time a new
+    version is seen.
+    """
+
+    def __init__(self, path=MEMO_PATH, max_entries=MAX_MEMO_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.stats = {'hits': 0, 'misses': 0}
+        self._lock = threading.Lock()
+        self._versions = {}
+        self._puts = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS results (
+                namespace TEXT NOT NULL,
+                digest TEXT NOT NULL,
+                version TEXT NOT NULL,
+                result TEXT NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (namespace, digest)
+            )""")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS results_lru ON results (last_used)")
+        self._conn.commit()
+
+    def _check_version(self, namespace, version):
+        if self._versions.get(namespace) == version:
+            return
+        deleted = self._conn.execute(
+            "DELETE FROM results WHERE namespace = ? AND version != ?",
+            (namespace, version)).rowcount
+        self._conn.commit()
+        if deleted:
+            logger.info(f"Parse memo: dropped {deleted} '{namespace}' results from older extractor config")
+        self._versions[namespace] = version
+
+    def get(self, namespace, version, digest):
+        with self._lock:
+            self._check_version(namespace, version)
+            row = self._conn.execute(
+                "SELECT result FROM results WHERE namespace = ? AND digest = ? AND version = ?",
+                (namespace, digest, version)).fetchone()
+            if row:
+                self._conn.execute(
+                    "UPDATE results SET last_used = ? WHERE namespace = ? AND digest = ?",
+                    (time.time(), namespace, digest))
+                self._conn.commit()
+                self.stats['hits'] += 1
+                return json.loads(row[0])
+            self.stats['misses'] += 1
+            return None
+
+    def has(self, namespace, version, digest):
+        """True if a result is stored; unlike get() this reads without bookkeeping"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM results WHERE namespace = ? AND digest = ? AND version = ?",
+                (namespace, digest, version)).fetchone()
+        return row is not None
+
+    def put(self, namespace, version, digest, result):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)",
+                (namespace, digest, version, json.dumps(result), time.time()))
+            self._puts += 1
+            if self._puts % 1000 == 0:
+                self._prune()
+            self._conn.commit()
+
+    def _prune(self):
+        self._conn.execute(
+            "DELETE FROM results WHERE rowid IN ("
+            " SELECT rowid FROM results ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,))
+
+    def memoize(self, namespace, content, parse, *config, run=None, digest=None):
+        """Return ``parse(content)``, reusing the stored result for unchanged pages.
+
+        ``config`` is whatever else the result depends on (selectors, keyword
+        tables); ``parse`` itself is part of the version too. ``run``, if
+        given, computes a missing result in place of ``parse`` (e.g. on a
+        process pool); the version still comes from ``parse``. ``digest`` is
+        the page's content_hash when the caller has already computed it.
+        """
+        version = config_version(parse, *config)
+        digest = digest or content_hash(content)
+        result = self.get(namespace, version, digest)
+        metrics = get_metrics()
+        if result is None:
+            with metrics.timer(f"parse.{namespace.split(':')[0]}"):
+                result = run(content) if run else parse(content)
+            if result is not None:
+                self.put(namespace, version, digest, result)
+        else:
+            metrics.count('parse.memo_hits')
+        return result
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_default_memo = None
+_default_lock = threading.Lock()
+
+
+def get_memo():
+    """Return the memo shared by all extractors, opening it on first use"""
+    global _default_memo
+    with _default_lock:
+        if _default_memo is None:
+            _default_memo = ParseMemo()
+    return _default_memo
+
+
+def memoize(namespace, content, parse, *config, run=None, digest=None):
+    return get_memo().memoize(namespace, content, parse, *config, run=run, digest=digest)
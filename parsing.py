@@ -1,10 +1,25 @@
-import time
+import argparse
+import threading
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
 from urllib.parse import quote
 from datetime import datetime
 from bs4 import BeautifulSoup
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+from extraction_plan import HAVE_LXML, get_text, parse_lxml
+from parse_memo import memoize
+from serp_index import SerpIndex, normalize_url
+from metrics import get_metrics
+
+DEBUG_HTML_PATH = "D:/Machine Learning/debug_page.html"
+RESULTS_SELECTOR = "div#search, div#rso"  # container Google renders results into
+RESULTS_TIMEOUT = 10  # seconds to wait for the results container
 
 def get_user_keywords():
     """Prompt user for search keywords and return them."""
@@ -34,22 +49,110 @@ def setup_driver():
     chrome_options.add_argument("--disable-blink-features=AutomationControlled")
     chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
     chrome_options.add_experimental_option("useAutomationExtension", False)
+    # Return from driver.get at DOMContentLoaded; fetch_page waits for the results itself
+    chrome_options.page_load_strategy = "eager"
     driver = webdriver.Chrome(options=chrome_options)
     driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
     return driver
 
-def fetch_page(url, driver):
-    """Fetch the rendered HTML content using Selenium."""
+class DriverPool:
+    """Pool of warm headless Chrome drivers reused across keyword queries.
+
+    Drivers are started on demand up to ``size`` and handed out one query at
+    a time; a driver that raised a WebDriverException is discarded rather
+    than returned to the pool, and the next caller waiting for a driver
+    starts a replacement.
+    """
+    def __init__(self, size=1):
+        self.size = size
+        self._idle = []
+        self._started = 0
+        # Signalled whenever a driver is returned or a slot frees up
+        self._available = threading.Condition()
+    
+    @contextmanager
+    def driver(self):
+        with self._available:
+            # A discarded driver frees a slot, so a waiter can start a replacement
+            while not self._idle and self._started >= self.size:
+                self._available.wait()
+            start_new = not self._idle
+            if start_new:
+                self._started += 1
+            else:
+                driver = self._idle.pop()
+        if start_new:
+            try:
+                driver = setup_driver()
+            except Exception:
+                self._release_slot()
+                raise
+        healthy = True
+        try:
+            yield driver
+        except WebDriverException:
+            healthy = False
+            raise
+        finally:
+            # Always either back in the pool or quit, so the pool never runs dry
+            if healthy:
+                with self._available:
+                    self._idle.append(driver)
+                    self._available.notify()
+            else:
+                try:
+                    driver.quit()
+                except Exception:
+                    pass  # a crashed driver may not answer
+                finally:
+                    self._release_slot()
+    
+    def _release_slot(self):
+        with self._available:
+            self._started -= 1
+            self._available.notify()
+    
+    def close(self):
+        """Quit every idle driver"""
+        with self._available:
+            idle, self._idle = self._idle, []
+            self._started -= len(idle)
+            self._available.notify_all()
+        for driver in idle:
+            driver.quit()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+
+def fetch_page(url, driver, debug_dump=True, timeout=RESULTS_TIMEOUT):
+    """Fetch the rendered HTML content using Selenium.
+
+    Returns as soon as the results container is present instead of after a
+    fixed delay. With debug_dump the raw HTML is also saved to DEBUG_HTML_PATH.
+    """
     try:
         print(f"Requesting URL: {url}")
-        driver.get(url)
-        time.sleep(5)  # Wait for page to load
+        metrics = get_metrics()
+        with metrics.timer('search.load'):
+            driver.get(url)
+            try:
+                WebDriverWait(driver, timeout).until(
+                    EC.presence_of_element_located((By.CSS_SELECTOR, RESULTS_SELECTOR)))
+            except TimeoutException:
+                metrics.count('search.timeouts')
+                print(f"Results did not appear within {timeout}s (possible CAPTCHA or block).")
         html = driver.page_source
-        desktop_path = "D:/Machine Learning/debug_page.html"
-        with open(desktop_path, "w", encoding="utf-8") as f:
-            f.write(html)
-        print(f"Page fetched successfully. Raw HTML saved to {desktop_path}")
+        metrics.add_bytes('search', len(html.encode("utf-8")))
+        if debug_dump:
+            with open(DEBUG_HTML_PATH, "w", encoding="utf-8") as f:
+                f.write(html)
+            print(f"Page fetched successfully. Raw HTML saved to {DEBUG_HTML_PATH}")
         return html
+    except WebDriverException:
+        raise  # the driver crashed or hung; DriverPool discards it
     except Exception as e:
         print(f"Error fetching page: {e}")
         return None
@@ -60,6 +163,69 @@ def parse_search_results(html):
         print("No HTML content to parse.")
         return []
     
+    # Identical SERPs (modulo tracking tokens) reuse the previous parse
+    return memoize('serp', html, _parse_search_results)
+
+def _parse_search_results(html):
+    """Parse a SERP in one pass over the lxml tree (see parse_search_results).
+
+    Each ``a[href^="http"]`` is paired with the first h3 inside its parent
+    element, as the old ``div:has(h3)`` selector did, but the first h3 of
+    every element is found with a single walk up from each h3 instead of
+    searching under every div. URLs are deduplicated (by normalized URL,
+    first result wins) as they are found.
+    """
+    if not HAVE_LXML:
+        return dedupe_results(_parse_search_results_soup(html))
+    try:
+        tree = parse_lxml(html)
+    except Exception as e:
+        print(f"lxml could not parse the page ({e}), falling back to BeautifulSoup.")
+        return dedupe_results(_parse_search_results_soup(html))
+    
+    first_h3 = {}
+    links = []
+    titles = 0
+    for element in tree.iter('a', 'h3'):
+        if element.tag == 'a':
+            if element.get('href', '').startswith('http'):
+                links.append(element)
+            continue
+        titles += 1
+        for ancestor in element.iterancestors():
+            if ancestor in first_h3:
+                break  # and so is every element above it
+            first_h3[ancestor] = element
+    print(f"Found {len(links)} result links and {titles} titles.")
+    
+    if not links:
+        print("No result links found. Possible CAPTCHA or block. Check debug_page.html.")
+    
+    results = []
+    seen = set()
+    for link in links:
+        parent = link.getparent()
+        title_elem = first_h3.get(parent)
+        if title_elem is None:
+            continue
+        if parent.tag != 'div' and next(parent.iterancestors('div'), None) is None:
+            continue
+        url = link.get('href')
+        if 'google' in url.lower():
+            continue
+        key = normalize_url(url)
+        if key not in seen:
+            seen.add(key)
+            results.append({'title': get_text(title_elem), 'url': url})
+    
+    print(f"Parsed {len(results)} valid results from page.")
+    return results
+
+def _parse_search_results_soup(html):
+    """Parse a SERP with BeautifulSoup and the ``div:has(h3)`` selector.
+
+    The reference for _parse_search_results; may return the same URL twice.
+    """
     soup = BeautifulSoup(html, 'html.parser')
     results = []
     
@@ -85,32 +251,89 @@ def parse_search_results(html):
     print(f"Parsed {len(results)} valid results from page.")
     return results
 
-def scrape_google_search(keywords, max_pages=3):
-    """Scrape Google search results using Selenium."""
-    driver = setup_driver()
+def dedupe_results(results):
+    """Drop results whose normalized URL was already seen, keeping the first."""
+    seen = set()
+    unique = []
+    for result in results:
+        key = normalize_url(result['url'])
+        if key not in seen:
+            seen.add(key)
+            unique.append(result)
+    return unique
+
+def check_serp_parity(html):
+    """Compare the single-pass parser with the selector-based one on a SERP.
+
+    Returns (fast results, reference results); they should be equal.
+    """
+    return _parse_search_results(html), dedupe_results(_parse_search_results_soup(html))
+
+def scrape_google_search(keywords, max_pages=3, pool=None, debug_dump=True):
+    """Scrape Google search results using Selenium.
+
+    Uses a driver from ``pool`` when given, otherwise starts (and quits) a
+    private one. If the driver crashes, the results of the pages already
+    fetched are returned.
+    """
+    own_pool = pool is None
+    pool = pool or DriverPool(size=1)
     all_results = []
     
     try:
-        for page in range(max_pages):
-            print(f"\nFetching page {page + 1}...")
-            url = construct_search_url(keywords, page)
-            html = fetch_page(url, driver)
-            if html:
-                page_results = parse_search_results(html)
-                if not page_results and page == 0:
-                    print("No results found on the first page. Check debug_page.html.")
-                all_results.extend(page_results)
-            else:
-                print("Stopping due to fetch error.")
-                break
-            time.sleep(2)
+        with pool.driver() as driver:
+            for page in range(max_pages):
+                print(f"\nFetching page {page + 1} for '{keywords}'...")
+                url = construct_search_url(keywords, page)
+                html = fetch_page(url, driver, debug_dump=debug_dump)
+                if html:
+                    page_results = parse_search_results(html)
+                    if not page_results and page == 0:
+                        print("No results found on the first page. Check debug_page.html.")
+                    all_results.extend(page_results)
+                else:
+                    print("Stopping due to fetch error.")
+                    break
+    except WebDriverException as e:
+        print(f"Browser error, stopping: {e}")
     finally:
-        driver.quit()
+        if own_pool:
+            pool.close()
     
     return all_results
 
+def scrape_many(keyword_queries, pool_size=3, max_pages=3, debug_dump=False):
+    """Run several keyword queries in parallel on a shared pool of warm drivers.
+
+    Returns {keywords: results}.
+    """
+    metrics = get_metrics()
+    metrics.pool_started('search', pool_size)
+    
+    def scrape(keywords):
+        with metrics.busy('search'):
+            return scrape_google_search(keywords, max_pages, pool, debug_dump)
+    
+    with DriverPool(size=pool_size) as pool, ThreadPoolExecutor(max_workers=pool_size) as executor:
+        futures = {executor.submit(scrape, keywords): keywords for keywords in keyword_queries}
+        results = {}
+        for future in as_completed(futures):
+            keywords = futures[future]
+            try:
+                results[keywords] = future.result()
+            except Exception as e:
+                print(f"Query '{keywords}' failed: {e}")
+                results[keywords] = []
+            metrics.queue_depth('search.pending', len(futures) - len(results))
+    metrics.pool_finished('search')
+    return results
+
 def save_results(results):
-    """Save results to a DataFrame and CSV on the Desktop."""
+    """Save results to a DataFrame and CSV on the Desktop.
+
+    main() passes only the URLs the SERP index has not handed off before, so
+    each CSV feeds the downstream scrapers new or changed URLs only.
+    """
     if not results:
         print("No results to save.")
         return None
@@ -122,24 +345,58 @@ def save_results(results):
     print(f"Results saved to {filename}")
     return df
 
+def read_queries(path):
+    """Read one keyword query per line, skipping blanks, comments and repeats."""
+    with open(path, encoding="utf-8") as f:
+        queries = [line.strip() for line in f]
+    return list(dict.fromkeys(q for q in queries if q and not q.startswith("#")))
+
 def main():
     """Main execution flow."""
+    parser = argparse.ArgumentParser(description="Google Search Scraper - Last 24 Hours")
+    parser.add_argument("--queries", help="file with one keyword query per line (batch mode)")
+    parser.add_argument("--pool-size", type=int, default=3, help="parallel browsers in batch mode")
+    parser.add_argument("--pages", type=int, default=3, help="result pages per query")
+    parser.add_argument("--metrics-json", help="also save the run metrics report as JSON")
+    args = parser.parse_args()
+    
     print("Google Search Scraper - Last 24 Hours")
-    keywords = get_user_keywords()
+    index = SerpIndex()
     
     try:
-        results = scrape_google_search(keywords, max_pages=3)
-        
-        if results:
-            print(f"\nFound {len(results)} results:")
-            for i, result in enumerate(results, 1):
-                print(f"{i}. {result['title']}\n   {result['url']}")
-            save_results(results)
+        if args.queries:
+            queries = read_queries(args.queries)
+            print(f"Running {len(queries)} queries on {args.pool_size} browsers...")
+            for keywords, results in scrape_many(queries, pool_size=args.pool_size,
+                                                 max_pages=args.pages).items():
+                index.record(results, query=keywords)
+                print(f"'{keywords}': {len(results)} results")
         else:
-            print("No results were found or an error occurred during scraping.")
+            keywords = get_user_keywords()
+            results = scrape_google_search(keywords, max_pages=args.pages)
+            if results:
+                print(f"\nFound {len(results)} results:")
+                for i, result in enumerate(results, 1):
+                    print(f"{i}. {result['title']}\n   {result['url']}")
+            else:
+                print("No results were found or an error occurred during scraping.")
+            index.record(results, query=keywords)
+        
+        # Only URLs the downstream scrapers have not been given yet
+        new_results = index.pending()
+        summary = index.summary()
+        print(f"\n{len(new_results)} new or changed URLs ({summary['total']} indexed in total).")
+        save_results(new_results)
+        # Marked only once the CSV is written, so a failed save hands them off next run
+        index.mark_handed_off([result['url'] for result in new_results])
     
     except Exception as e:
         print(f"Unexpected error: {e}")
+    finally:
+        index.close()
+        print(get_metrics().report())
+        if args.metrics_json:
+            get_metrics().export_json(args.metrics_json)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
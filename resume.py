@@ -1,11 +1,29 @@
 import re
+import os
+import sys
+import glob
 import json
+import time
 import pdfplumber
-import spacy
+from bisect import bisect_left
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from metrics import get_metrics, timer
 
-# Initialize NLP model
-nlp = spacy.load("en_core_web_sm")
+# NLP model, loaded on first use (see get_nlp)
+NLP_MODEL = "en_core_web_sm"
+# PERSON detection only needs tok2vec + ner
+NLP_EXCLUDE = ["tagger", "parser", "attribute_ruler", "lemmatizer", "senter"]
+NAME_SCAN_CHARS = 500  # names are looked for in the first part only
+_nlp = None
+
+def get_nlp():
+    """Load the spaCy model on first use, keeping only the NER components"""
+    global _nlp
+    if _nlp is None:
+        import spacy  # deferred: importing spaCy alone takes about a second
+        _nlp = spacy.load(NLP_MODEL, exclude=NLP_EXCLUDE)
+    return _nlp
 
 # Technical skills taxonomy
 TECH_SKILLS = {
@@ -19,127 +37,335 @@ TECH_SKILLS = {
     'Data Engineering': ['etl', 'data pipeline', 'airflow', 'data modeling']
 }
 
+LEVEL_WORDS = {'advanced', 'intermediate', 'expert', 'beginner', 'proficient'}
+LEVEL_WINDOW = 12  # tokens after a skill mention searched for its level
+
+# Lowercase words with trailing +/# kept, so 'c++' and 'c#' stay whole
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+[+#]*')
+
+def tokenize(text):
+    """Split text into lowercase tokens (one regex pass)"""
+    return TOKEN_PATTERN.findall(text.lower())
+
+class SkillIndex:
+    """Precompiled phrase index over a skill taxonomy.
+
+    Skills are tokenized once and indexed by their first token, so a document
+    is matched against the whole taxonomy in a single walk over its tokens.
+    Each skill's level is the first level word within LEVEL_WINDOW tokens
+    after one of its mentions.
+    """
+    def __init__(self, taxonomy=TECH_SKILLS):
+        self.columns = [(category, skill) for category, skills in taxonomy.items() for skill in skills]
+        self._phrases = defaultdict(list)
+        for column, (_, skill) in enumerate(self.columns):
+            phrase = tuple(tokenize(skill))
+            self._phrases[phrase[0]].append((phrase, column))
+    
+    def match(self, text):
+        """Return {column: level or None} for every skill mentioned in text"""
+        tokens = tokenize(text)
+        found = {}
+        level_positions = [i for i, token in enumerate(tokens) if token in LEVEL_WORDS]
+        for i, token in enumerate(tokens):
+            for phrase, column in self._phrases.get(token, ()):
+                end = i + len(phrase)
+                if tuple(tokens[i:end]) != phrase:
+                    continue
+                if found.get(column) is None:
+                    at = bisect_left(level_positions, end)
+                    if at < len(level_positions) and level_positions[at] < end + LEVEL_WINDOW:
+                        found[column] = tokens[level_positions[at]]
+                    else:
+                        found[column] = None
+        return found
+    
+    def categorize(self, found):
+        """Group a match() result by category, in taxonomy order"""
+        skills_found = defaultdict(list)
+        for column in sorted(found):
+            category, skill = self.columns[column]
+            skills_found[category].append({'skill': skill, 'level': found[column]})
+        return dict(skills_found)
+
+class SkillMatrix:
+    """Sparse document x skill matrix (CSR layout) with level annotations"""
+    def __init__(self, columns):
+        self.columns = columns
+        self.indptr = [0]
+        self.indices = []
+        self.levels = []
+    
+    def append(self, found):
+        for column in sorted(found):
+            self.indices.append(column)
+            self.levels.append(found[column])
+        self.indptr.append(len(self.indices))
+    
+    def __len__(self):
+        return len(self.indptr) - 1
+    
+    def row(self, i):
+        """Return {skill: level} for document i"""
+        start, end = self.indptr[i], self.indptr[i + 1]
+        return {self.columns[c][1]: level for c, level in zip(self.indices[start:end], self.levels[start:end])}
+    
+    def skill_counts(self):
+        """Number of documents mentioning each skill"""
+        counts = [0] * len(self.columns)
+        for column in self.indices:
+            counts[column] += 1
+        return {skill: counts[c] for c, (_, skill) in enumerate(self.columns)}
+    
+    def to_scipy(self):
+        """Convert to a scipy.sparse CSR matrix of 0/1 (requires scipy)"""
+        from scipy.sparse import csr_matrix
+        return csr_matrix(([1] * len(self.indices), self.indices, self.indptr),
+                          shape=(len(self), len(self.columns)))
+
+SKILL_INDEX = SkillIndex()
+
+# Resume sections and the headings that start them, matched against whole
+# lines with case, spacing and a trailing ':' ignored
+SECTION_HEADINGS = {
+    'education': ['education', 'academic background', 'academic qualifications',
+                  'educational qualifications', 'qualifications'],
+    'experience': ['experience', 'work experience', 'professional experience', 'employment',
+                   'employment history', 'work history', 'internships', 'internship'],
+    'projects': ['projects', 'personal projects', 'academic projects', 'key projects'],
+    'skills': ['skills', 'technical skills', 'key skills', 'core skills', 'skills summary'],
+    'other': ['summary', 'profile', 'objective', 'career objective', 'certifications',
+              'achievements', 'awards', 'publications', 'languages', 'interests', 'hobbies',
+              'references', 'personal details', 'declaration', 'extracurricular activities'],
+}
+HEADING_LOOKUP = {heading: name for name, headings in SECTION_HEADINGS.items() for heading in headings}
+MAX_HEADING_CHARS = 60
+MAX_LINE_CHARS = 300  # education and experience entries are one (or two) lines
+
+# Entry patterns: no nested or unbounded backtracking, each line is scanned once
+DEGREE_PATTERN = re.compile(r'\b(?:bachelor|master|ph\.?d|m\.?tech|b\.?tech|mba|msc?|bsc?)',
+                            re.IGNORECASE)
+DURATION_PATTERN = re.compile(r'\(?\d{4}[ \t]*+[-–][ \t]*+(?:\d{4}|present|current)\)?',
+                              re.IGNORECASE)
+FIELD_RUN = re.compile(r'[\w \t]*+')
+FIELD_PREFIX = re.compile(r'^[ \t]*+(?:in|of)\b', re.IGNORECASE)
+EDUCATION_SEPARATOR = re.compile(r'\b(?:at|from)\b', re.IGNORECASE)
+ROLE_WORDS = ('engineer', 'developer', 'analyst', 'scientist', 'manager')
+EXPERIENCE_SEPARATOR = re.compile(r'\bat\b|@|,', re.IGNORECASE)
+TITLE_CHARS = re.compile(r'[^\w \t]')
+FIRST_LETTER = re.compile(r'[A-Za-z]')
+PROJECT_NAME_PATTERN = re.compile(r'([^\n:-]*+)[:-]')
+
+def extract_skills_batch(documents, index=SKILL_INDEX):
+    """Score many documents (resumes, job descriptions) against the skill taxonomy"""
+    matrix = SkillMatrix(index.columns)
+    for text in documents:
+        matrix.append(index.match(text or ''))
+    return matrix
+
+def iter_pdf_pages(pdf_path):
+    """Yield the text of each non-empty page as it is extracted"""
+    with pdfplumber.open(pdf_path) as pdf:
+        for page in pdf.pages:
+            text = page.extract_text()
+            page.close()  # drop the page's parsed layout objects right away
+            if text:
+                yield text
+
 def extract_text_from_pdf(pdf_path):
     """Extract text from PDF with error handling"""
     try:
-        with pdfplumber.open(pdf_path) as pdf:
-            return "\n".join(page.extract_text() for page in pdf.pages if page.extract_text())
+        with timer('resume.pdf'):
+            return "\n".join(iter_pdf_pages(pdf_path))
     except Exception as e:
         raise Exception(f"PDF processing failed: {str(e)}")
 
-def extract_personal_info(text):
-    """Extract name, email, phone with improved patterns"""
-    email = re.search(r'[\w\.-]+@[\w\.-]+\.[a-zA-Z]{2,}', text)
-    phone = re.search(
-        r'(?:\+?\d{1,3}[-.\s]?)?\(?\d{2,3}\)?[-.\s]?\d{3}[-.\s]?\d{4}',
-        text
-    )
-    
-    # Name extraction using NLP
-    doc = nlp(text[:500])  # Only analyze first part for performance
-    name = next((ent.text for ent in doc.ents if ent.label_ == "PERSON"), None)
-    
+# Local part must start a token, so a long run of word characters is scanned once
+EMAIL_PATTERN = re.compile(r'(?<![\w.-])[\w.-]++@[\w.-]+\.[a-zA-Z]{2,}')
+PHONE_PATTERN = re.compile(r'(?:\+?\d{1,3}[-.\s]?)?\(?\d{2,3}\)?[-.\s]?\d{3}[-.\s]?\d{4}')
+
+def extract_contact_info(text):
+    """Extract email and phone with improved patterns"""
+    email = EMAIL_PATTERN.search(text)
+    phone = PHONE_PATTERN.search(text)
     return {
-        'name': name,
         'email': email.group() if email else None,
         'phone': phone.group() if phone else None
     }
 
-def extract_education(text):
-    """Extract education information with degree focus"""
+def find_person_name(doc):
+    """First PERSON entity in a spaCy doc"""
+    return next((ent.text for ent in doc.ents if ent.label_ == "PERSON"), None)
+
+def extract_personal_info(text):
+    """Extract name, email, phone with improved patterns"""
+    # Name extraction using NLP
+    doc = get_nlp()(text[:NAME_SCAN_CHARS])  # Only analyze first part for performance
+    return {'name': find_person_name(doc), **extract_contact_info(text)}
+
+def extract_personal_info_batch(texts, batch_size=64, n_process=1):
+    """Extract personal info for many resumes, running NER through nlp.pipe
+
+    Yields one result per input text, in order.
+    """
+    snippets = ((text[:NAME_SCAN_CHARS], text) for text in texts)
+    for doc, text in get_nlp().pipe(snippets, as_tuples=True,
+                                    batch_size=batch_size, n_process=n_process):
+        yield {'name': find_person_name(doc), **extract_contact_info(text)}
+
+def segment_resume(text):
+    """Split resume text into headed sections in one pass over its lines
+
+    Returns [(name, heading, start, end)] with the offsets of each section's
+    body in ``text``; a heading is a line that is one of SECTION_HEADINGS on
+    its own. Text before the first heading is the 'header' section.
+    """
+    sections = []
+    name, heading, start = 'header', None, 0
+    offset = 0
+    for line in text.splitlines(keepends=True):
+        key = line.strip().rstrip(':').lower() if len(line) <= MAX_HEADING_CHARS else ''
+        found = HEADING_LOOKUP.get(' '.join(key.split())) if key else None
+        if found:
+            sections.append((name, heading, start, offset))
+            name, heading, start = found, line.strip(), offset + len(line)
+        offset += len(line)
+    sections.append((name, heading, start, len(text)))
+    return [section for section in sections if section[1] or section[3] > section[2]]
+
+def section_text(text, sections, *names):
+    """Body text of the sections called one of names, or None if there are none"""
+    parts = [text[start:end] for name, _, start, end in sections if name in names]
+    return '\n'.join(parts) if parts else None
+
+def _entry_lines(text):
+    """Lines of a section, cut to MAX_LINE_CHARS so matching each is bounded"""
+    return [line[:MAX_LINE_CHARS] for line in text.splitlines()]
+
+def extract_education(text, sections=None):
+    """Extract education information with degree focus
+
+    Reads the Education section (the whole text if there is none) line by
+    line: a degree, an optional 'in'/'of', the field, 'at'/'from'/',', the
+    institution and a year range. A degree line without a year range is
+    read together with the line after it.
+    """
+    if sections is None:
+        sections = segment_resume(text)
+    lines = _entry_lines(section_text(text, sections, 'education') or text)
     education = []
-    pattern = re.compile(
-        r'(?P<degree>bachelor|master|ph\.?d|m\.?tech|b\.?tech|mba|msc?|bsc?)\s*(?:in|of)?\s*(?P<field>[\w\s]+)\s*'
-        r'(?:at|from|,)\s*(?P<institution>[^\n]+?)\s*'
-        r'(?P<year>\(?\d{4}\s*[-–]\s*(?:\d{4}|present|current)\)?)',
-        re.IGNORECASE
-    )
-    
-    for match in pattern.finditer(text):
-        education.append({
-            'degree': match.group('degree').title(),
-            'field': match.group('field').title(),
-            'institution': match.group('institution'),
-            'duration': match.group('year')
-        })
+    
+    for i, line in enumerate(lines):
+        degree = DEGREE_PATTERN.search(line)
+        if not degree:
+            continue
+        duration = DURATION_PATTERN.search(line, degree.end())
+        if not duration and i + 1 < len(lines):
+            line = f"{line} {lines[i + 1]}"
+            duration = DURATION_PATTERN.search(line, degree.end())
+        if not duration:
+            continue
+        middle = line[degree.end():duration.start()]
+        # The field is the run of words up to the last 'at'/'from' in it, or up to a comma
+        field_end = FIELD_RUN.match(middle).end()
+        if middle[field_end:field_end + 1] == ',':
+            separator = (field_end, field_end + 1)
+        else:
+            separator = None
+            for match in EDUCATION_SEPARATOR.finditer(middle, 0, field_end):
+                separator = match.span()
+            if separator is None:
+                continue
+        field = FIELD_PREFIX.sub('', middle[:separator[0]]).strip()
+        institution = middle[separator[1]:].strip()
+        if field and institution:
+            education.append({
+                'degree': degree.group().title(),
+                'field': field.title(),
+                'institution': institution,
+                'duration': duration.group()
+            })
     
     return education
 
-def extract_work_experience(text):
-    """Extract work experience with company and duration"""
+def extract_work_experience(text, sections=None):
+    """Extract work experience with company and duration
+
+    Reads the Experience section (the whole text if there is none) line by
+    line: a title ending in one of ROLE_WORDS, 'at'/'@'/',', the company and
+    a year range.
+    """
+    if sections is None:
+        sections = segment_resume(text)
     experience = []
-    # Improved pattern to capture job titles with various formats
-    pattern = re.compile(
-        r'(?P<title>[A-Z][\w\s]+(?:Engineer|Developer|Analyst|Scientist|Manager))\s*'
-        r'(?:at|@|,)\s*(?P<company>[^\n,;]+?)\s*'
-        r'(?P<duration>\(?\d{4}\s*[-–]\s*(?:\d{4}|present|current)\)?)',
-        re.IGNORECASE
-    )
-    
-    for match in pattern.finditer(text):
-        experience.append({
-            'position': match.group('title'),
-            'company': match.group('company').strip(),
-            'duration': match.group('duration')
-        })
+    
+    for line in _entry_lines(section_text(text, sections, 'experience') or text):
+        duration = DURATION_PATTERN.search(line)
+        if not duration:
+            continue
+        head = line[:duration.start()]
+        # Latest separator that leaves a company without ',' or ';' and a title before it
+        for separator in reversed(list(EXPERIENCE_SEPARATOR.finditer(head))):
+            company = head[separator.end():].strip()
+            if ',' in company or ';' in company:
+                break
+            title = TITLE_CHARS.split(head[:separator.start()])[-1]
+            letter = FIRST_LETTER.search(title)
+            title = title[letter.start():].rstrip() if letter else ''
+            if company and title.lower().endswith(ROLE_WORDS):
+                experience.append({
+                    'position': title,
+                    'company': company,
+                    'duration': duration.group()
+                })
+                break
     
     return experience
 
 def extract_technical_skills(text):
     """Categorize technical skills with level detection"""
-    skills_found = defaultdict(list)
-    text_lower = text.lower()
-    
-    for category, skills in TECH_SKILLS.items():
-        for skill in skills:
-            if re.search(r'\b' + re.escape(skill) + r'\b', text_lower):
-                # Detect skill level if mentioned
-                level = None
-                level_match = re.search(
-                    fr'{re.escape(skill)}.*?(advanced|intermediate|expert|beginner|proficient)',
-                    text_lower
-                )
-                if level_match:
-                    level = level_match.group(1)
-                
-                skills_found[category].append({
-                    'skill': skill,
-                    'level': level
-                })
-    
-    return dict(skills_found)
+    return SKILL_INDEX.categorize(SKILL_INDEX.match(text))
 
-def extract_projects(text):
-    """Extract projects with technologies used"""
-    projects = []
-    # Pattern to capture project sections
-    project_sections = re.split(r'\n\s*(?:projects|work experience|experience)\s*\n', text, flags=re.IGNORECASE)
+def extract_projects(text, sections=None):
+    """Extract projects with technologies used
+
+    Reads the Projects section, or the Experience section if there is none.
+    A project starts at a line beginning with a word character; other lines
+    (bullets, indented details) belong to the project above.
+    """
+    if sections is None:
+        sections = segment_resume(text)
+    project_text = (section_text(text, sections, 'projects')
+                    or section_text(text, sections, 'experience'))
+    if not project_text:
+        return []
     
-    if len(project_sections) > 1:
-        project_text = project_sections[1]
-        # Split individual projects
-        project_items = re.split(r'\n\s*(?=\w)', project_text)
-        
-        for item in project_items:
-            if not item.strip():
-                continue
-                
-            # Extract project name
-            name_match = re.match(r'^(.*?)[:-]', item)
-            name = name_match.group(1).strip() if name_match else "Unnamed Project"
-            
-            # Extract technologies used
-            technologies = []
-            for category in TECH_SKILLS.values():
-                for tech in category:
-                    if re.search(r'\b' + re.escape(tech) + r'\b', item.lower()):
-                        technologies.append(tech)
+    project_items = []
+    for line in project_text.split('\n'):
+        stripped = line.lstrip()
+        if not project_items or (stripped and (stripped[0].isalnum() or stripped[0] == '_')):
+            project_items.append([stripped])
+        else:
+            project_items[-1].append(line)
+    
+    projects = []
+    for lines in project_items:
+        item = '\n'.join(lines)
+        if not item.strip():
+            continue
             
-            projects.append({
-                'name': name,
-                'description': item.strip(),
-                'technologies': technologies
-            })
+        # Extract project name
+        name_match = PROJECT_NAME_PATTERN.match(item)
+        name = name_match.group(1).strip() if name_match else "Unnamed Project"
+        
+        # Extract technologies used
+        technologies = [SKILL_INDEX.columns[c][1] for c in sorted(SKILL_INDEX.match(item))]
+        
+        projects.append({
+            'name': name,
+            'description': item.strip(),
+            'technologies': technologies
+        })
     
     return projects
 
@@ -150,34 +376,74 @@ def analyze_resume(pdf_path):
         if not text:
             return {"error": "No text could be extracted from the PDF"}
         
+        return analyze_resume_text(text)
+    
+    except Exception as e:
+        return {"error": f"Resume analysis failed: {str(e)}"}
+
+def analyze_resume_text(text):
+    """Extract structured resume data from already extracted text"""
+    with timer('resume.analyze'):
+        sections = segment_resume(text)
         result = {
             'personal_info': extract_personal_info(text),
-            'education': extract_education(text),
-            'work_experience': extract_work_experience(text),
+            'education': extract_education(text, sections),
+            'work_experience': extract_work_experience(text, sections),
             'skills': extract_technical_skills(text),
-            'projects': extract_projects(text)
+            'projects': extract_projects(text, sections)
         }
-        
-        # Calculate total experience in years
-        total_exp = 0
-        for exp in result['work_experience']:
-            years = re.findall(r'\d{4}', exp['duration'])
-            if len(years) == 2:
-                total_exp += (int(years[1]) - int(years[0]))
-        result['total_experience_years'] = total_exp
-        
-        return result
     
-    except Exception as e:
-        return {"error": f"Resume analysis failed: {str(e)}"}
+    # Calculate total experience in years
+    total_exp = 0
+    for exp in result['work_experience']:
+        years = re.findall(r'\d{4}', exp['duration'])
+        if len(years) == 2:
+            total_exp += (int(years[1]) - int(years[0]))
+    result['total_experience_years'] = total_exp
+    
+    return result
+
+def _analyze_resume_in_worker(pdf_path):
+    """analyze_resume for pool workers; also returns the worker's stage timings"""
+    metrics = get_metrics()
+    metrics.reset()
+    started = time.perf_counter()
+    result = analyze_resume(pdf_path)
+    return result, dict(metrics.stages), time.perf_counter() - started
+
+def analyze_resumes(directory, max_workers=None, max_tasks_per_child=10):
+    """Analyze every PDF in a directory on a process pool
+
+    Yields (pdf_path, result) pairs as resumes finish. Workers are replaced
+    after max_tasks_per_child resumes so a few huge scanned PDFs cannot keep
+    a worker's memory inflated for the rest of the run.
+    """
+    pdf_paths = sorted(glob.glob(os.path.join(directory, '*.pdf')))
+    metrics = get_metrics()
+    with ProcessPoolExecutor(max_workers=max_workers,
+                             max_tasks_per_child=max_tasks_per_child) as executor:
+        metrics.pool_started('resume', max_workers or os.cpu_count())
+        futures = {executor.submit(_analyze_resume_in_worker, path): path for path in pdf_paths}
+        for done, future in enumerate(as_completed(futures), 1):
+            result, stages, elapsed = future.result()
+            metrics.merge_stages(stages)
+            metrics.add_busy('resume', elapsed)
+            metrics.queue_depth('resume.pending', len(futures) - done)
+            yield futures[future], result
+        metrics.pool_finished('resume')
 
 if __name__ == "__main__":
-    # Example usage
-    pdf_path = "resume.pdf"  # Replace with your PDF path
+    # Example usage: python resume.py [resume.pdf | directory of PDFs]
+    pdf_path = sys.argv[1] if len(sys.argv) > 1 else "C:/Users/ASUS/Downloads/UdayKumarCV.befed8a0c1e7c77d9bf9.pdf"
     
-    result = analyze_resume("C:/Users/ASUS/Downloads/UdayKumarCV.befed8a0c1e7c77d9bf9.pdf")
-    
-    if 'error' in result:
-        print(f"Error: {result['error']}")
+    if os.path.isdir(pdf_path):
+        for path, result in analyze_resumes(pdf_path):
+            print(json.dumps({'file': path, **result}))
+        print(get_metrics().report(), file=sys.stderr)
     else:
-        print(json.dumps(result, indent=2))
\ No newline at end of file
+        result = analyze_resume(pdf_path)
+        
+        if 'error' in result:
+            print(f"Error: {result['error']}")
+        else:
+            print(json.dumps(result, indent=2))
\ No newline at end of file
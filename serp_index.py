@@ -0,0 +1,125 @@
+import logging
+import sqlite3
+import threading
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+logger = logging.getLogger(__name__)
+
+INDEX_PATH = 'serp_index.sqlite'
+
+# Query parameters that only identify the click, not the page
+TRACKING_PARAMS = {'gclid', 'fbclid', 'msclkid', 'dclid', 'yclid', 'mc_cid', 'mc_eid',
+                   '_ga', '_gl', 'ref', 'refid', 'src', 'trk', 'trkinfo', 'sa', 'ved', 'usg', 'ei'}
+
+
+def normalize_url(url):
+    """Canonical form of a result URL, used as its identity in the index.
+
+    Lowercases scheme and host, drops ``www.``, default ports, the fragment,
+    tracking parameters (utm_*, gclid, fbclid, ...) and a trailing slash, and
+    sorts the remaining query parameters.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    if parts.port and (scheme, parts.port) not in (('http', 80), ('https', 443)):
+        host = f'{host}:{parts.port}'
+    query = sorted((key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+                   if not key.lower().startswith('utm_') and key.lower() not in TRACKING_PARAMS)
+    path = parts.path.rstrip('/') or '/'
+    return urlunsplit((scheme, host, path, urlencode(query), ''))
+
+
+class SerpIndex:
+    """Persistent index of every search result URL seen across runs.
+
+    URLs are stored once in normalized form with the time they were first
+    and last seen and the query that last returned them. A URL is pending
+    for the downstream scrapers when it is new or its title changed since it
+    was last handed off; pending() lists those, and mark_handed_off() is
+    called once they have been delivered.
+    """
+
+    def __init__(self, path=INDEX_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS results (
+                url TEXT PRIMARY KEY,
+                raw_url TEXT NOT NULL,
+                title TEXT,
+                query TEXT,
+                first_seen REAL NOT NULL,
+                last_seen REAL NOT NULL,
+                changed_at REAL NOT NULL,
+                handed_off_at REAL
+            )""")
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS results_pending ON results (changed_at, handed_off_at)")
+        self._conn.commit()
+
+    def record(self, results, query=None):
+        """Add one query's results; returns how many URLs were new or changed"""
+        now = time.time()
+        fresh = 0
+        with self._lock:
+            for result in results:
+                url = normalize_url(result['url'])
+                title = result.get('title')
+                row = self._conn.execute(
+                    "SELECT title FROM results WHERE url = ?", (url,)).fetchone()
+                if row is None:
+                    self._conn.execute(
+                        "INSERT INTO results VALUES (?, ?, ?, ?, ?, ?, ?, NULL)",
+                        (url, result['url'], title, query, now, now, now))
+                    fresh += 1
+                elif row[0] != title:
+                    self._conn.execute(
+                        "UPDATE results SET raw_url = ?, title = ?, query = ?, last_seen = ?, "
+                        "changed_at = ? WHERE url = ?",
+                        (result['url'], title, query, now, now, url))
+                    fresh += 1
+                else:
+                    self._conn.execute(
+                        "UPDATE results SET query = ?, last_seen = ? WHERE url = ?",
+                        (query, now, url))
+            self._conn.commit()
+        logger.info(f"SERP index: {len(results)} results for {query!r}, {fresh} new or changed")
+        return fresh
+
+    def pending(self):
+        """New or changed results not yet handed off, as [{'title', 'url'}].
+
+        ``url`` is the URL as last seen on the SERP, since some sites need
+        the ``www.`` that the index key drops.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT title, raw_url FROM results "
+                "WHERE handed_off_at IS NULL OR handed_off_at < changed_at "
+                "ORDER BY first_seen, url").fetchall()
+        return [{'title': title, 'url': url} for title, url in rows]
+
+    def mark_handed_off(self, urls):
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE results SET handed_off_at = ? WHERE url = ?",
+                [(now, normalize_url(url)) for url in urls])
+            self._conn.commit()
+
+    def summary(self):
+        with self._lock:
+            total, pending = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(handed_off_at IS NULL OR handed_off_at < changed_at), 0) "
+                "FROM results").fetchone()
+        return {'total': total, 'pending': pending}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,152 @@
+from urllib.parse import urlsplit
+
+from extraction_plan import ExtractionPlan, HAVE_LXML, element_text
+
+if HAVE_LXML:
+    from lxml import etree
+
+DETAILS_LIMIT = 1000  # characters of generic job details kept
+EXPERIENCE_LABELS = ('Experience', 'Years of Experience', 'Exp')
+SALARY_LABELS = ('Salary', 'Compensation', 'Pay Range')
+DETAILS_CLASSES = ('description', 'job-details', 'content')
+
+
+def get_host(url):
+    """Lowercase host of a URL (or of a bare host name), without port"""
+    if '//' not in url:
+        url = '//' + url
+    return (urlsplit(url).hostname or '').rstrip('.')
+
+
+class SiteAdapter:
+    """How to pull the structured job fields out of one job site's pages.
+
+    ``selectors`` maps fields (title, company, experience, salary,
+    description) to CSS selectors and is compiled once into an
+    ExtractionPlan; ``defaults`` fills fields a page doesn't have.
+    """
+
+    def __init__(self, name, domains, selectors=None, defaults=None):
+        self.name = name
+        self.domains = tuple(domains)
+        self.selectors = dict(selectors or {})
+        self.defaults = dict(defaults or {})
+        self.plan = ExtractionPlan(self.selectors)
+
+    def extract(self, html, tree=None):
+        """Structured fields of a page; ``tree`` is the page already parsed by parse_lxml"""
+        fields = self.plan.extract(html, tree)
+        for field, default in self.defaults.items():
+            if not fields.get(field):
+                fields[field] = default
+        return fields
+
+    def __repr__(self):
+        return f"SiteAdapter({self.name!r}, {self.domains!r})"
+
+
+class AdapterRegistry:
+    """Site adapters indexed by domain suffix.
+
+    ``lookup`` tries the URL's host and then each parent domain
+    (jobs.apple.com, apple.com) with a dict lookup per label, so the cost
+    does not grow with the number of registered sites.
+    """
+
+    def __init__(self, default=None):
+        self.default = default
+        self._by_domain = {}
+        self._adapters = []
+
+    def register(self, adapter):
+        for domain in adapter.domains:
+            self._by_domain[domain.lower()] = adapter
+        self._adapters.append(adapter)
+        return adapter
+
+    def lookup(self, url):
+        """Adapter for a URL or host name (the default adapter if none matches)"""
+        labels = get_host(url).split('.')
+        # Stop before the bare TLD
+        for start in range(max(len(labels) - 1, 1)):
+            adapter = self._by_domain.get('.'.join(labels[start:]))
+            if adapter:
+                return adapter
+        return self.default
+
+    def __iter__(self):
+        return iter(self._adapters)
+
+
+GENERIC = SiteAdapter('generic', ())
+
+REGISTRY = AdapterRegistry(default=GENERIC)
+REGISTRY.register(SiteAdapter('naukri', ['naukri.com'], {
+    'experience': 'div.exp',
+    'salary': 'div.salary',
+    'description': 'div.job-desc',
+}, defaults={'experience': "Not specified", 'salary': "Not disclosed",
+             'description': "No details available"}))
+REGISTRY.register(SiteAdapter('apple', ['apple.com'], {
+    'experience': 'span.job-experience',
+    'salary': 'span.job-salary',
+    'description': 'div.job-description',
+}, defaults={'experience': "Not specified", 'salary': "Not disclosed",
+             'description': "No details available"}))
+REGISTRY.register(SiteAdapter('indeed', ['indeed.com'], {
+    'title': 'h1.jobsearch-JobInfoHeader-title',
+    'company': 'div[data-company-name="true"] a',
+    'experience': 'div#jobDetailsSection div:contains("Experience") + div',
+    'salary': 'div#salaryInfoAndJobType span',
+    'description': 'div#jobDescriptionText',
+}))
+REGISTRY.register(SiteAdapter('linkedin', ['linkedin.com'], {
+    'title': 'h1.top-card-layout__title',
+    'company': 'a.topcard__org-name-link',
+    'experience': 'li.description__job-criteria-item:contains("Experience") span',
+    'salary': 'li.description__job-criteria-item:contains("Salary") span',
+    'description': 'div.show-more-less-html__markup',
+}))
+REGISTRY.register(SiteAdapter('glassdoor', ['glassdoor.com'], {
+    'title': 'div.jobTitle h1',
+    'company': 'div.employerName',
+    'experience': 'div.jobDescriptionContent div:contains("Experience")',
+    'salary': 'div.salaryEstimate',
+    'description': 'div.jobDescriptionContent',
+}))
+
+
+def get_adapter(url):
+    return REGISTRY.lookup(url)
+
+
+def _label_xpath(labels):
+    # The first element after the first text node equal to one of the labels
+    test = ' or '.join(f'. = "{label}"' for label in labels)
+    return etree.XPath(f'(//text()[{test}])[1]/following::*[1]')
+
+
+if HAVE_LXML:
+    _EXPERIENCE = _label_xpath(EXPERIENCE_LABELS)
+    _SALARY = _label_xpath(SALARY_LABELS)
+    _DETAILS = [etree.XPath(xpath) for xpath in (
+        '(//div[%s])[1]' % ' or '.join(
+            f'contains(concat(" ", normalize-space(@class), " "), " {cls} ")'
+            for cls in DETAILS_CLASSES),
+        '(//main)[1]',
+        '(//article)[1]',
+        '(//div[@role="main"])[1]',
+    )]
+
+
+def generic_fields(tree):
+    """extra.parse_generic_job's label and main-content heuristics, on a parsed page"""
+    experience = _EXPERIENCE(tree)
+    salary = _SALARY(tree)
+    details = next((found[0] for found in (xpath(tree) for xpath in _DETAILS) if found), None)
+    details = element_text(details, '\n') if details is not None else "No details available"
+    return {
+        'experience': element_text(experience[0]) if experience else "Not specified",
+        'salary': element_text(salary[0]) if salary else "Not disclosed",
+        'details': details[:DETAILS_LIMIT] + "..." if len(details) > DETAILS_LIMIT else details,
+    }
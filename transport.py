@@ -0,0 +1,300 @@
+import http.client
+import logging
+import os
+import random
+import socket
+import ssl
+import threading
+import time
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+from types import SimpleNamespace
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.certs import where as default_ca_bundle
+from requests.cookies import extract_cookies_to_jar
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers, select_proxy
+
+try:
+    import httpx
+    import h2  # noqa: F401 -- httpx only speaks HTTP/2 with it installed
+    HAVE_HTTP2 = True
+except ImportError:
+    HAVE_HTTP2 = False
+
+try:
+    import brotli  # noqa: F401 -- urllib3 and httpx decode 'br' with it
+    HAVE_BROTLI = True
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        HAVE_BROTLI = True
+    except ImportError:
+        HAVE_BROTLI = False
+
+logger = logging.getLogger(__name__)
+
+POOL_HOSTS = 100  # hosts that keep their own connection pool
+POOL_CONNECTIONS = 16  # kept-alive connections per host; at least the fetch threads per host
+USE_HTTP2 = False  # opt in: send https requests over HTTP/2 when httpx and h2 are installed
+DNS_TTL = 300  # seconds a resolved host is reused
+DNS_MAX_ENTRIES = 10000
+USER_AGENT_COUNT = 50  # user agents drawn once for the rotation table
+
+BASE_HEADERS = {
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+    # Only advertise encodings that can be decoded
+    'Accept-Encoding': 'gzip, deflate, br' if HAVE_BROTLI else 'gzip, deflate',
+    'Referer': 'https://www.google.com/',
+    'DNT': '1',
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1',
+}
+# Used when fake_useragent is not installed or can't load its data
+FALLBACK_USER_AGENTS = (
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) '
+    'Chrome/124.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) '
+    'Version/17.4 Safari/605.1.15',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:125.0) Gecko/20100101 Firefox/125.0',
+    'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) '
+    'Chrome/124.0.0.0 Safari/537.36',
+)
+
+
+def user_agent_table(count=USER_AGENT_COUNT):
+    """``count`` distinct user agents from fake_useragent, drawn once"""
+    try:
+        from fake_useragent import UserAgent
+        ua = UserAgent()
+        agents = list(dict.fromkeys(ua.random for _ in range(count * 4)))[:count]
+    except Exception as e:
+        logger.warning(f"fake_useragent unavailable ({e}), using built-in user agents")
+        agents = []
+    return agents or list(FALLBACK_USER_AGENTS)
+
+
+class DnsCache:
+    """TTL cache in front of socket.getaddrinfo.
+
+    Installed process-wide, so every new connection (requests, httpx,
+    anything on sockets) to a host resolved in the last ``ttl`` seconds
+    skips the DNS lookup. Failed lookups are not cached.
+    """
+
+    def __init__(self, ttl=DNS_TTL, max_entries=DNS_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.stats = {'hits': 0, 'misses': 0}
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._resolve = socket.getaddrinfo
+
+    def getaddrinfo(self, host, port, family=0, type=0, proto=0, flags=0):
+        key = (host, port, family, type, proto, flags)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                self.stats['hits'] += 1
+                return entry[1]
+        result = self._resolve(host, port, family, type, proto, flags)
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                self._entries.clear()
+            self._entries[key] = (now + self.ttl, result)
+            self.stats['misses'] += 1
+        return result
+
+    def install(self):
+        socket.getaddrinfo = self.getaddrinfo
+        return self
+
+    def uninstall(self):
+        if socket.getaddrinfo == self.getaddrinfo:
+            socket.getaddrinfo = self._resolve
+
+
+class _HttpxBody:
+    """``response.raw`` for Http2Adapter responses: httpx's decoded body stream
+
+    ``_original_response.msg`` carries every header line, as urllib3's
+    does, so requests stores Set-Cookie headers in its cookie jars
+    (including between redirects).
+    """
+
+    def __init__(self, response):
+        self._response = response
+        self._chunks = None
+        msg = http.client.HTTPMessage()
+        for name, value in response.headers.multi_items():
+            msg[name] = value  # adds a header line, repeated names included
+        self._original_response = SimpleNamespace(msg=msg)
+
+    def stream(self, chunk_size, decode_content=True):
+        try:
+            yield from self._response.iter_bytes(chunk_size)
+        except httpx.HTTPError as e:
+            raise requests.exceptions.ConnectionError(e)
+
+    def read(self, amt=None, decode_content=True):
+        if self._chunks is None:
+            self._chunks = self.stream(amt or 64 * 1024)
+        return next(self._chunks, b'')
+
+    def close(self):
+        self._response.close()
+
+
+class Http2Adapter(BaseAdapter):
+    """requests transport adapter that sends through an HTTP/2 httpx client.
+
+    Requests to one host are multiplexed over a single connection. The
+    responses are ordinary requests.Response objects whose body streams
+    from httpx (already decoded), so redirects, cookies, the response
+    cache, read_capped and host health checks work unchanged. Cookies
+    live only in requests' jars; the httpx client keeps none.
+
+    ``verify`` and ``cert`` are honoured as requests does (one httpx client
+    per combination). Requests that go through a proxy are sent over
+    HTTP/1.1 by ``fallback`` instead.
+    """
+
+    def __init__(self, max_connections=POOL_CONNECTIONS, fallback=None):
+        super().__init__()
+        self.max_connections = max_connections
+        self.fallback = fallback or HTTPAdapter(pool_maxsize=max_connections)
+        self._clients = {}
+        self._lock = threading.Lock()
+
+    def _client(self, verify, cert):
+        key = (verify, tuple(cert) if isinstance(cert, (list, tuple)) else cert)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = self._clients[key] = httpx.Client(
+                    http2=True, follow_redirects=False, trust_env=False,
+                    verify=_ssl_context(verify, cert),
+                    cookies=CookieJar(policy=DefaultCookiePolicy(allowed_domains=[])),
+                    limits=httpx.Limits(max_connections=None,
+                                        max_keepalive_connections=self.max_connections))
+        return client
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        if select_proxy(request.url, proxies or {}):
+            return self.fallback.send(request, stream=stream, timeout=timeout, verify=verify,
+                                      cert=cert, proxies=proxies)
+        if isinstance(timeout, tuple):
+            timeout = httpx.Timeout(timeout[1], connect=timeout[0])
+        client = self._client(verify, cert)
+        try:
+            sent = client.send(
+                client.build_request(request.method, request.url, headers=dict(request.headers),
+                                     content=request.body, timeout=timeout),
+                stream=True)
+        except httpx.TimeoutException as e:
+            raise requests.exceptions.Timeout(e, request=request)
+        except httpx.HTTPError as e:
+            raise requests.exceptions.ConnectionError(e, request=request)
+
+        response = requests.Response()
+        response.status_code = sent.status_code
+        response.headers = CaseInsensitiveDict(sent.headers)
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.reason = sent.reason_phrase
+        response.raw = _HttpxBody(sent)
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        extract_cookies_to_jar(response.cookies, request, response.raw)
+        if not stream:
+            response.content
+        return response
+
+    def close(self):
+        with self._lock:
+            for client in self._clients.values():
+                client.close()
+            self._clients.clear()
+        self.fallback.close()
+
+
+def _ssl_context(verify, cert):
+    """SSL context for requests' ``verify`` (bool or CA bundle path) and ``cert`` arguments"""
+    if verify is False:
+        context = ssl.create_default_context()
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+    elif verify is True or not verify:
+        context = ssl.create_default_context(cafile=default_ca_bundle())
+    elif os.path.isdir(verify):
+        context = ssl.create_default_context(capath=verify)
+    else:
+        context = ssl.create_default_context(cafile=verify)
+    if isinstance(cert, (list, tuple)):
+        context.load_cert_chain(*cert)
+    elif cert:
+        context.load_cert_chain(cert)
+    return context
+
+
+class Transport:
+    """The HTTP client every fetcher shares.
+
+    One requests.Session with a kept-alive connection pool per host (and,
+    with ``http2``, https over HTTP/2), so consecutive pages on a host
+    reuse a connection instead of paying DNS, TCP and TLS setup again.
+    Default headers are set once on the session; headers() returns a
+    prebuilt header set with a user agent from the rotation table.
+    """
+
+    def __init__(self, pool_hosts=POOL_HOSTS, pool_connections=POOL_CONNECTIONS,
+                 http2=USE_HTTP2, user_agents=None):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_hosts, pool_maxsize=pool_connections)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.http2 = http2 and HAVE_HTTP2
+        if self.http2:
+            self.session.mount('https://', Http2Adapter(pool_connections, fallback=adapter))
+        elif http2:
+            logger.info("HTTP/2 needs httpx and h2 (pip install 'httpx[http2]'), using HTTP/1.1")
+        self.session.headers = CaseInsensitiveDict(BASE_HEADERS)
+        self.user_agents = list(user_agents or user_agent_table())
+        self._header_sets = [dict(BASE_HEADERS, **{'User-Agent': agent})
+                             for agent in self.user_agents]
+
+    def headers(self):
+        """Request headers with a random user agent from the table (shared: don't modify)"""
+        return random.choice(self._header_sets)
+
+    def user_agent(self):
+        return random.choice(self.user_agents)
+
+    def get(self, url, **kwargs):
+        return self.session.get(url, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+
+_default_transport = None
+_default_dns = None
+_default_lock = threading.Lock()
+
+
+def get_transport():
+    """Return the transport shared by all fetchers, creating it (and installing the DNS cache) on first use"""
+    global _default_transport, _default_dns
+    with _default_lock:
+        if _default_transport is None:
+            _default_dns = DnsCache().install()
+            _default_transport = Transport()
+    return _default_transport
+
+
+def get_dns_cache():
+    """The installed DnsCache, or None before the first get_transport()"""
+    return _default_dns